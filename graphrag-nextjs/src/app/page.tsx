@@ -8,7 +8,11 @@ import { ThemeSupa } from '@supabase/auth-ui-shared';
 import GraphVisualization from '@/components/GraphVisualization';
 import Chatbot from '@/components/Chatbot';
 import Sidebar from '@/components/Sidebar';
-import { GraphData } from '@/types';
+import { ClusterLevel, GraphCursor, GraphData } from '@/types';
+import { fetchClusterLevels, fetchGraph } from '@/lib/graphApi';
+import { mergeGraphData } from '@/lib/graphMerge';
+import { generateSyntheticGraph } from '@/lib/syntheticGraph';
+import { measureFrames } from '@/lib/frameTimer';
 import './globals.css';
 
 import '@/components/ChatHistorySidebar.css';
@@ -23,6 +27,10 @@ const App = () => {
   
   const [layout, setLayout] = useState<'force' | 'radial'>('force');
   const [isAggregated, setIsAggregated] = useState(false);
+  // Cursor of the next page of most connected nodes, null once everything is loaded
+  const [seedCursor, setSeedCursor] = useState<GraphCursor | null>(null);
+  const [clusterLevel, setClusterLevel] = useState('label');
+  const [clusterLevels, setClusterLevels] = useState<ClusterLevel[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -32,10 +40,17 @@ const App = () => {
     setIsLoading(true);
     setError(null);
     try {
-      const { data, error: funcError } = await client.functions.invoke('get-graph-data');
-      if (funcError) throw funcError;
+      // Development aid: `?synthetic=5000` renders a generated graph instead of the real one,
+      // for measuring rendering performance on graphs larger than the initial view.
+      const syntheticSize = process.env.NODE_ENV !== 'production'
+        ? Number(new URLSearchParams(window.location.search).get('synthetic'))
+        : 0;
+      const data = syntheticSize > 0
+        ? generateSyntheticGraph(syntheticSize)
+        : await fetchGraph(client, 'get-graph-data');
       if (data && data.nodes && data.links) {
         setGraphData(data);
+        setSeedCursor(data.nextCursor ?? null);
       } else {
         throw new Error("Invalid data structure received.");
       }
@@ -47,6 +62,70 @@ const App = () => {
     }
   }, []);
 
+  // Next page of most connected nodes, merged into the graph on screen.
+  const loadMoreNodes = async () => {
+    if (!seedCursor) return;
+    setIsLoading(true);
+    setError(null);
+    try {
+      const page = await fetchGraph(supabase, 'get-graph-data', { cursor: seedCursor });
+      setGraphData(current => mergeGraphData(current, page));
+      setSeedCursor(page.nextCursor ?? null);
+    } catch (err: any) {
+      console.error("Failed to load more nodes:", err);
+      setError(err.message);
+    } finally {
+      setIsLoading(false);
+    }
+  };
+
+  // Aggregated view: one super-node per cluster of the chosen level, so the overview stays
+  // small however large the graph is. Clusters are expanded on demand from the context menu.
+  const fetchClusters = useCallback(async (client: SupabaseClient, level: string) => {
+    setIsLoading(true);
+    setError(null);
+    try {
+      const [data, levels] = await Promise.all([
+        fetchGraph(client, 'get-graph-clusters', { level }),
+        clusterLevels.length ? clusterLevels : fetchClusterLevels(client),
+      ]);
+      setClusterLevels(levels);
+      setGraphData(data);
+    } catch (err: any) {
+      console.error("Failed to fetch graph clusters:", err);
+      setError(err.message);
+    } finally {
+      setIsLoading(false);
+    }
+  }, [clusterLevels]);
+
+  const toggleAggregation = () => {
+    if (isAggregated) {
+      setIsAggregated(false);
+      fetchInitialData(supabase);
+    } else {
+      setIsAggregated(true);
+      setSeedCursor(null);
+      fetchClusters(supabase, clusterLevel);
+    }
+  };
+
+  const changeClusterLevel = (level: string) => {
+    setClusterLevel(level);
+    fetchClusters(supabase, level);
+  };
+
+  const resetView = () => {
+    setIsAggregated(false);
+    fetchInitialData(supabase);
+  };
+
+  useEffect(() => {
+    if (process.env.NODE_ENV !== 'production') {
+      (window as unknown as { measureFrames: typeof measureFrames }).measureFrames = measureFrames;
+    }
+  }, []);
+
   useEffect(() => {
     const getSessionAndData = async () => {
       const { data: { session } } = await supabase.auth.getSession();
@@ -108,11 +187,23 @@ const App = () => {
           <div className="layout-controls">
             <button onClick={() => setLayout('force')} disabled={layout === 'force' || isLoading}>Force</button>
             <button onClick={() => setLayout('radial')} disabled={layout === 'radial' || isLoading}>Radial</button>
-            <button onClick={() => setIsAggregated(!isAggregated)} disabled={isLoading}>
+            <button onClick={toggleAggregation} disabled={isLoading}>
               {isAggregated ? 'Ungroup' : 'Group by Label'}
             </button>
+            {isAggregated && clusterLevels.length > 1 && (
+              <select value={clusterLevel} onChange={e => changeClusterLevel(e.target.value)} disabled={isLoading}>
+                {clusterLevels.map(l => (
+                  <option key={l.level} value={l.level}>
+                    {l.kind === 'label' ? 'By label' : `Communities ${l.ordinal}`} ({l.cluster_count})
+                  </option>
+                ))}
+              </select>
+            )}
+            {seedCursor && (
+              <button onClick={loadMoreNodes} disabled={isLoading}>Load More Nodes</button>
+            )}
           </div>
-          <button onClick={() => fetchInitialData(supabase)} className="reset-btn" disabled={isLoading}>
+          <button onClick={resetView} className="reset-btn" disabled={isLoading}>
             {isLoading ? 'Loading...' : 'Reset View'}
           </button>
         </header>
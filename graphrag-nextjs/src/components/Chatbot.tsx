@@ -1,8 +1,11 @@
 'use client';
 
-import { useState, useEffect, useRef, useCallback } from 'react';
+import { useState, useEffect, useRef, useCallback, Profiler, ProfilerOnRenderCallback } from 'react';
 import { SupabaseClient } from '@supabase/supabase-js';
-import { GraphData } from '@/types';
+import { ChatMessagePage, GraphData, MessageCursor } from '@/types';
+import { createFrameBatcher, FrameBatcher } from '@/lib/frameBatcher';
+import { generateSyntheticChat } from '@/lib/syntheticChat';
+import VirtualMessageList from './VirtualMessageList';
 import './Chatbot.css';
 
 interface ChatbotProps {
@@ -13,58 +16,198 @@ interface ChatbotProps {
 }
 
 interface Message {
+  // Stable React key: `m<id>` for stored messages, `local-<n>` for ones created in this tab
+  key: string;
+  id?: number;
   role: 'user' | 'assistant';
   content: string;
+  hasThinking?: boolean;
+  thinking?: string | null;
 }
 
+// Number of messages fetched per history page
+const HISTORY_PAGE_SIZE = 50;
+
+interface ChatStreamingStats {
+  tokens: number;
+  commits: number;
+  renderMs: number;
+  msPerToken: number;
+  maxCommitMs: number;
+  renderedRows: number;
+}
+
+const getMessageKey = (message: Message) => message.key;
+
 export default function Chatbot({ supabase, setGraphData, activeSessionId, onNewSession }: ChatbotProps) {
   const [messages, setMessages] = useState<Message[]>([]);
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
-  const messagesEndRef = useRef<HTMLDivElement>(null);
+  const [historyCursor, setHistoryCursor] = useState<MessageCursor | null>(null);
+  const [isLoadingEarlier, setIsLoadingEarlier] = useState(false);
+  // The response being streamed lives outside `messages`, so that each frame of text
+  // re-renders only its own row; it is appended to `messages` once the stream ends.
+  const [streaming, setStreaming] = useState<Message | null>(null);
+  const streamingRef = useRef<Message | null>(null);
+  const nextLocalKey = useRef(0);
+  const profile = useRef<{ commits: number; renderMs: number; maxCommitMs: number } | null>(null);
+
+  const localKey = useCallback(() => `local-${nextLocalKey.current++}`, []);
+
+  // Fetch one page of history (newest first, without thinking steps) and return it in display order.
+  const fetchHistoryPage = useCallback(async (sessionId: string, cursor: MessageCursor | null) => {
+    const { data, error } = await supabase.functions.invoke<ChatMessagePage>('get-chat-history', {
+      body: { sessionId, cursor, pageSize: HISTORY_PAGE_SIZE },
+    });
+    if (error) throw error;
+    const page: Message[] = (data?.messages ?? []).map(msg => ({
+      key: `m${msg.id}`,
+      id: msg.id,
+      role: msg.role,
+      content: msg.content,
+      hasThinking: msg.has_thinking,
+    })).reverse();
+    return { page, nextCursor: data?.nextCursor ?? null };
+  }, [supabase]);
 
   const fetchHistory = useCallback(async (sessionId: string) => {
     setIsLoading(true);
     try {
-      const { data, error } = await supabase.functions.invoke('get-chat-history', {
-        body: { sessionId },
-      });
-      if (error) throw error;
-      setMessages(data.map((msg: any) => ({
-        role: msg.role,
-        content: msg.content,
-      })));
+      const { page, nextCursor } = await fetchHistoryPage(sessionId, null);
+      setMessages(page);
+      setHistoryCursor(nextCursor);
     } catch (err: any) {
       console.error('Failed to fetch chat history:', err);
-      setMessages([{ role: 'assistant', content: 'Failed to load chat history.' }]);
+      setMessages([{ key: localKey(), role: 'assistant', content: 'Failed to load chat history.' }]);
+      setHistoryCursor(null);
     } finally {
       setIsLoading(false);
     }
+  }, [fetchHistoryPage, localKey]);
+
+  const handleLoadEarlier = async () => {
+    if (!activeSessionId || !historyCursor || isLoadingEarlier) return;
+    setIsLoadingEarlier(true);
+    try {
+      const { page, nextCursor } = await fetchHistoryPage(activeSessionId, historyCursor);
+      setMessages(prev => [...page, ...prev]);
+      setHistoryCursor(nextCursor);
+    } catch (err: any) {
+      console.error('Failed to fetch earlier messages:', err);
+    } finally {
+      setIsLoadingEarlier(false);
+    }
+  };
+
+  // Thinking steps are not part of the history pages; fetch them only when the user asks.
+  const toggleThinking = useCallback(async (message: Message) => {
+    if (!message.id) return;
+    if (message.thinking !== undefined) {
+      setMessages(prev => prev.map(m => (m.id === message.id ? { ...m, thinking: undefined } : m)));
+      return;
+    }
+    try {
+      const { data, error } = await supabase.functions.invoke<{ id: number; thinking_steps: string | null }>('get-chat-history', {
+        body: { messageId: message.id },
+      });
+      if (error) throw error;
+      setMessages(prev => prev.map(m => (m.id === message.id ? { ...m, thinking: data?.thinking_steps ?? '' } : m)));
+    } catch (err: any) {
+      console.error('Failed to fetch thinking steps:', err);
+    }
   }, [supabase]);
 
+  // Streamed text is coalesced per animation frame instead of rendering once per chunk.
+  const startStreaming = useCallback(() => {
+    streamingRef.current = { key: localKey(), role: 'assistant', content: '' };
+    setStreaming(streamingRef.current);
+    return createFrameBatcher(text => {
+      if (!streamingRef.current) return;
+      streamingRef.current = { ...streamingRef.current, content: streamingRef.current.content + text };
+      setStreaming(streamingRef.current);
+    });
+  }, [localKey]);
+
+  const finishStreaming = useCallback((batcher: FrameBatcher) => {
+    batcher.flush();
+    const message = streamingRef.current;
+    if (!message) return;
+    streamingRef.current = null;
+    setStreaming(null);
+    setMessages(prev => [...prev, message]);
+  }, []);
+
   useEffect(() => {
+    // Development aid: `?syntheticChat=2000` opens a generated conversation instead of an
+    // empty chat, to measure rendering with long histories.
+    const syntheticSize = process.env.NODE_ENV !== 'production'
+      ? Number(new URLSearchParams(window.location.search).get('syntheticChat'))
+      : 0;
     if (activeSessionId) {
       fetchHistory(activeSessionId);
     } else {
-      setMessages([]);
+      setMessages(syntheticSize > 0
+        ? generateSyntheticChat(syntheticSize).map(msg => ({ ...msg, key: `m${msg.id}` }))
+        : []);
+      setHistoryCursor(null);
     }
   }, [activeSessionId, fetchHistory]);
 
+  const handleProfilerRender: ProfilerOnRenderCallback = (_id, _phase, actualDuration) => {
+    if (!profile.current) return;
+    profile.current.commits++;
+    profile.current.renderMs += actualDuration;
+    profile.current.maxCommitMs = Math.max(profile.current.maxCommitMs, actualDuration);
+  };
+
+  // Development aid: streams `tokens` fake tokens through the same path as a real response
+  // and reports the React render time spent on the message list, e.g.
+  // `await measureChatStreaming(1000)` with `?syntheticChat=2000`.
+  const measureChatStreaming = useCallback((tokens = 1000, intervalMs = 2) => new Promise<ChatStreamingStats>(resolve => {
+    profile.current = { commits: 0, renderMs: 0, maxCommitMs: 0 };
+    const batcher = startStreaming();
+    let sent = 0;
+    const timer = setInterval(() => {
+      batcher.push(`token${sent} `);
+      if (++sent < tokens) return;
+      clearInterval(timer);
+      finishStreaming(batcher);
+      // Let the final commit land before reading the totals
+      requestAnimationFrame(() => setTimeout(() => {
+        const { commits, renderMs, maxCommitMs } = profile.current!;
+        profile.current = null;
+        const stats: ChatStreamingStats = {
+          tokens,
+          commits,
+          renderMs,
+          msPerToken: renderMs / tokens,
+          maxCommitMs,
+          renderedRows: document.querySelectorAll('.chat-messages .message-row').length,
+        };
+        console.table(stats);
+        resolve(stats);
+      }));
+    }, intervalMs);
+  }), [startStreaming, finishStreaming]);
+
   useEffect(() => {
-    messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
-  }, [messages]);
+    if (process.env.NODE_ENV !== 'production') {
+      (window as unknown as { measureChatStreaming: typeof measureChatStreaming }).measureChatStreaming = measureChatStreaming;
+    }
+  }, [measureChatStreaming]);
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!input.trim() || isLoading) return;
 
-    const userMessage: Message = { role: 'user', content: input };
+    const userMessage: Message = { key: localKey(), role: 'user', content: input };
     setMessages(prev => [...prev, userMessage]);
     const currentInput = input;
     setInput('');
     setIsLoading(true);
 
     const sessionIdForRequest = activeSessionId || crypto.randomUUID();
+    let batcher: FrameBatcher | null = null;
 
     try {
       // Use fetch directly to handle the streaming response
@@ -91,24 +234,20 @@ export default function Chatbot({ supabase, setGraphData, activeSessionId, onNew
       }
       
       // Handle the streaming response for typewriter effect
-      setMessages(prev => [...prev, { role: 'assistant', content: '' }]);
+      batcher = startStreaming();
       const reader = response.body.getReader();
       const decoder = new TextDecoder();
       while (true) {
         const { done, value } = await reader.read();
         if (done) break;
-        const chunk = decoder.decode(value, { stream: true });
-        setMessages(prev => {
-          const lastMessage = prev[prev.length - 1];
-          if (lastMessage.role === 'assistant') {
-            lastMessage.content += chunk;
-          }
-          return [...prev];
-        });
+        batcher.push(decoder.decode(value, { stream: true }));
       }
+      finishStreaming(batcher);
     } catch (err: any) {
       console.error('Error during chat submission:', err);
-      const errorMessage: Message = { role: 'assistant', content: `Sorry, I encountered an error: ${err.message}` };
+      // Keep whatever part of the response arrived before the error
+      if (batcher) finishStreaming(batcher);
+      const errorMessage: Message = { key: localKey(), role: 'assistant', content: `Sorry, I encountered an error: ${err.message}` };
       setMessages(prev => [...prev, errorMessage]);
     } finally {
       setIsLoading(false);
@@ -123,16 +262,33 @@ export default function Chatbot({ supabase, setGraphData, activeSessionId, onNew
     })
   }, [supabase]);
 
+  const renderMessage = useCallback((msg: Message) => (
+    <div className={`message ${msg.role}`}>
+      {msg.content}
+      {msg.hasThinking && (
+        <button className="thinking-toggle" onClick={() => toggleThinking(msg)}>
+          {msg.thinking !== undefined ? 'Hide reasoning' : 'Show reasoning'}
+        </button>
+      )}
+      {msg.thinking && <div className="thinking-steps">{msg.thinking}</div>}
+    </div>
+  ), [toggleThinking]);
+
   return (
     <div className="chatbot-container">
-      <div className="chat-messages">
-        {messages.map((msg, index) => (
-          <div key={index} className={`message ${msg.role}`}>
-            {msg.content}
-          </div>
-        ))}
-        <div ref={messagesEndRef} />
-      </div>
+      <Profiler id="chat-messages" onRender={handleProfilerRender}>
+        <VirtualMessageList
+          className="chat-messages"
+          items={streaming ? [...messages, streaming] : messages}
+          getKey={getMessageKey}
+          renderItem={renderMessage}
+          header={historyCursor && (
+            <button className="load-earlier-btn" onClick={handleLoadEarlier} disabled={isLoadingEarlier}>
+              {isLoadingEarlier ? 'Loading...' : 'Load earlier messages'}
+            </button>
+          )}
+        />
+      </Profiler>
       <form onSubmit={handleSubmit} className="chatbot-form">
         <input
           className="chatbot-input"
@@ -2,6 +2,7 @@
 
 import React from 'react';
 import type { GraphNode } from '@/types';
+import type { TraceDirection } from '@/lib/graphApi';
 import './ContextMenu.css';
 
 interface ContextMenuProps {
@@ -9,10 +10,12 @@ interface ContextMenuProps {
   x: number;
   y: number;
   onClose: () => void;
-  onTrace: (direction: 'UPSTREAM' | 'DOWNSTREAM') => void;
+  onTrace: (direction: TraceDirection) => void;
+  onExpand: () => void;
+  onExpandNeighbors: () => void;
 }
 
-const ContextMenu: React.FC<ContextMenuProps> = ({ node, x, y, onClose, onTrace }) => {
+const ContextMenu: React.FC<ContextMenuProps> = ({ node, x, y, onClose, onTrace, onExpand, onExpandNeighbors }) => {
   const handleTraceUpstream = () => {
     onTrace('UPSTREAM');
     onClose();
@@ -23,11 +26,29 @@ const ContextMenu: React.FC<ContextMenuProps> = ({ node, x, y, onClose, onTrace
     onClose();
   };
 
+  const handleExpand = () => {
+    onExpand();
+    onClose();
+  };
+
+  const handleExpandNeighbors = () => {
+    onExpandNeighbors();
+    onClose();
+  };
+
   return (
     <div className="context-menu" style={{ top: y, left: x }}>
       <ul>
-        <li onClick={handleTraceUpstream}>Trace Upstream</li>
-        <li onClick={handleTraceDownstream}>Trace Downstream</li>
+        {node.cluster ? (
+          // Cluster nodes are not Neo4j nodes and cannot be traced
+          <li onClick={handleExpand}>Expand Cluster ({node.size})</li>
+        ) : (
+          <>
+            <li onClick={handleExpandNeighbors}>Expand Neighbors</li>
+            <li onClick={handleTraceUpstream}>Trace Upstream</li>
+            <li onClick={handleTraceDownstream}>Trace Downstream</li>
+          </>
+        )}
         <li onClick={onClose}>Close</li>
       </ul>
     </div>
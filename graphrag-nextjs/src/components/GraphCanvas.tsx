@@ -0,0 +1,260 @@
+'use client';
+
+import React, { useEffect, useRef } from 'react';
+import * as d3 from 'd3';
+import { GraphData, GraphNode } from '@/types';
+import { initialAlpha, precomputedPosition } from '@/lib/graphLayout';
+import type { LayoutWorkerRequest, LayoutWorkerResponse } from '@/workers/forceLayoutProtocol';
+
+// Node radius in graph coordinates, same as the SVG renderer
+const NODE_RADIUS = 10;
+// Labels are only drawn once the user has zoomed in at least this far
+const LABEL_ZOOM_THRESHOLD = 1.5;
+
+interface GraphCanvasProps {
+  graphData: GraphData;
+  layout: 'force' | 'radial';
+  isAggregated: boolean;
+  onNodeClick: (node: GraphNode) => void;
+  onNodeContextMenu: (node: GraphNode, x: number, y: number) => void;
+}
+
+const endpointId = (endpoint: string | number | GraphNode) =>
+  typeof endpoint === 'object' ? endpoint.id : String(endpoint);
+
+/**
+ * Canvas 2D renderer for graphs too large for one SVG element per node and link.
+ *
+ * The force simulation runs in a Web Worker (forceLayout.worker.ts) and streams positions
+ * back as transferred Float32Arrays. Pointer, click and context-menu hit-testing go through
+ * a quadtree that is rebuilt lazily after positions change, and labels are only drawn for
+ * visible nodes above LABEL_ZOOM_THRESHOLD.
+ */
+export default function GraphCanvas({ graphData, layout, isAggregated, onNodeClick, onNodeContextMenu }: GraphCanvasProps) {
+  const canvasRef = useRef<HTMLCanvasElement>(null);
+  // Keep the latest callbacks without rebuilding the scene when the parent re-renders
+  const callbacksRef = useRef({ onNodeClick, onNodeContextMenu });
+  callbacksRef.current = { onNodeClick, onNodeContextMenu };
+
+  useEffect(() => {
+    const canvas = canvasRef.current;
+    const container = canvas?.parentElement;
+    const context = canvas?.getContext('2d');
+    if (!canvas || !container || !context || !graphData.nodes.length) return;
+
+    const dpr = window.devicePixelRatio || 1;
+    const width = container.clientWidth;
+    const height = container.clientHeight;
+    canvas.width = width * dpr;
+    canvas.height = height * dpr;
+    canvas.style.width = `${width}px`;
+    canvas.style.height = `${height}px`;
+
+    const nodes = graphData.nodes;
+    const indexById = new Map(nodes.map((n, i) => [n.id, i]));
+    const linkPairs: [number, number][] = [];
+    graphData.links.forEach(link => {
+      const source = indexById.get(endpointId(link.source));
+      const target = indexById.get(endpointId(link.target));
+      if (source !== undefined && target !== undefined) linkPairs.push([source, target]);
+    });
+
+    const neighbors = nodes.map(() => new Set<number>());
+    linkPairs.forEach(([s, t]) => {
+      neighbors[s].add(t);
+      neighbors[t].add(s);
+    });
+    const isConnected = (a: number, b: number) => a === b || neighbors[b].has(a);
+
+    const color = d3.scaleOrdinal(d3.schemeCategory10);
+    const fills = nodes.map(d => color(isAggregated ? d.group || 'default' : d.type || 'default'));
+
+    // Precomputed coordinates (when the server sent them) are drawn right away and only refined.
+    const startPositions = nodes.map(n => precomputedPosition(n, layout));
+    let positions = new Float32Array(nodes.length * 2);
+    startPositions.forEach((p, i) => {
+      positions[i * 2] = p.x ?? 0;
+      positions[i * 2 + 1] = p.y ?? 0;
+    });
+    let tree: d3.Quadtree<number> | null = null;
+    let transform = d3.zoomIdentity.translate(width / 2, height / 2);
+    let hovered: number | null = null;
+    let frameRequested = false;
+
+    const draw = () => {
+      frameRequested = false;
+      performance.mark('graph-canvas-draw-start');
+      const { k } = transform;
+      // Visible area in graph coordinates, padded so partially visible nodes are drawn
+      const [x0, y0] = transform.invert([-NODE_RADIUS * k, -NODE_RADIUS * k]);
+      const [x1, y1] = transform.invert([width + NODE_RADIUS * k, height + NODE_RADIUS * k]);
+      const visible = (i: number) => {
+        const x = positions[i * 2];
+        const y = positions[i * 2 + 1];
+        return x >= x0 && x <= x1 && y >= y0 && y <= y1;
+      };
+
+      context.setTransform(dpr, 0, 0, dpr, 0, 0);
+      context.clearRect(0, 0, width, height);
+      context.translate(transform.x, transform.y);
+      context.scale(k, k);
+
+      // Links: one path for the regular ones, one for those highlighted by the hover.
+      context.lineWidth = 1 / k;
+      context.strokeStyle = '#999';
+      const highlightedLinks: [number, number][] = [];
+      context.beginPath();
+      for (const [s, t] of linkPairs) {
+        if (!visible(s) && !visible(t)) continue;
+        if (hovered !== null && isConnected(s, hovered) && isConnected(t, hovered)) {
+          highlightedLinks.push([s, t]);
+          continue;
+        }
+        context.moveTo(positions[s * 2], positions[s * 2 + 1]);
+        context.lineTo(positions[t * 2], positions[t * 2 + 1]);
+      }
+      context.globalAlpha = hovered === null ? 0.6 : 0.2;
+      context.stroke();
+      if (highlightedLinks.length) {
+        context.beginPath();
+        for (const [s, t] of highlightedLinks) {
+          context.moveTo(positions[s * 2], positions[s * 2 + 1]);
+          context.lineTo(positions[t * 2], positions[t * 2 + 1]);
+        }
+        context.globalAlpha = 1;
+        context.stroke();
+      }
+
+      // Nodes
+      context.lineWidth = 1.5 / k;
+      context.strokeStyle = '#fff';
+      for (let i = 0; i < nodes.length; i++) {
+        if (!visible(i)) continue;
+        context.globalAlpha = hovered === null || isConnected(i, hovered) ? 1 : 0.2;
+        context.beginPath();
+        context.arc(positions[i * 2], positions[i * 2 + 1], NODE_RADIUS, 0, 2 * Math.PI);
+        context.fillStyle = fills[i];
+        context.fill();
+        context.stroke();
+      }
+
+      // Labels, only when zoomed in far enough for them to be readable
+      if (k >= LABEL_ZOOM_THRESHOLD) {
+        context.font = '10px sans-serif';
+        context.fillStyle = '#fff';
+        for (let i = 0; i < nodes.length; i++) {
+          if (!visible(i)) continue;
+          context.globalAlpha = hovered === null || isConnected(i, hovered) ? 1 : 0.2;
+          context.fillText(nodes[i].label, positions[i * 2] + 12, positions[i * 2 + 1] + 5);
+        }
+      }
+      context.globalAlpha = 1;
+      performance.measure('graph-canvas-draw', 'graph-canvas-draw-start');
+    };
+
+    const requestDraw = () => {
+      if (frameRequested) return;
+      frameRequested = true;
+      requestAnimationFrame(draw);
+    };
+
+    // Returns the index of the node under the given canvas-relative point, or null.
+    const findNode = (px: number, py: number): number | null => {
+      if (!tree) {
+        tree = d3.quadtree<number>()
+          .x(i => positions[i * 2])
+          .y(i => positions[i * 2 + 1])
+          .addAll(d3.range(nodes.length));
+      }
+      const [x, y] = transform.invert([px, py]);
+      return tree.find(x, y, NODE_RADIUS) ?? null;
+    };
+    const findNodeAt = (event: MouseEvent) => {
+      const [px, py] = d3.pointer(event, canvas);
+      return findNode(px, py);
+    };
+
+    const worker = new Worker(new URL('../workers/forceLayout.worker.ts', import.meta.url));
+    worker.onmessage = (event: MessageEvent<LayoutWorkerResponse>) => {
+      if (event.data.type === 'positions') {
+        positions = event.data.positions;
+        tree = null;
+        requestDraw();
+      }
+    };
+    const post = (message: LayoutWorkerRequest) => worker.postMessage(message);
+    post({
+      type: 'init',
+      nodes: nodes.map((n, i) => ({ group: n.group, ...startPositions[i] })),
+      links: linkPairs,
+      layout,
+      radius: Math.min(width, height) / 3,
+      isAggregated,
+      alpha: initialAlpha(nodes, layout),
+    });
+
+    const selection = d3.select(canvas);
+
+    // Drag is registered before zoom: when a drag starts on a node it stops the event,
+    // otherwise the gesture falls through to pan/zoom.
+    const drag = d3.drag<HTMLCanvasElement, unknown, { index: number } | null>()
+      .container(canvas)
+      .subject(event => {
+        const index = findNode(event.x, event.y);
+        return index === null ? null : { index };
+      })
+      .on('start drag', event => {
+        const [x, y] = transform.invert([event.x, event.y]);
+        post({ type: 'drag', index: event.subject!.index, x, y });
+      })
+      .on('end', event => {
+        post({ type: 'dragEnd', index: event.subject!.index });
+      });
+
+    const zoom = d3.zoom<HTMLCanvasElement, unknown>()
+      .scaleExtent([0.02, 8])
+      .on('zoom', event => {
+        transform = event.transform;
+        requestDraw();
+      });
+
+    selection
+      .call(drag)
+      .call(zoom)
+      .call(zoom.transform, transform)
+      .on('mousemove.hover', (event: MouseEvent) => {
+        const index = findNodeAt(event);
+        if (index !== hovered) {
+          hovered = index;
+          canvas.style.cursor = index === null ? 'default' : 'pointer';
+          requestDraw();
+        }
+      })
+      .on('mouseleave.hover', () => {
+        if (hovered !== null) {
+          hovered = null;
+          requestDraw();
+        }
+      })
+      .on('click.select', (event: MouseEvent) => {
+        const index = findNodeAt(event);
+        if (index !== null) callbacksRef.current.onNodeClick(nodes[index]);
+      })
+      .on('contextmenu.menu', (event: MouseEvent) => {
+        const index = findNodeAt(event);
+        if (index === null) return;
+        event.preventDefault();
+        callbacksRef.current.onNodeContextMenu(nodes[index], event.pageX, event.pageY);
+      });
+
+    requestDraw();
+
+    return () => {
+      post({ type: 'stop' });
+      worker.terminate();
+      selection.on('.zoom', null).on('.drag', null).on('.hover', null).on('.select', null).on('.menu', null);
+    };
+  }, [graphData, layout, isAggregated]);
+
+  return <canvas ref={canvasRef} className="graph-canvas" />;
+}
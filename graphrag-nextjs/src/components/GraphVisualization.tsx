@@ -3,8 +3,13 @@
 import React, { useEffect, useRef, useState } from 'react';
 import * as d3 from 'd3';
 import { SupabaseClient } from '@supabase/supabase-js';
-import { GraphData, GraphNode, GraphLink } from '@/types';
+import { GraphCursor, GraphData, GraphNode, GraphLink } from '@/types';
+import { fetchGraph, fetchTrace, prefetchTraces, TraceDirection } from '@/lib/graphApi';
+import { initialAlpha, precomputedPosition } from '@/lib/graphLayout';
+import { mergeClusterExpansion } from '@/lib/graphClusters';
+import { mergeGraphData } from '@/lib/graphMerge';
 import ContextMenu from './ContextMenu';
+import GraphCanvas from './GraphCanvas';
 import './GraphVisualization.css';
 
 // Define the shape of d3's simulation node, which includes x, y coordinates
@@ -13,6 +18,12 @@ interface SimulationNode extends GraphNode {
   y?: number;
 }
 
+// Above this many nodes + links, one SVG element per item is too slow; switch to Canvas.
+const CANVAS_ELEMENT_THRESHOLD = 3000;
+
+// Number of graph states kept for undoing traces and expansions
+const MAX_UNDO_STEPS = 20;
+
 interface GraphVisualizationProps {
   supabase: SupabaseClient;
   graphData: GraphData;
@@ -36,10 +47,21 @@ export default function GraphVisualization({
 }: GraphVisualizationProps) {
   const svgRef = useRef<SVGSVGElement>(null);
   const [selectedNode, setSelectedNode] = useState<GraphNode | null>(null);
-  const [hoveredNode, setHoveredNode] = useState<GraphNode | null>(null);
   const [contextMenu, setContextMenu] = useState<{ node: GraphNode; x: number; y: number } | null>(null);
+  // Continuation cursors of nodes whose neighbors have only been partially loaded
+  const neighborCursors = useRef(new Map<string, GraphCursor>());
+  // Graphs before each trace or expansion, most recent last
+  const [undoStack, setUndoStack] = useState<GraphData[]>([]);
+  const graphDataRef = useRef(graphData);
+  graphDataRef.current = graphData;
+  // Graph produced by the last merge or undo here; any other change (reset, chat) starts a new history
+  const ownGraph = useRef<GraphData | null>(null);
+  const useCanvas = graphData.nodes.length + graphData.links.length > CANVAS_ELEMENT_THRESHOLD;
 
-  // D3 rendering effect
+  // D3 rendering effect.
+  // The scene (DOM + simulation) is built once per graphData/layout change. Hovering does not
+  // go through React state: it only restyles the existing elements via the neighbor map.
+  // Large graphs are drawn by GraphCanvas instead, and the SVG is not mounted.
   useEffect(() => {
     if (!svgRef.current || !graphData.nodes.length) {
       d3.select(svgRef.current).selectAll('*').remove();
@@ -73,12 +95,15 @@ export default function GraphVisualization({
         return linkedByIndex.get(a.id)?.has(b.id) || a.id === b.id;
     }
 
-    const simulationNodes: SimulationNode[] = graphData.nodes.map(n => ({...n}));
+    // Start from the precomputed coordinates when the server sent them, so that the
+    // simulation only refines the layout instead of running from scratch.
+    const simulationNodes: SimulationNode[] = graphData.nodes.map(n => ({...n, ...precomputedPosition(n, layout)}));
     const simulationLinks = graphData.links.map(l => ({...l}));
 
     const simulation = d3.forceSimulation(simulationNodes)
         .force('link', d3.forceLink<SimulationNode, GraphLink>(simulationLinks).id(d => d.id).distance(100))
-        .force('charge', d3.forceManyBody().strength(-400));
+        .force('charge', d3.forceManyBody().strength(-400))
+        .alpha(initialAlpha(graphData.nodes, layout));
 
     if (layout === 'radial') {
       const radius = Math.min(width, height) / 3;
@@ -95,7 +120,8 @@ export default function GraphVisualization({
         .attr('class', 'links')
         .selectAll("line")
         .data(simulationLinks)
-        .join("line");
+        .join("line")
+        .style('opacity', 0.6);
 
     const node = svg.append("g")
         .attr('class', 'nodes')
@@ -110,11 +136,11 @@ export default function GraphVisualization({
         })
         .on('contextmenu', (event, d) => {
             event.preventDefault();
-            setContextMenu({ node: d, x: event.pageX, y: event.pageY });
+            openContextMenu(d, event.pageX, event.pageY);
             event.stopPropagation();
         })
-        .on('mouseover', (_event, d) => setHoveredNode(d))
-        .on('mouseout', () => setHoveredNode(null))
+        .on('mouseover', (_event, d) => highlight(d))
+        .on('mouseout', () => highlight(null))
         .call(drag(simulation) as any);
         
     node.append("title").text(d => d.label);
@@ -127,10 +153,16 @@ export default function GraphVisualization({
         .text(d => d.label)
         .attr('x', 12)
         .attr('y', 5);
-        
-    node.style('opacity', n => hoveredNode ? (isConnected(n, hoveredNode) ? 1 : 0.2) : 1);
-    labels.style('opacity', l => hoveredNode ? (isConnected(l, hoveredNode) ? 1 : 0.2) : 1);
-    link.style('opacity', o => hoveredNode ? (isConnected(o.source as SimulationNode, hoveredNode) && isConnected(o.target as SimulationNode, hoveredNode) ? 1 : 0.2) : 0.6);
+
+    // Dim everything that is not the hovered node or one of its direct neighbors.
+    // Only the style of the existing elements changes; nothing is recreated.
+    const highlight = (hovered: SimulationNode | null) => {
+      performance.mark('graph-hover-start');
+      node.style('opacity', n => hovered ? (isConnected(n, hovered) ? 1 : 0.2) : 1);
+      labels.style('opacity', l => hovered ? (isConnected(l, hovered) ? 1 : 0.2) : 1);
+      link.style('opacity', o => hovered ? (isConnected(o.source as SimulationNode, hovered) && isConnected(o.target as SimulationNode, hovered) ? 1 : 0.2) : 0.6);
+      performance.measure('graph-hover', 'graph-hover-start');
+    };
 
     simulation.on("tick", () => {
       link
@@ -148,19 +180,46 @@ export default function GraphVisualization({
         .attr("y", d => d.y! + 5);
     });
 
-  }, [graphData, layout, isAggregated, hoveredNode]);
+    return () => {
+      simulation.stop();
+    };
+  }, [graphData, layout, isAggregated]);
+
+  useEffect(() => {
+    if (graphData !== ownGraph.current) setUndoStack([]);
+  }, [graphData]);
+
+  // Both traces are likely next steps from the menu: start loading them while the user picks.
+  const openContextMenu = (node: GraphNode, x: number, y: number) => {
+    setContextMenu({ node, x, y });
+    if (!node.cluster) prefetchTraces(supabase, node.id);
+  };
+
+  // Applies a change to the graph on screen and remembers the previous graph for undo.
+  const applyGraphChange = (change: (current: GraphData) => GraphData) => {
+    const current = graphDataRef.current;
+    const next = change(current);
+    ownGraph.current = next;
+    setUndoStack(stack => [...stack.slice(-(MAX_UNDO_STEPS - 1)), current]);
+    setGraphData(next);
+  };
+
+  const handleUndo = () => {
+    const previous = undoStack[undoStack.length - 1];
+    if (!previous) return;
+    ownGraph.current = previous;
+    setUndoStack(stack => stack.slice(0, -1));
+    setGraphData(previous);
+  };
 
-  const handleTrace = async (direction: 'UPSTREAM' | 'DOWNSTREAM') => {
+  const handleTrace = async (direction: TraceDirection) => {
     if (!contextMenu) return;
     setIsLoading(true);
     setError(null);
     try {
-      const { data, error } = await supabase.functions.invoke('trace-graph', {
-        body: { nodeId: contextMenu.node.id, direction },
-      });
-      if (error) throw error;
+      const data = await fetchTrace(supabase, contextMenu.node.id, direction);
       if (data && data.nodes && data.links) {
-        setGraphData(data);
+        applyGraphChange(current => mergeGraphData(current, data));
       }
     } catch (err: any) {
       console.error('Failed to trace graph:', err);
@@ -171,6 +230,51 @@ export default function GraphVisualization({
     }
   };
 
+  // Loads the next page of a node's neighbors (most connected first) into the graph.
+  const handleExpandNeighbors = async () => {
+    if (!contextMenu) return;
+    const { node } = contextMenu;
+    setIsLoading(true);
+    setError(null);
+    try {
+      const page = await fetchGraph(supabase, 'get-graph-data', {
+        mode: 'expand',
+        nodeId: node.id,
+        cursor: neighborCursors.current.get(node.id),
+      });
+      if (page.nextCursor) {
+        neighborCursors.current.set(node.id, page.nextCursor);
+      } else {
+        // All neighbors loaded: the next expansion starts over, in case some were removed since.
+        neighborCursors.current.delete(node.id);
+      }
+      applyGraphChange(current => mergeGraphData(current, page));
+    } catch (err: any) {
+      console.error('Failed to expand neighbors:', err);
+      setError(`Failed to expand neighbors: ${err.message}`);
+    } finally {
+      setIsLoading(false);
+      setContextMenu(null);
+    }
+  };
+
+  const handleExpand = async () => {
+    if (!contextMenu?.node.cluster) return;
+    const { node } = contextMenu;
+    setIsLoading(true);
+    setError(null);
+    try {
+      const expansion = await fetchGraph(supabase, 'get-graph-clusters', { level: node.clusterLevel, expand: node.clusterId });
+      applyGraphChange(current => mergeClusterExpansion(current, node.id, expansion));
+    } catch (err: any) {
+      console.error('Failed to expand cluster:', err);
+      setError(`Failed to expand cluster: ${err.message}`);
+    } finally {
+      setIsLoading(false);
+      setContextMenu(null);
+    }
+  };
+
   const drag = (simulation: d3.Simulation<SimulationNode, undefined>) => {
     function dragstarted(event: d3.D3DragEvent<Element, SimulationNode, SimulationNode>) {
       if (!event.active) simulation.alphaTarget(0.3).restart();
@@ -197,7 +301,22 @@ export default function GraphVisualization({
 
   return (
     <div className="graph-container">
-      <svg ref={svgRef}></svg>
+      {useCanvas ? (
+        <GraphCanvas
+          graphData={graphData}
+          layout={layout}
+          isAggregated={isAggregated}
+          onNodeClick={setSelectedNode}
+          onNodeContextMenu={openContextMenu}
+        />
+      ) : (
+        <svg ref={svgRef}></svg>
+      )}
+      {undoStack.length > 0 && (
+        <button className="undo-btn" onClick={handleUndo}>
+          Undo ({undoStack.length})
+        </button>
+      )}
       {contextMenu && (
         <ContextMenu
           node={contextMenu.node}
@@ -205,6 +324,8 @@ export default function GraphVisualization({
           y={contextMenu.y}
           onClose={() => setContextMenu(null)}
           onTrace={handleTrace}
+          onExpand={handleExpand}
+          onExpandNeighbors={handleExpandNeighbors}
         />
       )}
       {selectedNode && (
@@ -215,6 +336,7 @@ export default function GraphVisualization({
             <p><strong>ID:</strong> {selectedNode.id}</p>
             <p><strong>Label:</strong> {selectedNode.label}</p>
             <p><strong>Type:</strong> {selectedNode.type || 'N/A'}</p>
+            {selectedNode.cluster && <p><strong>Members:</strong> {selectedNode.size}</p>}
             <p><strong>Description:</strong> {selectedNode.description || 'No description available.'}</p>
           </div>
         </div>
@@ -1,8 +1,8 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import { SupabaseClient } from '@supabase/supabase-js';
-import { ChatSession } from '@/types';
+import { ChatSession, ChatSessionPage, SessionCursor } from '@/types';
 import './ChatHistorySidebar.css'; 
 
 interface SidebarProps {
@@ -15,31 +15,44 @@ interface SidebarProps {
 
 export default function Sidebar({ supabase, activeSessionId, setActiveSessionId, chatListVersion }: SidebarProps) {
   const [sessions, setSessions] = useState<ChatSession[]>([]);
+  const [nextCursor, setNextCursor] = useState<SessionCursor | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
-  useEffect(() => {
-    const fetchSessions = async () => {
-      try {
-        const { data, error: fetchError } = await supabase.functions.invoke('get-chat-history');
+  // Fetch one page of sessions. Without a cursor the list is replaced, otherwise the page is appended.
+  const fetchSessions = useCallback(async (cursor: SessionCursor | null) => {
+    try {
+      const { data, error: fetchError } = await supabase.functions.invoke<ChatSessionPage>('get-chat-history', {
+        body: { cursor },
+      });
 
-        if (fetchError) throw fetchError;
-        
-        if (Array.isArray(data)) {
-          setSessions(data);
-        } else {
-          console.warn('Received non-array data for sessions:', data);
-          setSessions([]);
-        }
+      if (fetchError) throw fetchError;
 
-      } catch (err: any) {
-        console.error('Failed to fetch chat sessions:', err);
-        setError(`Failed to load sessions: ${err.message}`);
+      if (data && Array.isArray(data.sessions)) {
+        setSessions(prev => (cursor ? [...prev, ...data.sessions] : data.sessions));
+        setNextCursor(data.nextCursor);
+      } else {
+        console.warn('Received unexpected data for sessions:', data);
+        if (!cursor) setSessions([]);
+        setNextCursor(null);
       }
-    };
 
-    fetchSessions();
+    } catch (err: any) {
+      console.error('Failed to fetch chat sessions:', err);
+      setError(`Failed to load sessions: ${err.message}`);
+    }
+  }, [supabase]);
+
+  useEffect(() => {
+    fetchSessions(null);
+  }, [fetchSessions, chatListVersion]); // Dependency on chatListVersion ensures refetch on new chat
 
-  }, [supabase, chatListVersion]); // Dependency on chatListVersion ensures refetch on new chat
+  const handleLoadMore = async () => {
+    if (!nextCursor || isLoadingMore) return;
+    setIsLoadingMore(true);
+    await fetchSessions(nextCursor);
+    setIsLoadingMore(false);
+  };
 
   const handleNewChat = () => {
     setActiveSessionId(null);
@@ -67,6 +80,11 @@ export default function Sidebar({ supabase, activeSessionId, setActiveSessionId,
             </p>
           </div>
         ))}
+        {nextCursor && (
+          <button className="load-more-btn" onClick={handleLoadMore} disabled={isLoadingMore}>
+            {isLoadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        )}
       </div>
     </div>
   );
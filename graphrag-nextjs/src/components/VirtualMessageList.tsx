@@ -0,0 +1,181 @@
+'use client';
+
+import { memo, ReactNode, useCallback, useEffect, useLayoutEffect, useMemo, useRef, useState } from 'react';
+
+interface VirtualMessageListProps<T> {
+  items: T[];
+  getKey: (item: T) => string;
+  // Must be stable (useCallback): rows only re-render when their item changes.
+  renderItem: (item: T) => ReactNode;
+  // Rendered above the first item, e.g. a "load earlier" button
+  header?: ReactNode;
+  className?: string;
+  // Height assumed for rows that have not been measured yet
+  estimatedRowHeight?: number;
+  // Extra height rendered above and below the viewport, in pixels
+  overscan?: number;
+}
+
+interface RowProps<T> {
+  item: T;
+  itemKey: string;
+  renderItem: (item: T) => ReactNode;
+  observer: ResizeObserver | null;
+}
+
+// Rows are memoized on their item: while a response streams in, only the row of the
+// message being written re-renders.
+function RowContent<T>({ item, itemKey, renderItem, observer }: RowProps<T>) {
+  const observe = useCallback((el: HTMLDivElement | null) => {
+    if (!el || !observer) return;
+    observer.observe(el);
+    return () => observer.unobserve(el);
+  }, [observer]);
+  return (
+    <div className="message-row" data-key={itemKey} ref={observe}>
+      {renderItem(item)}
+    </div>
+  );
+}
+
+const Row = memo(RowContent) as typeof RowContent;
+
+// Index of the first row whose bottom edge is below `y`.
+const findRow = (offsets: number[], y: number) => {
+  let lo = 0;
+  let hi = offsets.length - 1;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (offsets[mid + 1] <= y) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+};
+
+const BOTTOM_THRESHOLD = 40;
+
+/**
+ * Scrollable list that only mounts the rows near the viewport. Row heights are
+ * measured with a ResizeObserver as rows render; unmeasured rows use an estimate.
+ *
+ * Scrolling follows the conversation: the list stays pinned to the bottom while the
+ * user is there (and jumps there when a message is appended), and otherwise keeps the
+ * first visible row in place when rows above it are added or change height, e.g.
+ * when earlier messages are loaded.
+ */
+export default function VirtualMessageList<T>({
+  items,
+  getKey,
+  renderItem,
+  header,
+  className,
+  estimatedRowHeight = 80,
+  overscan = 600,
+}: VirtualMessageListProps<T>) {
+  const containerRef = useRef<HTMLDivElement>(null);
+  const listRef = useRef<HTMLDivElement>(null);
+  const heights = useRef(new Map<string, number>());
+  const [measureVersion, setMeasureVersion] = useState(0);
+  const [viewport, setViewport] = useState({ scrollTop: 0, height: 0 });
+  const [observer, setObserver] = useState<ResizeObserver | null>(null);
+  const pinnedToBottom = useRef(true);
+  // First visible row and its distance from the top of the viewport
+  const anchor = useRef<{ key: string; delta: number } | null>(null);
+  const lastKey = useRef<string | null>(null);
+
+  useEffect(() => {
+    const resizeObserver = new ResizeObserver(entries => {
+      let changed = false;
+      for (const entry of entries) {
+        const key = (entry.target as HTMLElement).dataset.key;
+        const height = (entry.target as HTMLElement).offsetHeight;
+        if (key && heights.current.get(key) !== height) {
+          heights.current.set(key, height);
+          changed = true;
+        }
+      }
+      if (changed) setMeasureVersion(v => v + 1);
+    });
+    setObserver(resizeObserver);
+    return () => resizeObserver.disconnect();
+  }, []);
+
+  const keys = useMemo(() => items.map(getKey), [items, getKey]);
+
+  // offsets[i] is the top of row i relative to the list; offsets[n] is the total height.
+  const offsets = useMemo(() => {
+    const result = new Array<number>(keys.length + 1);
+    result[0] = 0;
+    for (let i = 0; i < keys.length; i++) {
+      result[i + 1] = result[i] + (heights.current.get(keys[i]) ?? estimatedRowHeight);
+    }
+    return result;
+    // measureVersion: recompute when a row height changes
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [keys, estimatedRowHeight, measureVersion]);
+
+  const listTop = listRef.current?.offsetTop ?? 0;
+  const windowTop = viewport.scrollTop - listTop - overscan;
+  const windowBottom = viewport.scrollTop - listTop + viewport.height + overscan;
+  const start = keys.length ? findRow(offsets, Math.max(windowTop, 0)) : 0;
+  const end = keys.length ? findRow(offsets, Math.max(windowBottom, 0)) + 1 : 0;
+
+  const updateViewport = useCallback(() => {
+    const container = containerRef.current;
+    if (!container) return;
+    pinnedToBottom.current = container.scrollHeight - container.scrollTop - container.clientHeight < BOTTOM_THRESHOLD;
+    setViewport({ scrollTop: container.scrollTop, height: container.clientHeight });
+  }, []);
+
+  // Record the first visible row after every user scroll, to keep it in place later.
+  const handleScroll = useCallback(() => {
+    const container = containerRef.current;
+    if (!container) return;
+    updateViewport();
+    const y = container.scrollTop - (listRef.current?.offsetTop ?? 0);
+    if (keys.length && y > 0) {
+      const index = findRow(offsets, y);
+      anchor.current = { key: keys[index], delta: offsets[index] - y };
+    } else {
+      anchor.current = null;
+    }
+  }, [keys, offsets, updateViewport]);
+
+  useEffect(() => {
+    updateViewport();
+    window.addEventListener('resize', updateViewport);
+    return () => window.removeEventListener('resize', updateViewport);
+  }, [updateViewport]);
+
+  useLayoutEffect(() => {
+    const container = containerRef.current;
+    if (!container) return;
+    const newest = keys.length ? keys[keys.length - 1] : null;
+    if (newest !== lastKey.current) {
+      // A message was appended or another session was opened
+      lastKey.current = newest;
+      pinnedToBottom.current = true;
+    }
+    let target: number | null = null;
+    if (pinnedToBottom.current) {
+      target = container.scrollHeight - container.clientHeight;
+    } else if (anchor.current) {
+      const index = keys.indexOf(anchor.current.key);
+      if (index >= 0) target = (listRef.current?.offsetTop ?? 0) + offsets[index] - anchor.current.delta;
+    }
+    if (target !== null && Math.abs(container.scrollTop - target) > 1) {
+      container.scrollTop = target;
+    }
+  }, [keys, offsets]);
+
+  return (
+    <div className={className} ref={containerRef} onScroll={handleScroll}>
+      {header}
+      <div ref={listRef} style={{ paddingTop: offsets[start], paddingBottom: offsets[keys.length] - offsets[end] }}>
+        {items.slice(start, end).map((item, i) => (
+          <Row key={keys[start + i]} item={item} itemKey={keys[start + i]} renderItem={renderItem} observer={observer} />
+        ))}
+      </div>
+    </div>
+  );
+}
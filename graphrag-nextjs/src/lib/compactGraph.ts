@@ -0,0 +1,51 @@
+import { CompactColumn, CompactGraphData, GraphData, GraphLink, GraphNode } from '@/types';
+
+// Value of the `format` request field that asks the graph functions for the compact format.
+export const COMPACT_FORMAT = 'compact';
+
+const isCompactGraph = (data: unknown): data is CompactGraphData =>
+  typeof data === 'object' && data !== null && (data as CompactGraphData).format === 'compact-v1';
+
+const applyColumns = (rows: Record<string, unknown>[], columns: CompactColumn[], strings: string[]) => {
+  for (const column of columns) {
+    const key = strings[column.key];
+    for (let i = 0; i < rows.length; i++) {
+      const value = column.values[i];
+      if (column.interned) {
+        if ((value as number) >= 0) rows[i][key] = strings[value as number];
+      } else if (value !== null) {
+        rows[i][key] = value;
+      }
+    }
+  }
+};
+
+/**
+ * Turns a graph function response into GraphData. Accepts both the compact
+ * columnar format and the verbose format, so callers do not need to care which
+ * one the server sent. Mirrors supabase/functions/_shared/compactGraph.ts.
+ */
+export function decodeGraphData(data: GraphData | CompactGraphData): GraphData {
+  if (!isCompactGraph(data)) return data;
+
+  const { strings } = data;
+  const nodes: GraphNode[] = data.nodes.id.map((id, i) => {
+    const node: GraphNode = { id, label: strings[data.nodes.label[i]] };
+    const group = data.nodes.group[i];
+    if (group >= 0) node.group = strings[group];
+    return node;
+  });
+  applyColumns(nodes as unknown as Record<string, unknown>[], data.nodes.props, strings);
+
+  // An endpoint without a node index was sent on an earlier page; its id is in sourceId / targetId.
+  const endpoint = (index: number, idColumn: number[] | undefined, i: number): string =>
+    index >= 0 ? nodes[index].id : strings[idColumn?.[i] ?? -1];
+  const links: GraphLink[] = data.links.source.map((source, i) => ({
+    source: endpoint(source, data.links.sourceId, i),
+    target: endpoint(data.links.target[i], data.links.targetId, i),
+    label: strings[data.links.label[i]],
+  }));
+  applyColumns(links as unknown as Record<string, unknown>[], data.links.props, strings);
+
+  return data.nextCursor === undefined ? { nodes, links } : { nodes, links, nextCursor: data.nextCursor };
+}
@@ -0,0 +1,47 @@
+export interface FrameBatcher {
+  /** Queues a chunk; it is delivered with the next animation frame. */
+  push: (chunk: string) => void;
+  /** Delivers whatever is queued right away, e.g. when the stream ends. */
+  flush: () => void;
+  /** Drops whatever is queued without delivering it. */
+  cancel: () => void;
+}
+
+/**
+ * Coalesces streamed text into at most one update per animation frame. A model
+ * response arrives as many small network chunks, often several per frame; applying
+ * each one to React state would render once per chunk instead of once per frame.
+ */
+export function createFrameBatcher(deliver: (text: string) => void): FrameBatcher {
+  let pending = '';
+  let frame: number | null = null;
+
+  const flush = () => {
+    if (frame !== null) {
+      cancelAnimationFrame(frame);
+      frame = null;
+    }
+    if (!pending) return;
+    const text = pending;
+    pending = '';
+    deliver(text);
+  };
+
+  return {
+    push: (chunk: string) => {
+      pending += chunk;
+      if (frame === null) {
+        frame = requestAnimationFrame(() => {
+          frame = null;
+          flush();
+        });
+      }
+    },
+    flush,
+    cancel: () => {
+      if (frame !== null) cancelAnimationFrame(frame);
+      frame = null;
+      pending = '';
+    },
+  };
+}
@@ -0,0 +1,52 @@
+export interface FrameStats {
+  frames: number;
+  meanMs: number;
+  p50Ms: number;
+  p95Ms: number;
+  maxMs: number;
+}
+
+const percentile = (sorted: number[], p: number) =>
+  sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))] : 0;
+
+/**
+ * Samples requestAnimationFrame intervals for `durationMs` and reports frame time
+ * statistics. Start it, then interact with the page (hover nodes, drag, zoom).
+ *
+ * In development it is exposed as `window.measureFrames`, e.g.
+ * `await measureFrames(5000)` from the browser console while hovering a large graph
+ * loaded with `?synthetic=5000`.
+ */
+export function measureFrames(durationMs = 5000): Promise<FrameStats> {
+  return new Promise(resolve => {
+    const intervals: number[] = [];
+    const start = performance.now();
+    let last = start;
+
+    const tick = (now: number) => {
+      intervals.push(now - last);
+      last = now;
+      if (now - start < durationMs) {
+        requestAnimationFrame(tick);
+        return;
+      }
+      const sorted = [...intervals].sort((a, b) => a - b);
+      const stats: FrameStats = {
+        frames: intervals.length,
+        meanMs: intervals.reduce((sum, v) => sum + v, 0) / Math.max(intervals.length, 1),
+        p50Ms: percentile(sorted, 0.5),
+        p95Ms: percentile(sorted, 0.95),
+        maxMs: sorted[sorted.length - 1] ?? 0,
+      };
+      const hovers = performance.getEntriesByName('graph-hover');
+      if (hovers.length) {
+        console.table({ ...stats, hoverUpdates: hovers.length, hoverMeanMs: hovers.reduce((s, e) => s + e.duration, 0) / hovers.length });
+        performance.clearMeasures('graph-hover');
+      } else {
+        console.table(stats);
+      }
+      resolve(stats);
+    };
+    requestAnimationFrame(tick);
+  });
+}
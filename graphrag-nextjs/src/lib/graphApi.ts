@@ -0,0 +1,168 @@
+import { SupabaseClient } from '@supabase/supabase-js';
+import { ClusterLevel, CompactGraphData, GraphData } from '@/types';
+import { COMPACT_FORMAT, decodeGraphData } from '@/lib/compactGraph';
+
+// Number of validated graph responses kept for conditional requests
+const MAX_VALIDATED_RESPONSES = 50;
+
+interface ValidatedResponse {
+  etag: string;
+  data: GraphData;
+}
+
+// Responses keyed by function name + request body. Map order doubles as LRU order.
+const validatedResponses = new Map<string, ValidatedResponse>();
+
+const cloneGraph = (data: GraphData): GraphData => ({
+  ...data,
+  nodes: data.nodes.map(n => ({ ...n })),
+  links: data.links.map(l => ({ ...l })),
+});
+
+/**
+ * Calls one of the graph Edge Functions (get-graph-data, trace-graph, get-graph-clusters) in the compact
+ * format, revalidating previously fetched responses with If-None-Match.
+ *
+ * The graph functions cache responses per published graph version and answer 304
+ * when the ETag still matches, in which case the locally kept copy is returned.
+ * supabase.functions.invoke treats 304 as an error, so this uses fetch directly.
+ */
+export async function fetchGraph(
+  supabase: SupabaseClient,
+  functionName: 'get-graph-data' | 'trace-graph' | 'get-graph-clusters',
+  body: Record<string, unknown> = {},
+): Promise<GraphData> {
+  const requestBody = { ...body, format: COMPACT_FORMAT };
+  const cacheKey = `${functionName}:${JSON.stringify(requestBody)}`;
+  const previous = validatedResponses.get(cacheKey);
+
+  const { data: { session } } = await supabase.auth.getSession();
+  const headers: Record<string, string> = {
+    'Content-Type': 'application/json',
+    'Authorization': `Bearer ${session?.access_token}`,
+  };
+  if (previous) headers['If-None-Match'] = previous.etag;
+
+  const response = await fetch(`${process.env.NEXT_PUBLIC_SUPABASE_URL}/functions/v1/${functionName}`, {
+    method: 'POST',
+    headers,
+    body: JSON.stringify(requestBody),
+  });
+
+  if (response.status === 304 && previous) {
+    validatedResponses.delete(cacheKey);
+    validatedResponses.set(cacheKey, previous);
+    // d3 mutates node and link objects in place, so never hand out the stored copy itself.
+    return cloneGraph(previous.data);
+  }
+  if (!response.ok) {
+    throw new Error(await response.text() || `${functionName} failed with status ${response.status}`);
+  }
+
+  const data = decodeGraphData(await response.json() as GraphData | CompactGraphData);
+  const etag = response.headers.get('ETag');
+  if (etag) {
+    validatedResponses.delete(cacheKey);
+    validatedResponses.set(cacheKey, { etag, data: cloneGraph(data) });
+    if (validatedResponses.size > MAX_VALIDATED_RESPONSES) {
+      validatedResponses.delete(validatedResponses.keys().next().value!);
+    }
+  }
+  return data;
+}
+
+export type TraceDirection = 'UPSTREAM' | 'DOWNSTREAM';
+
+// Memory budget of the trace cache, estimated from the JSON size of the cached subgraphs
+const TRACE_CACHE_BYTES = 16 * 1024 * 1024;
+// Cached traces are used without asking the server for this long
+const TRACE_CACHE_MAX_AGE_MS = 10 * 60 * 1000;
+
+interface CachedTrace {
+  data: GraphData;
+  bytes: number;
+  fetchedAt: number;
+}
+
+// Trace results keyed by node id + direction. Map order doubles as LRU order.
+const traceCache = new Map<string, CachedTrace>();
+let traceCacheBytes = 0;
+// Traces being fetched, so that a click during a prefetch waits for it instead of fetching again
+const pendingTraces = new Map<string, Promise<GraphData>>();
+
+const traceKey = (nodeId: string, direction: TraceDirection) => `${direction}:${nodeId}`;
+
+const evictTrace = (key: string) => {
+  const entry = traceCache.get(key);
+  if (!entry) return;
+  traceCache.delete(key);
+  traceCacheBytes -= entry.bytes;
+};
+
+const storeTrace = (key: string, data: GraphData) => {
+  // UTF-16 strings: about two bytes per character of the serialized graph
+  const bytes = JSON.stringify(data).length * 2;
+  evictTrace(key);
+  if (bytes > TRACE_CACHE_BYTES) return;
+  traceCache.set(key, { data: cloneGraph(data), bytes, fetchedAt: Date.now() });
+  traceCacheBytes += bytes;
+  while (traceCacheBytes > TRACE_CACHE_BYTES) {
+    evictTrace(traceCache.keys().next().value!);
+  }
+};
+
+const loadTrace = (supabase: SupabaseClient, nodeId: string, direction: TraceDirection) => {
+  const key = traceKey(nodeId, direction);
+  let pending = pendingTraces.get(key);
+  if (!pending) {
+    pending = fetchGraph(supabase, 'trace-graph', { nodeId, direction })
+      .then(data => {
+        storeTrace(key, data);
+        return data;
+      })
+      .finally(() => pendingTraces.delete(key));
+    pendingTraces.set(key, pending);
+  }
+  return pending;
+};
+
+/**
+ * Returns the upstream or downstream subgraph of a node from trace-graph. Results are
+ * kept in a byte-bounded LRU for a few minutes, so going back and forth between traces
+ * does not hit the network.
+ */
+export async function fetchTrace(supabase: SupabaseClient, nodeId: string, direction: TraceDirection): Promise<GraphData> {
+  const key = traceKey(nodeId, direction);
+  const cached = traceCache.get(key);
+  if (cached && Date.now() - cached.fetchedAt < TRACE_CACHE_MAX_AGE_MS) {
+    traceCache.delete(key);
+    traceCache.set(key, cached);
+    return cloneGraph(cached.data);
+  }
+  // The pending promise is shared with prefetches; each caller gets its own copy.
+  return cloneGraph(await loadTrace(supabase, nodeId, direction));
+}
+
+/**
+ * Starts loading both traces of a node into the cache, e.g. when its context menu
+ * opens, so that picking one of them is answered locally. Failures are ignored here;
+ * a later fetchTrace retries and reports them.
+ */
+export function prefetchTraces(supabase: SupabaseClient, nodeId: string) {
+  for (const direction of ['UPSTREAM', 'DOWNSTREAM'] as const) {
+    const cached = traceCache.get(traceKey(nodeId, direction));
+    if (cached && Date.now() - cached.fetchedAt < TRACE_CACHE_MAX_AGE_MS) continue;
+    loadTrace(supabase, nodeId, direction).catch(() => {});
+  }
+}
+
+/**
+ * Lists the aggregation levels available from get-graph-clusters, finest first.
+ */
+export async function fetchClusterLevels(supabase: SupabaseClient): Promise<ClusterLevel[]> {
+  const { data, error } = await supabase.functions.invoke<{ levels: ClusterLevel[] }>('get-graph-clusters', {
+    body: { levels: true },
+  });
+  if (error) throw error;
+  return data?.levels ?? [];
+}
@@ -0,0 +1,53 @@
+import { GraphData, GraphLink, GraphNode } from '@/types';
+
+const endpointId = (endpoint: string | number | GraphNode) =>
+  typeof endpoint === 'object' ? endpoint.id : String(endpoint);
+
+/**
+ * Replaces a collapsed cluster node with the members returned by get-graph-clusters.
+ *
+ * The expansion carries node-level edges. An edge whose outside endpoint is on screen
+ * (because its cluster was expanded earlier) is kept as is; otherwise it is attached to
+ * the outside endpoint's cluster node, and parallel edges are merged into one weighted link.
+ */
+export function mergeClusterExpansion(graph: GraphData, clusterNodeId: string, expansion: GraphData): GraphData {
+  const nodes = graph.nodes.filter(n => n.id !== clusterNodeId);
+  const present = new Set(nodes.map(n => n.id));
+  for (const node of expansion.nodes) {
+    if (!present.has(node.id)) {
+      nodes.push(node);
+      present.add(node.id);
+    }
+  }
+
+  // Drop the collapsed cluster's links, and d3's object references along with them.
+  const links: GraphLink[] = graph.links
+    .map(l => ({ ...l, source: endpointId(l.source), target: endpointId(l.target) }))
+    .filter(l => l.source !== clusterNodeId && l.target !== clusterNodeId);
+
+  const aggregated = new Map<string, GraphLink>();
+  for (const link of expansion.links) {
+    let source = endpointId(link.source);
+    let target = endpointId(link.target);
+    const direct = present.has(source) && present.has(target);
+    if (!present.has(source) && link.otherCluster) source = link.otherCluster;
+    if (!present.has(target) && link.otherCluster) target = link.otherCluster;
+    // The outside endpoint is neither shown nor collapsed into a shown cluster
+    if (!present.has(source) || !present.has(target)) continue;
+
+    if (direct) {
+      links.push({ ...link, source, target });
+      continue;
+    }
+    const key = `${source}->${target}`;
+    const existing = aggregated.get(key);
+    if (existing) {
+      existing.weight = (existing.weight ?? 1) + 1;
+    } else {
+      aggregated.set(key, { source, target, label: link.label, weight: 1 });
+    }
+  }
+  links.push(...aggregated.values());
+
+  return { nodes, links };
+}
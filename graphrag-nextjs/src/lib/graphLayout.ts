@@ -0,0 +1,24 @@
+import { GraphNode } from '@/types';
+
+// Starting alpha when every node comes with a precomputed position: the simulation only
+// refines the offline layout for a few dozen ticks instead of settling from scratch.
+export const REFINE_ALPHA = 0.1;
+
+/**
+ * Precomputed position of a node for the given layout, as attached by the graph
+ * functions (see supabase/compute_graph_layout.py), or an empty object when the node
+ * has none and d3 has to place it.
+ */
+export function precomputedPosition(node: GraphNode, layout: 'force' | 'radial'): { x?: number; y?: number } {
+  const x = layout === 'radial' ? node.radialX : node.layoutX;
+  const y = layout === 'radial' ? node.radialY : node.layoutY;
+  return x === undefined || y === undefined ? {} : { x, y };
+}
+
+/**
+ * Starting alpha for a simulation over these nodes: REFINE_ALPHA when all of them have
+ * a precomputed position, otherwise a full run from alpha 1.
+ */
+export function initialAlpha(nodes: GraphNode[], layout: 'force' | 'radial'): number {
+  return nodes.every(n => precomputedPosition(n, layout).x !== undefined) ? REFINE_ALPHA : 1;
+}
@@ -0,0 +1,34 @@
+import { GraphData, GraphLink, GraphNode } from '@/types';
+
+const endpointId = (endpoint: string | number | GraphNode) =>
+  typeof endpoint === 'object' ? endpoint.id : String(endpoint);
+
+const linkKey = (link: GraphLink) => `${endpointId(link.source)}->${endpointId(link.target)}:${link.label}`;
+
+/**
+ * Adds one page of get-graph-data results to the graph already on screen.
+ * Nodes already present are kept as they are; links are deduplicated by endpoints
+ * and type, and links whose endpoints are not (yet) loaded are left out.
+ */
+export function mergeGraphData(current: GraphData, page: GraphData): GraphData {
+  const nodes = [...current.nodes];
+  const present = new Set(nodes.map(n => n.id));
+  for (const node of page.nodes) {
+    if (!present.has(node.id)) {
+      nodes.push(node);
+      present.add(node.id);
+    }
+  }
+
+  // d3 replaces link endpoints with node objects; go back to ids for the next render.
+  const links: GraphLink[] = current.links.map(l => ({ ...l, source: endpointId(l.source), target: endpointId(l.target) }));
+  const seen = new Set(links.map(linkKey));
+  for (const link of page.links) {
+    const key = linkKey(link);
+    if (seen.has(key) || !present.has(endpointId(link.source)) || !present.has(endpointId(link.target))) continue;
+    seen.add(key);
+    links.push(link);
+  }
+
+  return { nodes, links };
+}
@@ -0,0 +1,28 @@
+import { mulberry32 } from '@/lib/syntheticGraph';
+
+export interface SyntheticMessage {
+  id: number;
+  role: 'user' | 'assistant';
+  content: string;
+  hasThinking: boolean;
+}
+
+const MODULES = ['Core', 'CoreUObject', 'Engine', 'Renderer', 'RHI', 'Slate', 'SlateCore', 'UMG', 'Niagara', 'Chaos'];
+
+/**
+ * Builds a reproducible chat session for render measurements in the browser:
+ * alternating questions and answers of varying length, so that message heights differ.
+ */
+export function generateSyntheticChat(messageCount: number, seed = 42): SyntheticMessage[] {
+  const random = mulberry32(seed);
+  const pick = () => MODULES[Math.floor(random() * MODULES.length)];
+  return Array.from({ length: messageCount }, (_, i) => {
+    const isUser = i % 2 === 0;
+    const sentences = isUser ? 1 : 1 + Math.floor(random() * 8);
+    const content = Array.from({ length: sentences }, () => isUser
+      ? `What does ${pick()} depend on, and who depends on ${pick()}?`
+      : `${pick()} has a public dependency on ${pick()} and a private dependency on ${pick()}.`
+    ).join(' ');
+    return { id: i + 1, role: isUser ? 'user' : 'assistant', content, hasThinking: !isUser && random() < 0.3 };
+  });
+}
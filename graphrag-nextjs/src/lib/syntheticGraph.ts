@@ -0,0 +1,46 @@
+import { GraphData, GraphLink, GraphNode } from '@/types';
+
+const LABELS = ['Module', 'System', 'Subsystem', 'Class', 'Interface'];
+const DEPENDENCY_TYPES = [
+  'PublicDependencyModuleNames',
+  'PrivateDependencyModuleNames',
+  'PublicIncludePathModuleNames',
+  'PrivateIncludePathModuleNames',
+];
+
+// Small deterministic PRNG so that measurements are repeatable.
+export const mulberry32 = (seed: number) => () => {
+  seed |= 0;
+  seed = (seed + 0x6D2B79F5) | 0;
+  let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+  t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+  return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+
+/**
+ * Builds a reproducible graph shaped like a trace-graph result, for performance
+ * measurements in the browser. Targets are skewed towards low ids so that a few
+ * hub nodes (like Core) collect most of the edges.
+ */
+export function generateSyntheticGraph(nodeCount: number, edgesPerNode = 3, seed = 42): GraphData {
+  const random = mulberry32(seed);
+  const nodes: GraphNode[] = Array.from({ length: nodeCount }, (_, i) => ({
+    id: String(i),
+    label: `Module${i}`,
+    type: LABELS[Math.floor(random() * LABELS.length)],
+  }));
+  nodes.forEach(node => { node.group = node.type; });
+
+  const links: GraphLink[] = [];
+  for (let i = 1; i < nodeCount; i++) {
+    for (let e = 0; e < edgesPerNode; e++) {
+      const target = Math.floor(random() ** 3 * i);
+      links.push({
+        source: nodes[i].id,
+        target: nodes[target].id,
+        label: DEPENDENCY_TYPES[Math.floor(random() * DEPENDENCY_TYPES.length)],
+      });
+    }
+  }
+  return { nodes, links };
+}
@@ -10,6 +10,18 @@ export interface GraphNode extends d3.SimulationNodeDatum {
   type?: string;
   description?: string;
   group?: string; // Used for coloring nodes when aggregated
+  // Precomputed coordinates for the "force" and "radial" layouts, when available
+  layoutX?: number;
+  layoutY?: number;
+  radialX?: number;
+  radialY?: number;
+  // Set on the super-nodes returned by get-graph-clusters
+  cluster?: boolean;
+  clusterLevel?: string;
+  clusterId?: string;
+  size?: number;
+  // Set on the members of an expanded cluster: id of the cluster node they replaced
+  memberOf?: string;
 }
 
 /**
@@ -19,6 +31,10 @@ export interface GraphNode extends d3.SimulationNodeDatum {
  */
 export interface GraphLink extends d3.SimulationLinkDatum<GraphNode> {
   label: string;
+  // Number of aggregated edges, on links between clusters
+  weight?: number;
+  // On links of a cluster expansion: the cluster node of the outside endpoint
+  otherCluster?: string | null;
 }
 
 /**
@@ -27,6 +43,62 @@ export interface GraphLink extends d3.SimulationLinkDatum<GraphNode> {
 export interface GraphData {
   nodes: GraphNode[];
   links: GraphLink[];
+  // Set by the paginated get-graph-data modes: pass it back to get the next page, null on the last one
+  nextCursor?: GraphCursor | null;
+}
+
+/**
+ * Keyset cursor for the paginated get-graph-data modes, which order nodes by
+ * descending degree. It holds the (degree, id) of the last node already loaded.
+ */
+export interface GraphCursor {
+  degree: number;
+  id: string;
+}
+
+/**
+ * A property column of the compact graph format. When `interned` is true the values
+ * are indexes into the string table (-1 = missing), otherwise they are raw JSON values.
+ */
+export interface CompactColumn {
+  key: number;
+  interned: boolean;
+  values: unknown[];
+}
+
+/**
+ * Compact columnar wire format returned by get-graph-data and trace-graph when the
+ * request body contains `format: 'compact'`. Strings are stored once in `strings`,
+ * and links reference nodes by their index in the node arrays. A link to a node sent
+ * on an earlier page has -1 there, and `sourceId` / `targetId` hold the string-table
+ * index of that node's id instead.
+ * Decode it with `decodeGraphData` from '@/lib/compactGraph'.
+ */
+export interface CompactGraphData {
+  format: 'compact-v1';
+  strings: string[];
+  nodes: { id: string[]; label: number[]; group: number[]; props: CompactColumn[] };
+  links: {
+    source: number[];
+    target: number[];
+    label: number[];
+    props: CompactColumn[];
+    sourceId?: number[];
+    targetId?: number[];
+  };
+  nextCursor?: GraphCursor | null;
+}
+
+/**
+ * An aggregation level served by get-graph-clusters: "label" (one cluster per node
+ * label) or "community-N" (detected communities, coarser as N grows).
+ */
+export interface ClusterLevel {
+  level: string;
+  kind: 'label' | 'community';
+  ordinal: number;
+  cluster_count: number;
+  edge_count: number;
 }
 
 /**
@@ -36,4 +108,54 @@ export interface ChatSession {
   session_id: string;
   first_message: string;
   last_updated: string;
+  message_count?: number;
+}
+
+/**
+ * Keyset cursor for paging through chat sessions, newest first.
+ * It holds the (last_updated, session_id) of the last session already loaded.
+ */
+export interface SessionCursor {
+  lastUpdated: string;
+  sessionId: string;
+}
+
+/**
+ * One page of chat sessions as returned by the get-chat-history function.
+ */
+export interface ChatSessionPage {
+  sessions: ChatSession[];
+  nextCursor: SessionCursor | null;
+}
+
+/**
+ * A stored chat message as returned by the get-chat-history function.
+ * thinking_steps is null unless it was explicitly requested; has_thinking tells
+ * whether there is anything to fetch.
+ */
+export interface ChatMessageRow {
+  id: number;
+  created_at: string;
+  session_id: string;
+  role: 'user' | 'assistant';
+  content: string;
+  thinking_steps: string | null;
+  has_thinking: boolean;
+}
+
+/**
+ * Keyset cursor for paging backwards through a session's messages.
+ * It holds the (created_at, id) of the oldest message already loaded.
+ */
+export interface MessageCursor {
+  createdAt: string;
+  id: number;
+}
+
+/**
+ * One page of messages, newest first.
+ */
+export interface ChatMessagePage {
+  messages: ChatMessageRow[];
+  nextCursor: MessageCursor | null;
 }
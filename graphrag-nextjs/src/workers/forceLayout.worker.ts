@@ -0,0 +1,106 @@
+import { forceCenter, forceLink, forceManyBody, forceRadial, forceSimulation, Simulation, SimulationNodeDatum } from 'd3';
+import type { LayoutWorkerRequest, LayoutWorkerResponse } from './forceLayoutProtocol';
+
+// Runs the d3 force simulation off the main thread for GraphCanvas.
+// Positions are posted back as a Float32Array [x0, y0, x1, y1, ...] whose buffer is
+// transferred, so no per-node objects cross the thread boundary.
+
+interface WorkerNode extends SimulationNodeDatum {
+  group?: string;
+}
+
+// Upper bound on uninterrupted simulation work before positions are posted back.
+const TICK_BUDGET_MS = 12;
+
+// The project compiles against the DOM lib, so describe the worker scope we rely on.
+interface LayoutWorkerScope {
+  postMessage(message: LayoutWorkerResponse, transfer?: Transferable[]): void;
+  onmessage: ((event: MessageEvent<LayoutWorkerRequest>) => void) | null;
+}
+
+const ctx = self as unknown as LayoutWorkerScope;
+let simulation: Simulation<WorkerNode, undefined> | null = null;
+let nodes: WorkerNode[] = [];
+let running = false;
+
+const postPositions = () => {
+  const positions = new Float32Array(nodes.length * 2);
+  for (let i = 0; i < nodes.length; i++) {
+    positions[i * 2] = nodes[i].x ?? 0;
+    positions[i * 2 + 1] = nodes[i].y ?? 0;
+  }
+  const message: LayoutWorkerResponse = { type: 'positions', positions, alpha: simulation?.alpha() ?? 0 };
+  ctx.postMessage(message, [positions.buffer]);
+};
+
+// Tick in time-boxed slices so that drag messages are handled between slices.
+const run = () => {
+  if (!simulation) {
+    running = false;
+    return;
+  }
+  running = true;
+  const start = performance.now();
+  while (performance.now() - start < TICK_BUDGET_MS && simulation.alpha() >= simulation.alphaMin()) {
+    simulation.tick();
+  }
+  postPositions();
+  if (simulation.alpha() >= simulation.alphaMin()) {
+    setTimeout(run, 0);
+  } else {
+    running = false;
+    ctx.postMessage({ type: 'settled' } satisfies LayoutWorkerResponse);
+  }
+};
+
+const ensureRunning = () => {
+  if (!running) run();
+};
+
+ctx.onmessage = (event: MessageEvent<LayoutWorkerRequest>) => {
+  const message = event.data;
+  switch (message.type) {
+    case 'init': {
+      simulation?.stop();
+      nodes = message.nodes.map(n => ({ group: n.group, x: n.x, y: n.y }));
+      const links = message.links.map(([source, target]) => ({ source, target }));
+
+      simulation = forceSimulation(nodes)
+        .force('link', forceLink(links).distance(100))
+        .force('charge', forceManyBody().strength(-400))
+        .force('center', forceCenter(0, 0))
+        .alpha(message.alpha)
+        .stop();
+
+      if (message.layout === 'radial') {
+        const { radius, isAggregated } = message;
+        simulation.force('r', forceRadial<WorkerNode>(d => (isAggregated && d.group === 'center' ? 0 : radius)).strength(0.7));
+      }
+      ensureRunning();
+      break;
+    }
+    case 'drag': {
+      const node = nodes[message.index];
+      if (!node || !simulation) return;
+      node.fx = message.x;
+      node.fy = message.y;
+      simulation.alphaTarget(0.3);
+      if (simulation.alpha() < 0.3) simulation.alpha(0.3);
+      ensureRunning();
+      break;
+    }
+    case 'dragEnd': {
+      const node = nodes[message.index];
+      if (!node || !simulation) return;
+      node.fx = null;
+      node.fy = null;
+      simulation.alphaTarget(0);
+      break;
+    }
+    case 'stop':
+      simulation?.stop();
+      simulation = null;
+      nodes = [];
+      break;
+  }
+};
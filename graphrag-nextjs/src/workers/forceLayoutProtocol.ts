@@ -0,0 +1,21 @@
+// Messages exchanged between GraphCanvas and forceLayout.worker.ts.
+// Nodes and links are referenced by their index in graphData.nodes.
+
+export type LayoutWorkerRequest =
+  | {
+      type: 'init';
+      nodes: { group?: string; x?: number; y?: number }[];
+      links: [number, number][];
+      layout: 'force' | 'radial';
+      radius: number;
+      isAggregated: boolean;
+      // Starting alpha: 1 for a fresh layout, lower to only refine known positions
+      alpha: number;
+    }
+  | { type: 'drag'; index: number; x: number; y: number }
+  | { type: 'dragEnd'; index: number }
+  | { type: 'stop' };
+
+export type LayoutWorkerResponse =
+  | { type: 'positions'; positions: Float32Array; alpha: number }
+  | { type: 'settled' };
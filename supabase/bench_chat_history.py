@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import uuid
+import statistics
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from dotenv import load_dotenv
+from supabase import create_client, Client
+
+# 加载环境变量
+load_dotenv('.env.local')
+
+SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+if not all([SUPABASE_URL, SUPABASE_KEY]):
+    raise ValueError("请确保 .env.local 文件中已设置 SUPABASE_URL 和 SUPABASE_SERVICE_ROLE_KEY")
+
+supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+FUNCTION_URL = f"{SUPABASE_URL}/functions/v1/get-chat-history"
+
+# 合成会话规模与每条思考过程的长度（接近真实模型输出的量级）
+MESSAGE_COUNT = 10_000
+THINKING_CHARS = 2_000
+INSERT_BATCH_SIZE = 500
+RUNS = 5
+
+def seed_synthetic_session(session_id, message_count=MESSAGE_COUNT):
+    """写入一个合成会话：用户/助手消息交替，助手消息带有较长的 thinking_steps"""
+    print(f"正在写入合成会话 {session_id}（{message_count} 条消息）...")
+    base_time = datetime.now(timezone.utc) - timedelta(seconds=message_count)
+    thinking = ("首先分析上下文中的模块依赖关系，然后逐步推理。" * (THINKING_CHARS // 24 + 1))[:THINKING_CHARS]
+
+    rows = []
+    for i in range(message_count):
+        is_user = i % 2 == 0
+        rows.append({
+            "session_id": session_id,
+            "created_at": (base_time + timedelta(seconds=i)).isoformat(),
+            "role": "user" if is_user else "assistant",
+            "content": f"关于模块 Module_{i} 的问题？" if is_user else f"Module_{i} 公开依赖 Core 和 CoreUObject。",
+            "thinking_steps": None if is_user else thinking,
+        })
+        if len(rows) == INSERT_BATCH_SIZE:
+            supabase.table("chat_history").insert(rows).execute()
+            rows = []
+    if rows:
+        supabase.table("chat_history").insert(rows).execute()
+    print("✅ 合成会话写入完成")
+
+def cleanup_session(session_id):
+    """删除合成会话及其摘要行"""
+    supabase.table("chat_history").delete().eq("session_id", session_id).execute()
+    supabase.table("chat_sessions").delete().eq("session_id", session_id).execute()
+    print(f"🧹 已删除合成会话 {session_id}")
+
+def time_request(client, payload=None, direct_select_session=None):
+    """执行一次请求，返回 (耗时毫秒, 响应字节数)"""
+    start = time.perf_counter()
+    if direct_select_session:
+        # 旧实现：一次性 select("*") 整个会话
+        response = client.get(
+            f"{SUPABASE_URL}/rest/v1/chat_history",
+            params={"select": "*", "session_id": f"eq.{direct_select_session}", "order": "created_at.asc"},
+        )
+    else:
+        response = client.post(FUNCTION_URL, json=payload)
+    response.raise_for_status()
+    body = response.content
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return elapsed_ms, len(body)
+
+def run_case(client, name, **kwargs):
+    """重复执行某个场景并打印中位数/最大值"""
+    latencies = []
+    sizes = []
+    for _ in range(RUNS):
+        elapsed_ms, size = time_request(client, **kwargs)
+        latencies.append(elapsed_ms)
+        sizes.append(size)
+    print(f"  {name:<36} 中位延迟 {statistics.median(latencies):8.1f} ms  "
+          f"最大延迟 {max(latencies):8.1f} ms  响应大小 {statistics.median(sizes) / 1024:9.1f} KiB")
+    return {"name": name, "median_ms": statistics.median(latencies), "max_ms": max(latencies), "bytes": statistics.median(sizes)}
+
+def benchmark(session_id):
+    headers = {
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "apikey": SUPABASE_KEY,
+        # PostgREST 默认限制 max_rows，这里显式请求全部数据以复现旧行为
+        "Range-Unit": "items",
+        "Range": f"0-{MESSAGE_COUNT - 1}",
+    }
+    with httpx.Client(headers=headers, timeout=120) as client:
+        print(f"\n=== get-chat-history 基准测试（{MESSAGE_COUNT} 条消息，每个场景 {RUNS} 次）===")
+        run_case(client, "旧实现: 全量 select(*)", direct_select_session=session_id)
+        run_case(client, "分页: 首页 50 条（不含思考过程）", payload={"sessionId": session_id, "pageSize": 50})
+        run_case(client, "分页: 首页 50 条（含思考过程）",
+                 payload={"sessionId": session_id, "pageSize": 50, "includeThinking": True})
+        run_case(client, "分页: 首页 200 条（不含思考过程）", payload={"sessionId": session_id, "pageSize": 200})
+
+        # 用游标翻到会话最开始，验证深翻页时延迟不随页码增长
+        cursor = None
+        pages = 0
+        page_latencies = []
+        while True:
+            start = time.perf_counter()
+            response = client.post(FUNCTION_URL, json={"sessionId": session_id, "pageSize": 200, "cursor": cursor})
+            response.raise_for_status()
+            page_latencies.append((time.perf_counter() - start) * 1000)
+            cursor = response.json()["nextCursor"]
+            pages += 1
+            if not cursor:
+                break
+        print(f"  {'游标遍历整个会话（200 条/页）':<36} 共 {pages} 页  首页 {page_latencies[0]:.1f} ms  "
+              f"末页 {page_latencies[-1]:.1f} ms  中位 {statistics.median(page_latencies):.1f} ms")
+
+if __name__ == '__main__':
+    keep = "--keep" in sys.argv
+    session_id = str(uuid.uuid4())
+    seed_synthetic_session(session_id)
+    try:
+        benchmark(session_id)
+    finally:
+        if not keep:
+            cleanup_session(session_id)
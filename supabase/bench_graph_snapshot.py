@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from multiprocessing import forkserver
+
+from graph_export import DECODER, read_export
+from graph_snapshot import build_snapshot, open_graph, load_export_records
+from synthetic_graph import write_synthetic_export
+
+# 合成导出文件的默认规模（接近完整 UE 源码图谱的量级）
+NODE_COUNT = 200_000
+EDGE_COUNT = 1_000_000
+
+def _peak_rss_mb():
+    # Linux 上 ru_maxrss 的单位是 KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _current_rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+def _load_json(path):
+    all_nodes, all_relationships = [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            item = json.loads(line)
+            if item.get("type") == "node":
+                all_nodes.append(item)
+            elif item.get("type") == "relationship":
+                all_relationships.append(item)
+    return len(all_nodes), len(all_relationships)
+
+def _load_records(path):
+    # 迁移脚本的用法：带 __slots__ 的记录，关系只引用端点节点
+    all_nodes, all_relationships = read_export(path)
+    return len(all_nodes), len(all_relationships)
+
+def _load_snapshot_arrays(path):
+    # 计算阶段的用法：节点 ID 和整张边表的下标数组
+    snapshot = open_graph(path)
+    node_ids = [snapshot.node_id(i) for i in range(snapshot.node_count)]
+    sources, targets, _ = snapshot.edge_arrays("DEPENDS_ON")
+    return len(node_ids), len(targets)
+
+def _load_snapshot_records(path):
+    # 从快照还原为导出格式的字典列表
+    all_nodes, all_relationships = load_export_records(path)
+    return len(all_nodes), len(all_relationships)
+
+LOADERS = {
+    "json": _load_json,
+    f"records ({DECODER})": _load_records,
+    "snapshot (arrays)": _load_snapshot_arrays,
+    "snapshot (records)": _load_snapshot_records,
+}
+
+def _measure(name, path, queue):
+    baseline = _current_rss_mb()
+    start_time = time.perf_counter()
+    counts = LOADERS[name](path)
+    queue.put((time.perf_counter() - start_time, _peak_rss_mb() - baseline, counts))
+
+def measure(name, path):
+    """在独立的子进程中执行一次加载，返回 (耗时秒, 峰值 RSS 增量 MiB, (节点数, 边数))
+
+    子进程由 forkserver 创建：Linux 的峰值 RSS 会在 fork / exec 时从父进程继承，
+    必须在父进程生成数据、构建快照之前启动 forkserver，测量才不受父进程的内存峰值影响。
+    """
+    context = multiprocessing.get_context("forkserver")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(name, path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="比较导出文件的几种读取方式（逐行 json、记录解析、二进制图快照）的加载耗时和内存占用")
+    parser.add_argument("json_file", nargs="?", help="导出文件；不指定时生成合成数据")
+    parser.add_argument("--nodes", type=int, default=NODE_COUNT, help="合成数据的节点数")
+    parser.add_argument("--edges", type=int, default=EDGE_COUNT, help="合成数据的边数")
+    args = parser.parse_args()
+    forkserver.ensure_running()
+
+    temp_dir = None
+    json_path = args.json_file
+    if not json_path:
+        temp_dir = tempfile.TemporaryDirectory()
+        json_path = os.path.join(temp_dir.name, "synthetic_graph.json")
+        print(f"正在生成合成导出文件（{args.nodes} 个节点，{args.edges} 条关系）...")
+        write_synthetic_export(json_path, args.nodes, args.edges)
+
+    start_time = time.perf_counter()
+    directory = build_snapshot(json_path)
+    build_seconds = time.perf_counter() - start_time
+    snapshot_size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f"导出文件 {os.path.getsize(json_path) / 1024 / 1024:.1f} MiB，"
+          f"快照 {snapshot_size / 1024 / 1024:.1f} MiB，构建耗时 {build_seconds:.2f} 秒\n")
+
+    print(f"{'加载方式':<22}{'耗时 (秒)':>12}{'峰值 RSS 增量 (MiB)':>22}{'节点 / 边':>20}")
+    for name in LOADERS:
+        seconds, rss, (nodes, edges) = measure(name, json_path)
+        print(f"{name:<22}{seconds:>12.2f}{rss:>22.1f}{f'{nodes} / {edges}':>20}")
+
+    if temp_dir:
+        temp_dir.cleanup()
@@ -0,0 +1,227 @@
+import io
+import os
+import gc
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime, timezone
+
+from graph_export import DECODER, read_export
+from synthetic_graph import write_synthetic_export
+from migrate_sharded import build_incidence, node_neighborhood
+from ue_pipeline.text import enhance_node_with_relationships, generate_relationship_text, generate_hierarchy_and_type_documents
+from ue_pipeline.checkpoint import save_progress, load_progress, documents_digest
+
+# 流水线各阶段在不同规模的合成图上的耗时（不调用任何接口，不需要凭据），结果写入 JSON，
+# 用 --compare 与之前的结果对比，单条耗时变慢超过阈值时以非零状态退出。
+#
+# 串行迁移中节点文本的生成要扫描全部关系（O(节点数 × 关系数)），大图上只计时一部分节点再按节点数估算总耗时；
+# 分片迁移（migrate_sharded.py）用关联表只扫描相连的关系，计时全部节点。
+
+# 默认规模：节点数 x 关系数。更大的图用 --sizes 指定：枢纽模块有几万个邻居时，
+# 节点文本中按 ID 线性查找邻居的代价接近平方，百万条边的一轮测量需要很长时间
+SIZES = [(2_000, 10_000), (5_000, 25_000), (20_000, 100_000)]
+REPEAT = 3
+# 抽样计时的阶段最多调用的次数和时间
+SAMPLE_CALLS = 200
+SAMPLE_SECONDS = 5.0
+# 检查点阶段保存的文档数上限和向量维度（text-embedding-3-small）
+CHECKPOINT_DOCUMENTS = 5_000
+EMBEDDING_DIM = 1536
+# 串行迁移每处理多少个节点保存一次进度（见 migrate_phases）
+CHECKPOINT_EVERY = 5
+RESULTS_DIR = "bench_results"
+REGRESSION_THRESHOLD = 1.25
+
+def parse_sizes(text):
+    """"2000x10000,20000x100000" -> [(2000, 10000), (20000, 100000)]"""
+    sizes = []
+    for item in text.split(","):
+        nodes, edges = item.lower().split("x")
+        sizes.append((int(float(nodes)), int(float(edges))))
+    return sizes
+
+def time_repeated(fn, repeat):
+    """运行 repeat 次，返回 (中位数秒, 最小秒, 最后一次的返回值)；阶段函数的输出被丢弃"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings), result
+
+def time_sampled(fn, items):
+    """依次对 items 调用 fn，直到调用 SAMPLE_CALLS 次或用完 SAMPLE_SECONDS，返回 (调用次数, 总秒数)"""
+    calls = 0
+    elapsed = 0.0
+    gc.collect()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            elapsed += time.perf_counter() - start
+            calls += 1
+            if calls >= SAMPLE_CALLS or elapsed >= SAMPLE_SECONDS:
+                break
+    return calls, elapsed
+
+def result(size, stage, items, seconds, min_seconds=None, estimated_total_seconds=None, **extra):
+    entry = {
+        "size": f"{size[0]}x{size[1]}",
+        "stage": stage,
+        "items": items,
+        "seconds": seconds,
+        "min_seconds": seconds if min_seconds is None else min_seconds,
+        "per_item_us": seconds / items * 1e6 if items else 0.0,
+        "estimated_total_seconds": seconds if estimated_total_seconds is None else estimated_total_seconds,
+    }
+    entry.update(extra)
+    return entry
+
+def bench_size(size, export_path, repeat, seed):
+    """对一个规模的导出文件测量各阶段，返回结果列表"""
+    rng = random.Random(seed)
+    results = []
+
+    seconds, min_seconds, (all_nodes, all_relationships) = time_repeated(lambda: read_export(export_path), repeat)
+    results.append(result(size, "parse", len(all_nodes) + len(all_relationships), seconds, min_seconds,
+                          file_bytes=os.path.getsize(export_path)))
+
+    named = [node for node in all_nodes if node.get("properties", {}).get("name")]
+    # 串行路径：每个节点扫描全部关系，抽样计时后按节点数估算
+    sample = rng.sample(named, min(len(named), SAMPLE_CALLS))
+    calls, elapsed = time_sampled(lambda node: enhance_node_with_relationships(node, all_relationships, all_nodes), sample)
+    results.append(result(size, "enhance_node (full scan)", calls, elapsed,
+                          estimated_total_seconds=elapsed / calls * len(named)))
+
+    # 分片路径：关联表 + 每个节点的邻域
+    def enhance_all_with_incidence():
+        incidence = build_incidence(all_relationships)
+        nodes_by_id = {node.get("id"): node for node in all_nodes}
+        for node in named:
+            rels, neighbors = node_neighborhood(node.get("id"), incidence, nodes_by_id)
+            enhance_node_with_relationships(node, rels, neighbors)
+    seconds, min_seconds, _ = time_repeated(enhance_all_with_incidence, repeat)
+    results.append(result(size, "enhance_node (incidence)", len(named), seconds, min_seconds))
+
+    dependencies = [rel for rel in all_relationships if rel.get("label") == "DEPENDS_ON"]
+    seconds, min_seconds, _ = time_repeated(
+        lambda: [generate_relationship_text(rel, all_nodes) for rel in dependencies], repeat)
+    results.append(result(size, "relationship_text", len(dependencies), seconds, min_seconds))
+
+    seconds, min_seconds, documents = time_repeated(
+        lambda: generate_hierarchy_and_type_documents(all_nodes, all_relationships), repeat)
+    results.append(result(size, "hierarchy_documents", len(all_nodes), seconds, min_seconds, documents=len(documents)))
+
+    results.extend(bench_checkpoint(size, all_nodes, named, repeat, rng))
+    return results
+
+def bench_checkpoint(size, all_nodes, named, repeat, rng):
+    """保存 / 读取进度文件（文档带完整向量），以及插入进度使用的文档摘要"""
+    count = min(len(named), CHECKPOINT_DOCUMENTS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        documents = [{
+            'content': enhance_node_with_relationships(node, [], all_nodes) or "",
+            'embedding': [rng.uniform(-0.1, 0.1) for _ in range(EMBEDDING_DIM)],
+        } for node in named[:count]]
+    progress = {
+        "processed_nodes": [node.get("id") for node in named[:count]],
+        "processed_relationships": [],
+        "documents": documents,
+        "current_phase": "nodes",
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        progress_file = os.path.join(temp_dir, "migration_progress.json")
+        seconds, min_seconds, _ = time_repeated(lambda: save_progress(progress_file, progress), repeat)
+        # 串行迁移每 CHECKPOINT_EVERY 个节点重写一次整个进度文件，总耗时随文档数平方增长
+        per_document = seconds / count if count else 0.0
+        saves = len(named) // CHECKPOINT_EVERY
+        results.append(result(size, "checkpoint_save", count, seconds, min_seconds,
+                              estimated_total_seconds=per_document * CHECKPOINT_EVERY * saves * (saves + 1) / 2,
+                              file_bytes=os.path.getsize(progress_file)))
+        seconds, min_seconds, _ = time_repeated(lambda: load_progress(progress_file), repeat)
+        results.append(result(size, "checkpoint_load", count, seconds, min_seconds))
+    seconds, min_seconds, _ = time_repeated(lambda: documents_digest(documents), repeat)
+    results.append(result(size, "documents_digest", count, seconds, min_seconds))
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results):
+    print(f"{'规模':<18}{'阶段':<28}{'条数':>10}{'耗时 (秒)':>12}{'单条 (µs)':>12}{'估算总耗时 (秒)':>18}")
+    for r in results:
+        print(f"{r['size']:<18}{r['stage']:<28}{r['items']:>10}{r['seconds']:>12.3f}"
+              f"{r['per_item_us']:>12.1f}{r['estimated_total_seconds']:>18.1f}")
+
+def compare(results, baseline_file, threshold):
+    """按（规模, 阶段）比较单条耗时，返回变慢超过阈值的条目数"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {(r["size"], r["stage"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\n📊 与 {baseline_file} 对比（单条耗时，阈值 {threshold:.2f}x）:")
+    for r in results:
+        old = baseline.get((r["size"], r["stage"]))
+        if not old or not old["per_item_us"]:
+            continue
+        ratio = r["per_item_us"] / old["per_item_us"]
+        flag = "⚠️ 变慢" if ratio > threshold else "✅"
+        regressions += ratio > threshold
+        print(f"  {flag} {r['size']} {r['stage']}: {old['per_item_us']:.1f} -> {r['per_item_us']:.1f} µs（{ratio:.2f}x）")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="在合成图上测量迁移流水线各阶段（解析、文本生成、检查点）的耗时")
+    parser.add_argument("--sizes", type=parse_sizes, default=SIZES,
+                        help="逗号分隔的 节点数x关系数，默认 2000x10000,5000x25000,20000x100000")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="每个阶段重复的次数，取中位数")
+    parser.add_argument("--seed", type=int, default=42, help="合成图和抽样的随机种子")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="结果 JSON 的目录")
+    parser.add_argument("--compare", help="与之前的结果文件对比")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="单条耗时变慢超过这个倍数时视为回归")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in args.sizes:
+            export_path = os.path.join(temp_dir, f"synthetic-{size[0]}x{size[1]}.json")
+            print(f"正在生成合成图（{size[0]} 个节点，{size[1]} 条关系）...")
+            write_synthetic_export(export_path, size[0], size[1], seed=args.seed)
+            size_results = bench_size(size, export_path, args.repeat, args.seed)
+            print_results(size_results)
+            results.extend(size_results)
+            os.remove(export_path)
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    os.makedirs(args.results_dir, exist_ok=True)
+    results_path = os.path.join(args.results_dir, f"pipeline-{run_id}.json")
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "run_id": run_id,
+            "git_commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "decoder": DECODER,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n📝 结果已写入 {results_path}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
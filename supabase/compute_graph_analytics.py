@@ -0,0 +1,325 @@
+import os
+import time
+import uuid
+import argparse
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from graph_snapshot import open_graph
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-10
+PAGERANK_MAX_ITERATIONS = 100
+# 近似介数中心性的采样源点数；源点越多越准，耗时线性增长
+BETWEENNESS_SAMPLES = 32
+# 一次 BFS 同时处理的源点数（稠密矩阵的列数），控制内存占用
+BETWEENNESS_BATCH = 16
+# 节点数不超过该值时用位集精确计算传递扇入/扇出，否则用最小值草图估计
+EXACT_REACH_MAX_NODES = 20000
+# 草图的维数；估计的相对误差约为 1/sqrt(REACH_SKETCH_SIZE - 2)
+REACH_SKETCH_SIZE = 64
+# PageRank 排名在前这个比例的节点，在节点文本中标注为核心枢纽
+HUB_PERCENTILE = 0.01
+
+def load_dependency_edges(json_file_path):
+    """经由图快照（graph_snapshot.py）读取导出文件，返回节点 ID、节点名称、DEPENDS_ON 边的起点/终点下标和依赖类型
+
+    依赖类型以整数编码返回（type_codes[i] 是 dependency_types 中的下标）。
+    """
+    snapshot = open_graph(json_file_path)
+    node_ids = [snapshot.node_id(i) for i in range(snapshot.node_count)]
+    names = [snapshot.node_name(i) for i in range(snapshot.node_count)]
+
+    sources, targets, positions = snapshot.edge_arrays("DEPENDS_ON")
+    keep = sources != targets
+    src, dst = sources[keep], targets[keep]
+    # 快照中缺失的依赖类型编码为 -1，这里与原来一样当作空字符串，并把类型按名称排序重新编码
+    snapshot_codes = np.asarray(snapshot.edge_dep_type)[positions[keep]].astype(np.int64)
+    type_names = snapshot.dependency_types + [""]
+    snapshot_codes[snapshot_codes < 0] = len(type_names) - 1
+    used = np.unique(snapshot_codes)
+    dependency_types = sorted({type_names[c] for c in used})
+    remap = np.zeros(len(type_names), dtype=np.int32)
+    for c in used:
+        remap[c] = dependency_types.index(type_names[c])
+    return node_ids, names, src, dst, remap[snapshot_codes], dependency_types
+
+def adjacency_matrix(node_count, src, dst):
+    """DEPENDS_ON 的稀疏邻接矩阵（CSR，A[u, v] = 1 表示 u 依赖 v），多重边合并为一条"""
+    matrix = sparse.csr_matrix((np.ones(len(src), dtype=np.float64), (src, dst)), shape=(node_count, node_count))
+    matrix.data[:] = 1.0
+    return matrix
+
+def degrees_by_type(node_count, src, dst, codes, type_count):
+    """按依赖类型拆分的出度/入度，返回两个 (node_count, type_count) 的整数矩阵"""
+    out_degree = np.bincount(src * type_count + codes, minlength=node_count * type_count).reshape(node_count, type_count)
+    in_degree = np.bincount(dst * type_count + codes, minlength=node_count * type_count).reshape(node_count, type_count)
+    return out_degree, in_degree
+
+def pagerank(adjacency, damping=PAGERANK_DAMPING, tolerance=PAGERANK_TOLERANCE, max_iterations=PAGERANK_MAX_ITERATIONS):
+    """幂迭代 PageRank：排名沿依赖方向流动，被越多重要模块依赖的模块得分越高
+
+    没有出边的节点把得分均匀分给所有节点。
+    """
+    n = adjacency.shape[0]
+    out_degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_degree == 0
+    inverse_degree = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    transition = (sparse.diags(inverse_degree) @ adjacency).T.tocsr()
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iterations):
+        previous = rank
+        rank = damping * (transition @ rank + previous[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(rank - previous).sum() < tolerance:
+            break
+    return rank
+
+def approximate_betweenness(adjacency, samples=BETWEENNESS_SAMPLES, batch=BETWEENNESS_BATCH, seed=42):
+    """采样源点的 Brandes 介数中心性近似（有向、无权），结果按 n / samples 放大
+
+    每批源点作为稠密矩阵的列一起做逐层 BFS：正向用 A^T @ frontier 统计最短路数 sigma，
+    反向用 A @ ((1 + delta) / sigma) 逐层回传依赖值 delta，全部是稀疏矩阵乘法。
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    rng = np.random.default_rng(seed)
+    sources = rng.choice(n, size=min(samples, n), replace=False)
+    forward = adjacency.T.tocsr()
+    betweenness = np.zeros(n)
+
+    for start in range(0, len(sources), batch):
+        batch_sources = sources[start:start + batch]
+        columns = np.arange(len(batch_sources))
+        dist = np.full((n, len(batch_sources)), -1, dtype=np.int32)
+        sigma = np.zeros((n, len(batch_sources)))
+        dist[batch_sources, columns] = 0
+        sigma[batch_sources, columns] = 1.0
+
+        frontier = sigma.copy()
+        depth = 0
+        while frontier.any():
+            paths = forward @ frontier
+            reached = (dist < 0) & (paths > 0)
+            depth += 1
+            dist[reached] = depth
+            sigma[reached] = paths[reached]
+            frontier = np.where(reached, sigma, 0.0)
+
+        delta = np.zeros_like(sigma)
+        for level in range(depth, 0, -1):
+            coefficient = np.where(dist == level, (1 + delta) / np.maximum(sigma, 1.0), 0.0)
+            delta += np.where(dist == level - 1, sigma * (adjacency @ coefficient), 0.0)
+        delta[batch_sources, columns] = 0.0
+        betweenness += delta.sum(axis=1)
+
+    return betweenness * (n / len(sources))
+
+def _height_order(component_count, src, dst):
+    """DAG 的高度分层：汇点高度为 0，其余为 1 + 后继的最大高度；返回每层的节点数组列表"""
+    remaining = np.bincount(src, minlength=component_count)
+    order = np.argsort(dst, kind='stable')
+    sorted_src = src[order]
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(dst, minlength=component_count))])
+
+    levels = []
+    current = np.nonzero(remaining == 0)[0]
+    while len(current):
+        levels.append(current)
+        counts = indptr[current + 1] - indptr[current]
+        edge_index = np.repeat(indptr[current], counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+        predecessors = sorted_src[edge_index]
+        np.subtract.at(remaining, predecessors, 1)
+        current = np.unique(predecessors[remaining[predecessors] == 0])
+    return levels
+
+def transitive_reach(adjacency, seed=42):
+    """每个节点可传递到达的其他节点数（对 A 是传递扇出，对 A^T 是传递扇入）
+
+    先用强连通分量把图缩成 DAG（同一分量内互相可达），再按高度从汇点往上合并后继的可达集合。
+    小图用 Python 整数位集精确计算；大图用最小值草图（Cohen 估计）：每个节点取 k 个指数分布随机数，
+    可达集合上每维取最小值，集合大小约为 (k - 1) / sum(最小值)。
+    """
+    n = adjacency.shape[0]
+    component_count, component = connected_components(adjacency, directed=True, connection='strong')
+    coo = adjacency.tocoo()
+    cs, ct = component[coo.row], component[coo.col]
+    cross = cs != ct
+    pairs = np.unique(cs[cross].astype(np.int64) * component_count + ct[cross])
+    src, dst = pairs // component_count, pairs % component_count
+    levels = _height_order(component_count, src, dst)
+    successor_order = np.argsort(src, kind='stable')
+    successor_indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=component_count))])
+    sorted_dst = dst[successor_order]
+
+    if n <= EXACT_REACH_MAX_NODES:
+        reach = [0] * component_count
+        for node, c in enumerate(component):
+            reach[c] |= 1 << node
+        for level in levels:
+            for c in level:
+                for succ in sorted_dst[successor_indptr[c]:successor_indptr[c + 1]]:
+                    reach[c] |= reach[succ]
+        counts = np.array([reach[c].bit_count() for c in range(component_count)])
+        return counts[component] - 1
+
+    rng = np.random.default_rng(seed)
+    ranks = rng.exponential(size=(n, REACH_SKETCH_SIZE)).astype(np.float32)
+    sketch = np.full((component_count, REACH_SKETCH_SIZE), np.inf, dtype=np.float32)
+    np.minimum.at(sketch, component, ranks)
+    for level in levels:
+        counts = successor_indptr[level + 1] - successor_indptr[level]
+        owners = np.repeat(level, counts)
+        edge_index = np.repeat(successor_indptr[level], counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+        np.minimum.at(sketch, owners, sketch[sorted_dst[edge_index]])
+    estimate = (REACH_SKETCH_SIZE - 1) / sketch.sum(axis=1)
+    return np.maximum(np.rint(estimate[component]) - 1, 0).astype(np.int64)
+
+def compute_node_metrics(node_count, src, dst, codes, dependency_types):
+    """计算所有指标，返回按列组织的 NumPy 数组字典和各步骤耗时"""
+    timings = {}
+
+    def timed(name, fn, *args):
+        start_time = time.time()
+        result = fn(*args)
+        timings[name] = round(time.time() - start_time, 3)
+        return result
+
+    adjacency = timed("adjacency", adjacency_matrix, node_count, src, dst)
+    out_by_type, in_by_type = timed("degrees", degrees_by_type, node_count, src, dst, codes, len(dependency_types))
+    rank = timed("pagerank", pagerank, adjacency)
+    betweenness = timed("betweenness", approximate_betweenness, adjacency)
+    fan_out = timed("fan_out", transitive_reach, adjacency)
+    fan_in = timed("fan_in", transitive_reach, adjacency.T.tocsr())
+
+    return {
+        'out_by_type': out_by_type,
+        'in_by_type': in_by_type,
+        'pagerank': rank,
+        'betweenness': betweenness,
+        'fan_out': fan_out,
+        'fan_in': fan_in,
+    }, timings
+
+def describe_node_metrics(metrics):
+    """把单个节点的指标写成一句中文描述，追加到增强节点文本中"""
+    parts = [f"在依赖图中，它直接依赖{metrics['out_degree']}个节点、被{metrics['in_degree']}个节点直接依赖"]
+    if metrics['fan_out'] or metrics['fan_in']:
+        parts.append(f"传递依赖{metrics['fan_out']}个节点、被{metrics['fan_in']}个节点间接依赖")
+    parts.append(f"PageRank 排名第{metrics['pagerank_rank']}/{metrics['node_count']}")
+    if metrics['is_hub']:
+        parts.append("是依赖图中的核心枢纽")
+    return "，".join(parts)
+
+def metrics_by_node(node_ids, names, columns, dependency_types):
+    """把列式指标转换成 {node_id: 指标字典}，包含排名和用于节点文本的描述"""
+    n = len(node_ids)
+    pagerank_rank = np.empty(n, dtype=np.int64)
+    pagerank_rank[np.argsort(-columns['pagerank'], kind='stable')] = np.arange(1, n + 1)
+    hub_cutoff = max(1, int(np.ceil(n * HUB_PERCENTILE)))
+
+    result = {}
+    for i, node_id in enumerate(node_ids):
+        out_row = columns['out_by_type'][i]
+        in_row = columns['in_by_type'][i]
+        metrics = {
+            'node_id': node_id,
+            'name': names[i],
+            'out_degree': int(out_row.sum()),
+            'in_degree': int(in_row.sum()),
+            'out_degree_by_type': {t: int(c) for t, c in zip(dependency_types, out_row) if c},
+            'in_degree_by_type': {t: int(c) for t, c in zip(dependency_types, in_row) if c},
+            'pagerank': float(columns['pagerank'][i]),
+            'pagerank_rank': int(pagerank_rank[i]),
+            'betweenness': float(columns['betweenness'][i]),
+            'fan_out': int(columns['fan_out'][i]),
+            'fan_in': int(columns['fan_in'][i]),
+            'node_count': n,
+            'is_hub': bool(pagerank_rank[i] <= hub_cutoff and in_row.sum() > 0),
+        }
+        metrics['summary'] = describe_node_metrics(metrics)
+        result[node_id] = metrics
+    return result
+
+def store_node_metrics(supabase, metrics, batch_size=500):
+    """分批写入 graph_node_metrics，然后删除上一次计算遗留的行（已不在图中的节点）"""
+    columns = ('node_id', 'name', 'out_degree', 'in_degree', 'out_degree_by_type', 'in_degree_by_type',
+               'pagerank', 'pagerank_rank', 'betweenness', 'fan_out', 'fan_in', 'is_hub')
+    # 与 graph_layout 一样按运行 ID 清理：读取全部 node_id 再比较会受 PostgREST max_rows 限制
+    metrics_run = str(uuid.uuid4())
+    rows = [dict({key: m[key] for key in columns}, metrics_run=metrics_run) for m in metrics.values()]
+    for i in range(0, len(rows), batch_size):
+        supabase.table('graph_node_metrics').upsert(rows[i:i + batch_size]).execute()
+        print(f"  已写入 {min(i + batch_size, len(rows))}/{len(rows)} 个节点的指标")
+
+    supabase.table('graph_node_metrics').delete().neq('metrics_run', metrics_run).execute()
+
+def update_graph_analytics(supabase, json_file_path, dry_run=False):
+    """迁移流程中的分析阶段：计算节点指标，写入 graph_node_metrics，并返回 {node_id: 指标}
+
+    返回值中的 summary 供 enhance_node_with_relationships 追加到节点文本中。
+    """
+    node_ids, names, src, dst, codes, dependency_types = load_dependency_edges(json_file_path)
+    print(f"📈 正在为 {len(node_ids)} 个节点、{len(src)} 条 DEPENDS_ON 边计算图谱指标...")
+
+    columns, timings = compute_node_metrics(len(node_ids), src, dst, codes, dependency_types)
+    print("  耗时（秒）: " + "，".join(f"{name} {seconds}" for name, seconds in timings.items()))
+    metrics = metrics_by_node(node_ids, names, columns, dependency_types)
+
+    top = sorted(metrics.values(), key=lambda m: m['pagerank_rank'])[:5]
+    print("  PageRank 前五: " + "，".join(f"{m['name'] or m['node_id']}" for m in top))
+
+    if dry_run:
+        print("🔍 dry-run 模式，不写入数据库")
+        return metrics
+
+    store_node_metrics(supabase, metrics)
+    print(f"✅ 已写入 {len(metrics)} 个节点的图谱指标")
+    return metrics
+
+def synthetic_edges(node_count, edge_count, type_count=4, seed=42):
+    """生成幂律出入度的随机依赖图，用于验证大图上的耗时"""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, node_count + 1) ** 0.8
+    weights /= weights.sum()
+    src = rng.integers(0, node_count, edge_count)
+    dst = rng.choice(node_count, size=edge_count, p=weights)
+    keep = src != dst
+    return src[keep], dst[keep], rng.integers(0, type_count, keep.sum()).astype(np.int32)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="计算依赖图的节点指标（度数、PageRank、介数、传递扇入/扇出）并写入数据库")
+    parser.add_argument("json_file", nargs="?", help="Neo4j 导出的 JSON Lines 文件，默认为 unreal_engine_graph.json")
+    parser.add_argument("--dry-run", action="store_true", help="只计算并打印耗时，不写入数据库")
+    parser.add_argument("--synthetic-edges", type=int, default=None,
+                        help="不读取导出文件，改为在指定边数的合成图上计算并打印耗时（例如 1000000）")
+    args = parser.parse_args()
+
+    if args.synthetic_edges:
+        node_count = max(args.synthetic_edges // 5, 2)
+        src, dst, codes = synthetic_edges(node_count, args.synthetic_edges)
+        print(f"🧪 合成图: {node_count} 个节点，{len(src)} 条边")
+        start_time = time.time()
+        _, timings = compute_node_metrics(node_count, src, dst, codes, [f"type{i}" for i in range(4)])
+        print("  耗时（秒）: " + "，".join(f"{name} {seconds}" for name, seconds in timings.items()))
+        print(f"  总计 {time.time() - start_time:.2f} 秒")
+    else:
+        from dotenv import load_dotenv
+        from supabase import create_client
+
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        json_path = args.json_file or os.path.join(script_dir, "unreal_engine_graph.json")
+
+        client = None
+        if not args.dry_run:
+            load_dotenv('.env.local')
+            supabase_url = os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
+            supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+            if not all([supabase_url, supabase_key]):
+                raise ValueError("请确保 .env.local 文件中已设置 SUPABASE_URL 和 SUPABASE_SERVICE_ROLE_KEY。")
+            client = create_client(supabase_url, supabase_key)
+
+        update_graph_analytics(client, json_path, dry_run=args.dry_run)
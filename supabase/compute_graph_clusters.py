@@ -0,0 +1,277 @@
+import os
+import time
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from graph_snapshot import open_graph
+
+# 每个聚合层级最多保留的簇数，其余的小簇合并为一个「Other」簇，保证概览的规模有上限
+MAX_CLUSTERS_PER_LEVEL = 200
+# 社区层级数上限；簇数不再明显减少时会提前停止
+MAX_COMMUNITY_LEVELS = 4
+# 簇数少于这个值就不再继续粗化
+MIN_COMMUNITY_CLUSTERS = 12
+# 标签传播的最大迭代次数
+LABEL_PROPAGATION_ITERATIONS = 30
+OTHER_CLUSTER_ID = "other"
+
+def load_dependency_graph(json_file_path):
+    """经由图快照（graph_snapshot.py）读取导出文件，返回节点列表和 DEPENDS_ON 边列表
+
+    节点为 {id, name, label, properties}，边为 (起点下标, 终点下标, 依赖类型)。
+    """
+    snapshot = open_graph(json_file_path)
+    snapshot.decode_strings()
+    nodes = []
+    for i in range(snapshot.node_count):
+        props = snapshot.node_properties(i)
+        nodes.append({
+            "id": snapshot.node_id(i),
+            "name": props.get("name"),
+            "label": snapshot.node_label(i),
+            "properties": props,
+        })
+
+    sources, targets, positions = snapshot.edge_arrays("DEPENDS_ON")
+    dependency_types = snapshot.dependency_types + [""]
+    type_codes = np.asarray(snapshot.edge_dep_type)[positions].astype(np.int64)
+    type_codes[type_codes < 0] = len(dependency_types) - 1
+    keep = sources != targets
+    edges = [
+        (int(s), int(t), dependency_types[c])
+        for s, t, c in zip(sources[keep], targets[keep], type_codes[keep])
+    ]
+    return nodes, edges
+
+def label_propagation(node_count, sources, targets, weights, seed=42, max_iterations=LABEL_PROPAGATION_ITERATIONS):
+    """带权标签传播社区发现（无向），返回每个节点的社区编号（0..k-1）
+
+    每轮对所有节点同时计算「邻居中权重之和最大的标签」，再随机只更新一半节点，
+    避免同步更新在二分结构上来回振荡。全部用 unique / bincount / lexsort 的数组运算完成。
+    """
+    rng = np.random.default_rng(seed)
+    labels = np.arange(node_count)
+    if len(sources) == 0:
+        return labels
+
+    u = np.concatenate([sources, targets])
+    v = np.concatenate([targets, sources])
+    w = np.concatenate([weights, weights]).astype(np.float64)
+
+    for _ in range(max_iterations):
+        keys, inverse = np.unique(u * node_count + labels[v], return_inverse=True)
+        # 极小的随机扰动用于打破平局
+        scores = np.bincount(inverse, weights=w) + rng.random(len(keys)) * 1e-6
+        owners = keys // node_count
+        candidates = keys % node_count
+        order = np.lexsort((-scores, owners))
+        first = order[np.r_[True, owners[order][1:] != owners[order][:-1]]]
+
+        best = labels.copy()
+        best[owners[first]] = candidates[first]
+        changed = best != labels
+        if not changed.any():
+            break
+        update = changed & (rng.random(node_count) < 0.5)
+        labels[update] = best[update]
+
+    _, labels = np.unique(labels, return_inverse=True)
+    return labels
+
+def cap_clusters(assignment, max_clusters=MAX_CLUSTERS_PER_LEVEL):
+    """只保留最大的 max_clusters - 1 个簇，其余节点归入最后一个编号（Other 簇）
+
+    返回 (新的簇编号数组, Other 簇的编号或 None)。
+    """
+    sizes = np.bincount(assignment)
+    if len(sizes) <= max_clusters:
+        return assignment, None
+    keep = np.argsort(-sizes, kind='stable')[:max_clusters - 1]
+    remap = np.full(len(sizes), max_clusters - 1)
+    remap[keep] = np.arange(max_clusters - 1)
+    return remap[assignment], max_clusters - 1
+
+def build_community_levels(node_count, edges):
+    """多层社区划分：第 1 层在原图上做标签传播，之后每层在上一层的超图上继续传播
+
+    返回每一层「节点 -> 社区编号」的数组列表，从细到粗。
+    """
+    if not edges:
+        return []
+    sources = np.array([e[0] for e in edges], dtype=np.int64)
+    targets = np.array([e[1] for e in edges], dtype=np.int64)
+    weights = np.ones(len(edges))
+
+    levels = []
+    membership = np.arange(node_count)
+    current_count = node_count
+    for depth in range(MAX_COMMUNITY_LEVELS):
+        # 把边映射到当前层的超节点上，合并重复边并去掉簇内的自环
+        cs, ct = membership[sources], membership[targets]
+        cross = cs != ct
+        keys, inverse = np.unique(cs[cross] * current_count + ct[cross], return_inverse=True)
+        super_weights = np.bincount(inverse, weights=weights[cross]) if len(keys) else np.empty(0)
+
+        communities = label_propagation(current_count, keys // current_count, keys % current_count, super_weights, seed=42 + depth)
+        community_count = int(communities.max()) + 1
+        if levels and community_count > current_count * 0.9:
+            break
+        membership = communities[membership]
+        current_count = community_count
+        levels.append(membership.copy())
+        if current_count <= MIN_COMMUNITY_CLUSTERS:
+            break
+    return levels
+
+def summarize_level(level, assignment, nodes, edges, cluster_ids, names=None):
+    """根据节点的簇归属生成超节点、加权超边、成员和展开所需的节点级边"""
+    degree = Counter()
+    for s, t, _ in edges:
+        degree[s] += 1
+        degree[t] += 1
+
+    members = {}
+    for i, cluster in enumerate(assignment):
+        members.setdefault(cluster_ids[cluster], []).append(i)
+
+    internal = Counter()
+    super_edges = Counter()
+    links = []
+    for s, t, dep_type in edges:
+        cs, ct = cluster_ids[assignment[s]], cluster_ids[assignment[t]]
+        link = {'level': level, 'source_id': nodes[s]["id"], 'target_id': nodes[t]["id"], 'dependency_type': dep_type}
+        if cs == ct:
+            internal[cs] += 1
+            links.append({**link, 'cluster_id': cs, 'other_cluster_id': None})
+        else:
+            super_edges[(cs, ct)] += 1
+            links.append({**link, 'cluster_id': cs, 'other_cluster_id': ct})
+            links.append({**link, 'cluster_id': ct, 'other_cluster_id': cs})
+
+    clusters = []
+    member_rows = []
+    for cluster_id, indexes in members.items():
+        indexes.sort(key=lambda i: -degree[i])
+        dominant_label = Counter(nodes[i]["label"] for i in indexes).most_common(1)[0][0]
+        if names and cluster_id in names:
+            name = names[cluster_id]
+        else:
+            hub = nodes[indexes[0]]
+            hub_name = hub["name"] or hub["label"]
+            name = hub_name if len(indexes) == 1 else f"{hub_name} (+{len(indexes) - 1})"
+        clusters.append({
+            'level': level,
+            'cluster_id': cluster_id,
+            'name': name,
+            'dominant_label': dominant_label,
+            'size': len(indexes),
+            'internal_weight': internal[cluster_id],
+        })
+        member_rows.extend({
+            'level': level,
+            'cluster_id': cluster_id,
+            'node_id': nodes[i]["id"],
+            'name': nodes[i]["name"],
+            'node_label': nodes[i]["label"],
+            'properties': nodes[i]["properties"],
+            'degree': degree[i],
+        } for i in indexes)
+
+    edge_rows = [
+        {'level': level, 'source_cluster': s, 'target_cluster': t, 'weight': weight}
+        for (s, t), weight in super_edges.items()
+    ]
+    return {
+        'level': {'level': level, 'cluster_count': len(clusters), 'edge_count': len(edge_rows)},
+        'clusters': clusters,
+        'edges': edge_rows,
+        'members': member_rows,
+        'links': links,
+    }
+
+def compute_clusters(nodes, edges):
+    """计算所有聚合层级，返回 summarize_level 结果的列表（标签层在前，社区层由细到粗）"""
+    results = []
+
+    labels = sorted({node["label"] for node in nodes})
+    label_index = {label: i for i, label in enumerate(labels)}
+    assignment = np.array([label_index[node["label"]] for node in nodes], dtype=np.int64)
+    label_level = summarize_level("label", assignment, nodes, edges, labels, names={label: label for label in labels})
+    label_level['level'].update(kind="label", ordinal=0)
+    results.append(label_level)
+
+    for depth, membership in enumerate(build_community_levels(len(nodes), edges), start=1):
+        capped, other = cap_clusters(membership)
+        cluster_ids = [f"c{i}" for i in range(int(capped.max()) + 1)]
+        names = {}
+        if other is not None:
+            cluster_ids[other] = OTHER_CLUSTER_ID
+            names[OTHER_CLUSTER_ID] = f"Other ({int((capped == other).sum())} nodes)"
+        level = summarize_level(f"community-{depth}", capped, nodes, edges, cluster_ids, names=names)
+        level['level'].update(kind="community", ordinal=depth)
+        results.append(level)
+    return results
+
+def store_clusters(supabase, levels, batch_size=500):
+    """清空旧的聚合数据，再分批写入每个层级的簇、超边、成员和展开用的边"""
+    # 先删引用最多的表；level 不可能为空字符串，neq('level', '') 即删除全部
+    for table in ('graph_cluster_links', 'graph_cluster_members', 'graph_cluster_edges', 'graph_clusters', 'graph_cluster_levels'):
+        supabase.table(table).delete().neq('level', '').execute()
+
+    for level in levels:
+        name = level['level']['level']
+        for table, key in (('graph_clusters', 'clusters'), ('graph_cluster_edges', 'edges'),
+                           ('graph_cluster_members', 'members'), ('graph_cluster_links', 'links')):
+            rows = level[key]
+            for i in range(0, len(rows), batch_size):
+                supabase.table(table).insert(rows[i:i + batch_size]).execute()
+        supabase.table('graph_cluster_levels').insert(level['level']).execute()
+        print(f"  已写入层级 {name}: {level['level']['cluster_count']} 个簇，{level['level']['edge_count']} 条超边")
+
+def update_graph_clusters(supabase, json_file_path, dry_run=False):
+    """迁移流程中的聚合阶段：计算标签层和多层社区划分并写入 graph_cluster_* 表
+
+    与布局阶段一样，应在 publish_graph_version 之前调用。
+    """
+    nodes, edges = load_dependency_graph(json_file_path)
+    print(f"🧩 正在为 {len(nodes)} 个节点、{len(edges)} 条 DEPENDS_ON 边计算聚合层级...")
+
+    start_time = time.time()
+    levels = compute_clusters(nodes, edges)
+    print(f"  计算完成，耗时 {time.time() - start_time:.2f} 秒")
+    for level in levels:
+        info = level['level']
+        print(f"  {info['level']}: {info['cluster_count']} 个簇，{info['edge_count']} 条超边")
+
+    if dry_run:
+        print("🔍 dry-run 模式，不写入数据库")
+        return levels
+
+    store_clusters(supabase, levels)
+    print(f"✅ 已写入 {len(levels)} 个聚合层级")
+    return levels
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="离线计算图谱的多层聚合（标签 / 社区）并写入数据库")
+    parser.add_argument("json_file", nargs="?", help="Neo4j 导出的 JSON Lines 文件，默认为 unreal_engine_graph.json")
+    parser.add_argument("--dry-run", action="store_true", help="只计算并打印各层级的规模，不写入数据库")
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    json_path = args.json_file or os.path.join(script_dir, "unreal_engine_graph.json")
+
+    client = None
+    if not args.dry_run:
+        load_dotenv('.env.local')
+        supabase_url = os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not all([supabase_url, supabase_key]):
+            raise ValueError("请确保 .env.local 文件中已设置 SUPABASE_URL 和 SUPABASE_SERVICE_ROLE_KEY。")
+        client = create_client(supabase_url, supabase_key)
+
+    update_graph_clusters(client, json_path, dry_run=args.dry_run)
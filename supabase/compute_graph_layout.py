@@ -0,0 +1,254 @@
+import os
+import time
+import uuid
+import argparse
+
+import numpy as np
+
+from graph_snapshot import open_graph
+
+# 与前端 GraphVisualization / forceLayout.worker 的 d3 力导向参数保持一致，
+# 这样浏览器拿到预计算坐标后只需要很短的微调，图形不会明显跳动
+LINK_DISTANCE = 100
+CHARGE_STRENGTH = -400
+RADIAL_STRENGTH = 0.7
+# 前端径向布局的半径是 min(宽, 高) / 3，这里按 900px 高的画布取值
+RADIAL_RADIUS = 300
+VELOCITY_DECAY = 0.4
+ALPHA_MIN = 0.001
+# d3 的默认值：300 次迭代后 alpha 衰减到 ALPHA_MIN
+DEFAULT_ITERATIONS = 300
+# d3 forceManyBody 的 distanceMin2，避免距离过近时斥力爆炸
+DISTANCE_MIN2 = 1.0
+# 网格最深层数；最细一层平均每格约 1 个节点即可，层数再多也不会更准
+MAX_GRID_DEPTH = 12
+
+def load_graph(json_file_path):
+    """经由图快照（graph_snapshot.py）读取导出文件，返回节点 ID 列表和 (起点下标, 终点下标) 的边数组"""
+    snapshot = open_graph(json_file_path)
+    node_ids = [snapshot.node_id(i) for i in range(snapshot.node_count)]
+    sources, targets, _ = snapshot.edge_arrays()
+    keep = sources != targets
+    return node_ids, np.column_stack([sources[keep], targets[keep]]).astype(np.int64).reshape(-1, 2)
+
+def initial_positions(node_count):
+    """d3 的叶序（phyllotaxis）初始布局，与浏览器端未给定坐标时的初始位置相同"""
+    i = np.arange(node_count, dtype=np.float64)
+    radius = 10 * np.sqrt(0.5 + i)
+    angle = i * np.pi * (3 - np.sqrt(5))
+    return np.column_stack([radius * np.cos(angle), radius * np.sin(angle)])
+
+def _expand_pairs(sources, starts, counts):
+    """把「节点 i 与某格子内的 counts[i] 个节点」展开成两两配对的下标数组"""
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    pair_sources = np.repeat(sources, counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return pair_sources, np.repeat(starts, counts) + offsets
+
+def _accumulate(velocity, node_index, delta, weight):
+    """按节点下标累加 delta * weight（同一节点可能出现多次）"""
+    n = len(velocity)
+    velocity[:, 0] += np.bincount(node_index, weights=delta[:, 0] * weight, minlength=n)
+    velocity[:, 1] += np.bincount(node_index, weights=delta[:, 1] * weight, minlength=n)
+
+def _inverse_square_weights(delta, strength, alpha, mass=1.0):
+    """d3 forceManyBody 的权重：strength * mass * alpha / 距离平方"""
+    l = (delta ** 2).sum(axis=1)
+    l = np.where(l < DISTANCE_MIN2, np.sqrt(DISTANCE_MIN2 * l), l)
+    return strength * mass * alpha / np.maximum(l, 1e-9)
+
+def apply_charge(positions, velocity, alpha, strength=CHARGE_STRENGTH, rng=None):
+    """向量化的 Barnes-Hut 多体斥力
+
+    用逐层加密的均匀网格代替逐节点遍历的四叉树：第 L 层把包围盒分成 2^L x 2^L 个格子，
+    用 bincount 一次算出每格的节点数和质心。对每个节点，父格相邻区域的子格中、
+    不与自身格子相邻的那些格子已经「足够远」（格子边长 / 距离 <= 1，相当于 θ≈1），
+    直接用格子质心近似；剩下的相邻格子交给下一层细分。
+    最细一层的相邻格子内逐对精确计算。每一层只有固定的 40 个偏移方向，全部是整列数组运算。
+    """
+    n = len(positions)
+    if n < 2:
+        return
+    rng = rng or np.random.default_rng(0)
+    lower = positions.min(axis=0)
+    span = max(float((positions.max(axis=0) - lower).max()), 1e-6)
+    unit = (positions - lower) / span
+
+    depth = int(np.clip(np.ceil(np.log(n) / np.log(4)), 2, MAX_GRID_DEPTH))
+    near_offsets = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+    far_offsets = [(dx, dy) for dx in range(-3, 4) for dy in range(-3, 4) if abs(dx) > 1 or abs(dy) > 1]
+
+    for level in range(2, depth + 1):
+        size = 1 << level
+        cell = np.minimum((unit * size).astype(np.int64), size - 1)
+        flat = cell[:, 0] * size + cell[:, 1]
+        count = np.bincount(flat, minlength=size * size)
+        occupied = count > 0
+        centers = np.zeros((size * size, 2))
+        for axis in (0, 1):
+            sums = np.bincount(flat, weights=positions[:, axis], minlength=size * size)
+            np.divide(sums, count, out=centers[:, axis], where=occupied)
+
+        # 自身格子在父格中的位置（0 或 1）决定了父格相邻区域覆盖的偏移范围：-2-b .. 3-b
+        parity = cell & 1
+        for dx, dy in far_offsets:
+            tx = cell[:, 0] + dx
+            ty = cell[:, 1] + dy
+            mask = (
+                (dx >= -2 - parity[:, 0]) & (dx <= 3 - parity[:, 0])
+                & (dy >= -2 - parity[:, 1]) & (dy <= 3 - parity[:, 1])
+                & (tx >= 0) & (tx < size) & (ty >= 0) & (ty < size)
+            )
+            nodes = np.nonzero(mask)[0]
+            target = tx[nodes] * size + ty[nodes]
+            keep = occupied[target]
+            nodes, target = nodes[keep], target[keep]
+            if len(nodes) == 0:
+                continue
+            delta = centers[target] - positions[nodes]
+            # 每个偏移方向上一个节点只对应一个格子，没有重复下标，可以直接相加
+            velocity[nodes] += delta * _inverse_square_weights(delta, strength, alpha, count[target])[:, None]
+
+    # 最细一层：与相邻 3x3 格子内的每个节点逐对计算
+    order = np.argsort(flat, kind='stable')
+    starts = np.cumsum(count) - count
+    for dx, dy in near_offsets:
+        tx = cell[:, 0] + dx
+        ty = cell[:, 1] + dy
+        nodes = np.nonzero((tx >= 0) & (tx < size) & (ty >= 0) & (ty < size))[0]
+        target = tx[nodes] * size + ty[nodes]
+        sources, slots = _expand_pairs(nodes, starts[target], count[target])
+        others = order[slots]
+        keep = sources != others
+        sources, others = sources[keep], others[keep]
+        if len(sources) == 0:
+            continue
+        delta = positions[others] - positions[sources]
+        # 与 d3 一样，重合的节点加一点随机扰动把它们推开
+        overlapping = (delta == 0).all(axis=1)
+        if overlapping.any():
+            delta[overlapping] = (rng.random((int(overlapping.sum()), 2)) - 0.5) * 1e-6
+        _accumulate(velocity, sources, delta, _inverse_square_weights(delta, strength, alpha))
+
+def apply_links(positions, velocity, edges, alpha, distance=LINK_DISTANCE):
+    """d3 forceLink：弹簧力，强度和偏置按两端节点的度数分配（与 d3 默认值相同）"""
+    if len(edges) == 0:
+        return
+    n = len(positions)
+    degree = np.bincount(edges.ravel(), minlength=n).astype(np.float64)
+    source, target = edges[:, 0], edges[:, 1]
+    strength = 1 / np.minimum(degree[source], degree[target])
+    bias = degree[source] / (degree[source] + degree[target])
+
+    delta = positions[target] + velocity[target] - positions[source] - velocity[source]
+    length = np.sqrt((delta ** 2).sum(axis=1))
+    length = np.maximum(length, 1e-6)
+    scale = (length - distance) / length * alpha * strength
+    shift = delta * scale[:, None]
+    _accumulate(velocity, target, -shift, bias)
+    _accumulate(velocity, source, shift, 1 - bias)
+
+def apply_radial(positions, velocity, alpha, radius=RADIAL_RADIUS, strength=RADIAL_STRENGTH):
+    """d3 forceRadial：把节点拉向以原点为圆心、半径为 radius 的圆"""
+    r = np.sqrt((positions ** 2).sum(axis=1))
+    k = (radius - r) * strength * alpha / np.maximum(r, 1e-6)
+    velocity += positions * k[:, None]
+
+def compute_layout(node_count, edges, mode="force", iterations=DEFAULT_ITERATIONS, seed=42):
+    """离线运行完整的力导向模拟，返回 (node_count, 2) 的坐标数组
+
+    mode 为 "force" 或 "radial"，对应前端的两种布局。力的组合和 alpha 衰减都与前端一致：
+    link + charge + center，径向布局再加 forceRadial。
+    """
+    rng = np.random.default_rng(seed)
+    positions = initial_positions(node_count)
+    velocity = np.zeros_like(positions)
+    alpha = 1.0
+    alpha_decay = 1 - ALPHA_MIN ** (1 / iterations)
+
+    for _ in range(iterations):
+        alpha += -alpha * alpha_decay
+        apply_links(positions, velocity, edges, alpha)
+        apply_charge(positions, velocity, alpha, rng=rng)
+        if mode == "radial":
+            apply_radial(positions, velocity, alpha)
+        velocity *= 1 - VELOCITY_DECAY
+        positions += velocity
+        # forceCenter：整体平移，使质心回到原点
+        positions -= positions.mean(axis=0)
+
+    return positions
+
+def store_layout(supabase, node_ids, force_positions, radial_positions, batch_size=500):
+    """分批写入 graph_layout，然后删除上一次布局遗留的行（已不在图中的节点）"""
+    layout_run = str(uuid.uuid4())
+    rows = [
+        {
+            'node_id': node_id,
+            'x': round(float(fx), 1),
+            'y': round(float(fy), 1),
+            'radial_x': round(float(rx), 1),
+            'radial_y': round(float(ry), 1),
+            'layout_run': layout_run,
+        }
+        for node_id, (fx, fy), (rx, ry) in zip(node_ids, force_positions, radial_positions)
+    ]
+
+    for i in range(0, len(rows), batch_size):
+        supabase.table('graph_layout').upsert(rows[i:i + batch_size]).execute()
+        print(f"  已写入 {min(i + batch_size, len(rows))}/{len(rows)} 个节点坐标")
+
+    supabase.table('graph_layout').delete().neq('layout_run', layout_run).execute()
+    return len(rows)
+
+def update_graph_layout(supabase, json_file_path, iterations=DEFAULT_ITERATIONS, dry_run=False):
+    """迁移流程中的布局阶段：计算两种布局的坐标并写入 graph_layout
+
+    应在 publish_graph_version 之前调用，这样新版本发布时图谱接口缓存失效，
+    之后的响应会带上新的坐标。
+    """
+    node_ids, edges = load_graph(json_file_path)
+    print(f"🧭 正在为 {len(node_ids)} 个节点、{len(edges)} 条边计算布局坐标...")
+
+    timings = {}
+    positions = {}
+    for mode in ("force", "radial"):
+        start_time = time.time()
+        positions[mode] = compute_layout(len(node_ids), edges, mode=mode, iterations=iterations)
+        timings[mode] = time.time() - start_time
+        print(f"  {mode} 布局完成，耗时 {timings[mode]:.2f} 秒")
+
+    if dry_run:
+        print("🔍 dry-run 模式，不写入数据库")
+        return len(node_ids)
+
+    stored = store_layout(supabase, node_ids, positions["force"], positions["radial"])
+    print(f"✅ 已写入 {stored} 个节点的布局坐标")
+    return stored
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="离线计算图谱布局坐标并写入 graph_layout")
+    parser.add_argument("json_file", nargs="?", help="Neo4j 导出的 JSON Lines 文件，默认为 unreal_engine_graph.json")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="模拟迭代次数")
+    parser.add_argument("--dry-run", action="store_true", help="只计算并打印耗时，不写入数据库")
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    json_path = args.json_file or os.path.join(script_dir, "unreal_engine_graph.json")
+
+    client = None
+    if not args.dry_run:
+        load_dotenv('.env.local')
+        supabase_url = os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not all([supabase_url, supabase_key]):
+            raise ValueError("请确保 .env.local 文件中已设置 SUPABASE_URL 和 SUPABASE_SERVICE_ROLE_KEY。")
+        client = create_client(supabase_url, supabase_key)
+
+    update_graph_layout(client, json_path, iterations=args.iterations, dry_run=args.dry_run)
@@ -0,0 +1,54 @@
+import socket
+from urllib.parse import urlparse
+
+import pytest
+
+from ue_pipeline import config
+from ue_pipeline.clients import get_supabase, get_embedding_pool, get_openai_client
+
+# 需要真实服务的测试共用的 fixture：缺少凭据或服务连不上时跳过测试，
+# 而不是在客户端的重试中等上几分钟后失败
+
+CONNECT_TIMEOUT = 3.0
+
+def is_reachable(url):
+    """能否在 CONNECT_TIMEOUT 内与 url 的主机建立 TCP 连接"""
+    parsed = urlparse(str(url))
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        socket.create_connection((parsed.hostname, port), timeout=CONNECT_TIMEOUT).close()
+        return True
+    except OSError:
+        return False
+
+@pytest.fixture
+def embedding_pool():
+    try:
+        pool = get_embedding_pool()
+    except ValueError as e:
+        pytest.skip(str(e))
+    urls = [str(endpoint.client.base_url) for endpoint in pool.endpoints]
+    if not any(is_reachable(url) for url in urls):
+        pytest.skip(f"无法连接任何向量化端点: {', '.join(urls)}")
+    return pool
+
+@pytest.fixture
+def supabase_client():
+    try:
+        client = get_supabase()
+    except ValueError as e:
+        pytest.skip(str(e))
+    url = config.supabase_url()
+    if not is_reachable(url):
+        pytest.skip(f"无法连接 Supabase: {url}")
+    return client
+
+@pytest.fixture
+def openai_client():
+    try:
+        client = get_openai_client()
+    except ValueError as e:
+        pytest.skip(str(e))
+    if not is_reachable(client.base_url):
+        pytest.skip(f"无法连接 OpenAI: {client.base_url}")
+    return client
@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import threading
+
+import run_metrics
+
+# 向量化端点池：把请求分配到多个 OpenAI 兼容端点 / API key 上，突破单个 key 的速率限制，
+# 单个端点故障时自动切换到其他端点。
+#
+# 端点配置来自环境变量 EMBEDDING_ENDPOINTS（JSON 文件路径或 JSON 字符串），例如：
+#   [{"name": "openai-a", "base_url": "https://api.openai.com/v1", "api_key_env": "OPENAI_KEY_A", "weight": 2},
+#    {"name": "proxy", "base_url": "http://10.0.0.5:8000/v1", "api_key": "sk-...", "weight": 1}]
+# 未设置时只使用 OPENAI_API_KEY 对应的 api.openai.com，与之前的行为一致。
+# 端点还可以写上 "rpm" / "tpm"（该 key 的每分钟请求数 / token 数限制），迁移的 --plan 模式据此估算耗时。
+#
+# - 负载均衡：加权最少在途请求，选择 在途请求数 / 权重 最小的端点
+# - 熔断：连续失败 FAILURE_THRESHOLD 次后摘除端点，冷却后放行一个试探请求，成功则恢复，失败则冷却时间加倍。
+#   只有 429、5xx、超时和连接错误算端点故障；400 / 404 / 413 / 422 是请求本身的问题（例如文本超过上下文长度），
+#   换端点也不会成功，直接抛给调用方，不影响端点状态
+# - 一致性：所有端点使用同一个模型；每个响应都检查模型名和向量维度，不一致的端点被永久停用
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+FAILURE_THRESHOLD = 3
+BASE_COOLDOWN = 30.0
+MAX_COOLDOWN = 300.0
+REQUEST_TIMEOUT = 60.0
+# 请求本身有问题的状态码
+CLIENT_ERROR_STATUSES = (400, 404, 413, 422)
+
+CLOSED, OPEN, HALF_OPEN, DISABLED = "closed", "open", "half_open", "disabled"
+
+class EmbeddingMismatch(Exception):
+    """端点返回的模型或向量维度与配置不一致"""
+
+class NoEndpointAvailable(Exception):
+    """所有端点都被熔断或停用"""
+
+def is_client_error(error):
+    """请求本身有问题（重试或换端点都不会成功）的错误"""
+    return getattr(error, "status_code", None) in CLIENT_ERROR_STATUSES
+
+def load_endpoint_config(default_api_key=None):
+    """读取 EMBEDDING_ENDPOINTS；未设置时返回只包含默认 OpenAI 端点的配置"""
+    raw = os.getenv("EMBEDDING_ENDPOINTS")
+    if not raw:
+        return [{"name": "openai", "base_url": DEFAULT_BASE_URL, "api_key": default_api_key}]
+    if os.path.exists(raw):
+        with open(raw, 'r', encoding='utf-8') as f:
+            raw = f.read()
+    config = json.loads(raw)
+
+    endpoints = []
+    for i, entry in enumerate(config):
+        model = entry.get("model", EMBEDDING_MODEL)
+        if model != EMBEDDING_MODEL:
+            # 不同模型的向量不在同一个空间里，混用会让检索结果失去意义
+            raise ValueError(f"端点 {entry.get('name', i)} 配置的模型 {model} 与 {EMBEDDING_MODEL} 不一致")
+        api_key = entry.get("api_key") or os.getenv(entry.get("api_key_env", ""), "") or default_api_key
+        if not api_key:
+            raise ValueError(f"端点 {entry.get('name', i)} 没有可用的 API key")
+        endpoints.append({
+            "name": entry.get("name") or f"endpoint-{i}",
+            "base_url": entry.get("base_url", DEFAULT_BASE_URL),
+            "api_key": api_key,
+            "weight": float(entry.get("weight", 1)),
+            # 可选：该端点 key 的速率限制，只用于 --plan 估算耗时
+            "rpm": entry.get("rpm"),
+            "tpm": entry.get("tpm"),
+        })
+    if not endpoints:
+        raise ValueError("EMBEDDING_ENDPOINTS 中没有任何端点")
+    return endpoints
+
+class Endpoint:
+    """一个端点的客户端、熔断状态和统计"""
+
+    def __init__(self, name, client, weight=1.0):
+        self.name = name
+        self.client = client
+        self.weight = max(weight, 0.001)
+        self.state = CLOSED
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.cooldown = BASE_COOLDOWN
+        self.open_until = 0.0
+        self.disabled_reason = None
+        # 统计
+        self.requests = 0
+        self.inputs = 0
+        self.failures = 0
+        self.ejections = 0
+        self.tokens = 0
+        self.busy_seconds = 0.0
+
+    def available(self, now):
+        if self.state == CLOSED:
+            return True
+        # 冷却结束后只放行一个试探请求
+        return self.state == OPEN and now >= self.open_until
+
+    def stats(self):
+        return {
+            "endpoint": self.name,
+            "state": self.state,
+            "weight": self.weight,
+            "requests": self.requests,
+            "inputs": self.inputs,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "tokens": self.tokens,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "inputs_per_second": round(self.inputs / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+            "error_rate": round(self.failures / self.requests, 4) if self.requests else 0.0,
+            "disabled_reason": self.disabled_reason,
+        }
+
+class EmbeddingPool:
+    """在多个端点之间分配向量化请求，线程安全"""
+
+    def __init__(self, endpoints, model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS):
+        if not endpoints:
+            raise ValueError("至少需要一个端点")
+        self.endpoints = endpoints
+        self.model = model
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        # 请求结束时通知等待试探结果的线程
+        self._released = threading.Condition(self._lock)
+
+    @classmethod
+    def from_config(cls, config):
+        from openai import OpenAI
+
+        # 重试和切换由端点池负责，关闭客户端自带的重试，避免在故障端点上反复等待
+        return cls([
+            Endpoint(entry["name"],
+                     OpenAI(api_key=entry["api_key"], base_url=entry["base_url"], max_retries=0, timeout=REQUEST_TIMEOUT),
+                     entry.get("weight", 1.0))
+            for entry in config
+        ])
+
+    def _acquire(self):
+        """选择一个端点并计入在途请求；没有可用端点时返回 None 和最早恢复的时间（都已停用时为 None）"""
+        with self._released:
+            while True:
+                now = time.monotonic()
+                candidates = [e for e in self.endpoints if e.available(now)]
+                if candidates:
+                    break
+                reopen = [e.open_until for e in self.endpoints if e.state == OPEN]
+                if not any(e.state == HALF_OPEN for e in self.endpoints):
+                    return None, min(reopen) if reopen else None
+                # 有端点的试探请求还没结束：等它结束（或最早的冷却到期）后重新选择
+                self._released.wait(max(min(reopen) - now, 0) if reopen else None)
+            # 在途请求 / 权重 相同时（例如顺序调用，在途请求都为 0），按已处理请求数 / 权重分摊
+            endpoint = min(candidates, key=lambda e: (e.outstanding / e.weight, e.requests / e.weight))
+            if endpoint.state == OPEN:
+                endpoint.state = HALF_OPEN
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint, None
+
+    def _release(self, endpoint, elapsed, inputs=0, tokens=0, error=None):
+        metrics = run_metrics.metrics
+        metrics.observe("embedding_request_seconds", elapsed)
+        if error is None:
+            metrics.increment("embedding_requests")
+            metrics.increment("embedding_tokens", tokens)
+        elif is_client_error(error):
+            metrics.increment("embedding_client_errors")
+        else:
+            metrics.increment("embedding_failures")
+            if getattr(error, "status_code", None) == 429:
+                metrics.increment("embedding_rate_limited")
+        with self._released:
+            endpoint.outstanding -= 1
+            endpoint.busy_seconds += elapsed
+            self._released.notify_all()
+            # 客户端错误说明端点正常响应了，与成功一样重置连续失败次数
+            if error is None or is_client_error(error):
+                endpoint.inputs += inputs
+                endpoint.tokens += tokens
+                endpoint.consecutive_failures = 0
+                if endpoint.state == HALF_OPEN:
+                    print(f"🟢 向量化端点 {endpoint.name} 已恢复")
+                    endpoint.state = CLOSED
+                    endpoint.cooldown = BASE_COOLDOWN
+                return
+
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.state == DISABLED:
+                return
+            if isinstance(error, EmbeddingMismatch):
+                endpoint.state = DISABLED
+                endpoint.disabled_reason = str(error)
+                print(f"⛔ 向量化端点 {endpoint.name} 已停用: {error}")
+            elif endpoint.state == HALF_OPEN or endpoint.consecutive_failures >= FAILURE_THRESHOLD:
+                if endpoint.state == HALF_OPEN:
+                    endpoint.cooldown = min(endpoint.cooldown * 2, MAX_COOLDOWN)
+                endpoint.state = OPEN
+                endpoint.open_until = time.monotonic() + endpoint.cooldown
+                endpoint.ejections += 1
+                print(f"🔴 向量化端点 {endpoint.name} 连续失败 {endpoint.consecutive_failures} 次，"
+                      f"摘除 {endpoint.cooldown:.0f} 秒: {error}")
+
+    def _check(self, response, count):
+        model = getattr(response, "model", None)
+        if model and not model.startswith(self.model):
+            raise EmbeddingMismatch(f"返回的模型为 {model}，应为 {self.model}")
+        if len(response.data) != count:
+            raise EmbeddingMismatch(f"请求 {count} 个向量，返回了 {len(response.data)} 个")
+        for item in response.data:
+            if len(item.embedding) != self.dimensions:
+                raise EmbeddingMismatch(f"返回的向量维度为 {len(item.embedding)}，应为 {self.dimensions}")
+
+    def embed(self, texts, max_attempts=None):
+        """向量化一批文本，按输入顺序返回向量；失败时切换到其他端点重试"""
+        max_attempts = max_attempts or len(self.endpoints) + 2
+        last_error = None
+        for _ in range(max_attempts):
+            endpoint, reopen_at = self._acquire()
+            if endpoint is None:
+                if reopen_at is None:
+                    raise NoEndpointAvailable(f"所有向量化端点都已停用，最后的错误: {last_error}")
+                # 所有端点都在冷却中，等到最早的一个可以试探
+                time.sleep(max(reopen_at - time.monotonic(), 0))
+                continue
+
+            start = time.monotonic()
+            try:
+                response = endpoint.client.embeddings.create(input=texts, model=self.model)
+                self._check(response, len(texts))
+            except Exception as e:
+                last_error = e
+                self._release(endpoint, time.monotonic() - start, error=e)
+                if is_client_error(e):
+                    raise
+                continue
+            usage = getattr(response, "usage", None)
+            self._release(endpoint, time.monotonic() - start, inputs=len(texts),
+                          tokens=getattr(usage, "total_tokens", 0) or 0)
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        raise last_error or NoEndpointAvailable("没有可用的向量化端点")
+
+    def stats(self):
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+    def take_stats(self):
+        """返回统计并清零计数（熔断状态保留），用于多进程分别上报后再用 merge_stats 合并"""
+        with self._lock:
+            stats = [endpoint.stats() for endpoint in self.endpoints]
+            for endpoint in self.endpoints:
+                endpoint.requests = endpoint.inputs = endpoint.failures = endpoint.ejections = endpoint.tokens = 0
+                endpoint.busy_seconds = 0.0
+            return stats
+
+def merge_stats(stats_lists):
+    """合并多个进程各自的端点统计（按端点名累加）"""
+    merged = {}
+    for stats in stats_lists:
+        for entry in stats:
+            total = merged.setdefault(entry["endpoint"], {**entry, "requests": 0, "inputs": 0, "failures": 0,
+                                                           "ejections": 0, "tokens": 0, "busy_seconds": 0.0})
+            for key in ("requests", "inputs", "failures", "ejections", "tokens", "busy_seconds"):
+                total[key] += entry[key]
+            if entry["state"] == DISABLED:
+                total["state"], total["disabled_reason"] = DISABLED, entry["disabled_reason"]
+    for total in merged.values():
+        total["busy_seconds"] = round(total["busy_seconds"], 3)
+        total["inputs_per_second"] = round(total["inputs"] / total["busy_seconds"], 2) if total["busy_seconds"] else 0.0
+        total["error_rate"] = round(total["failures"] / total["requests"], 4) if total["requests"] else 0.0
+    return list(merged.values())
+
+def print_stats(stats):
+    print("\n📊 向量化端点统计:")
+    for entry in stats:
+        print(f"  - {entry['endpoint']} [{entry['state']}] 权重 {entry['weight']:g}: "
+              f"{entry['requests']} 次请求 / {entry['inputs']} 条文本，失败 {entry['failures']} 次"
+              f"（{entry['error_rate']:.1%}），摘除 {entry['ejections']} 次，"
+              f"{entry['inputs_per_second']:.1f} 条/秒，{entry['tokens']} tokens")
+        if entry["disabled_reason"]:
+            print(f"    停用原因: {entry['disabled_reason']}")
+
+def create_embedding_pool(default_api_key=None):
+    """按 EMBEDDING_ENDPOINTS 创建端点池"""
+    pool = EmbeddingPool.from_config(load_endpoint_config(default_api_key))
+    print(f"🔌 向量化端点: {', '.join(f'{e.name}(x{e.weight:g})' for e in pool.endpoints)}")
+    return pool
@@ -0,0 +1,213 @@
+// Compact columnar wire format for graph responses.
+//
+// The verbose format repeats every property key, label and dependency-type string on
+// every node and link. The compact format stores each distinct string once in a string
+// table and sends nodes and links as parallel arrays of integer indexes:
+//
+//   {
+//     format: "compact-v1",
+//     strings: ["Module", "DEPENDS_ON", "name", ...],
+//     nodes: { id: ["12", "34"], label: [0, 5], group: [0, -1], props: [column, ...] },
+//     links: { source: [0], target: [1], label: [1], props: [column, ...] },
+//     nextCursor: { ... },   // only on paginated responses, passed through as-is
+//   }
+//
+// link.source / link.target are indexes into the node arrays, and -1 marks a missing string.
+// A paginated page can carry links to nodes sent on an earlier page. Such an endpoint has
+// no node index: source / target is -1, and links.sourceId / links.targetId holds the
+// string-table index of its node id (-1 for endpoints in the page). The id columns are
+// only present when at least one link needs them.
+// A property column holds string-table indexes when every value is a string, otherwise raw values.
+// The frontend decoder lives in graphrag-nextjs/src/lib/compactGraph.ts; keep the two in sync.
+
+export const COMPACT_GRAPH_FORMAT = "compact-v1"
+
+// Keys lifted into dedicated columns; everything else goes into props.
+const NODE_BASE_KEYS = new Set(["id", "label", "group"])
+const LINK_BASE_KEYS = new Set(["source", "target", "label"])
+
+export interface CompactColumn {
+  key: number
+  // true: values are string-table indexes (-1 = missing); false: raw JSON values (null = missing)
+  interned: boolean
+  values: unknown[]
+}
+
+export interface CompactGraph {
+  format: typeof COMPACT_GRAPH_FORMAT
+  strings: string[]
+  nodes: { id: string[]; label: number[]; group: number[]; props: CompactColumn[] }
+  links: {
+    source: number[]
+    target: number[]
+    label: number[]
+    props: CompactColumn[]
+    // Node ids of endpoints that are not in nodes, see above
+    sourceId?: number[]
+    targetId?: number[]
+  }
+  nextCursor?: unknown
+}
+
+export interface VerboseGraph {
+  nodes: Record<string, any>[]
+  links: Record<string, any>[]
+  // Continuation cursor of paginated responses (see get-graph-data)
+  nextCursor?: unknown
+}
+
+class StringTable {
+  readonly strings: string[] = []
+  private readonly index = new Map<string, number>()
+
+  intern(value: string | null | undefined): number {
+    if (value === null || value === undefined) return -1
+    let i = this.index.get(value)
+    if (i === undefined) {
+      i = this.strings.length
+      this.strings.push(value)
+      this.index.set(value, i)
+    }
+    return i
+  }
+}
+
+function encodeColumns(rows: Record<string, any>[], baseKeys: Set<string>, table: StringTable): CompactColumn[] {
+  const keys = new Set<string>()
+  for (const row of rows) {
+    for (const key in row) {
+      if (!baseKeys.has(key)) keys.add(key)
+    }
+  }
+
+  const columns: CompactColumn[] = []
+  for (const key of keys) {
+    const interned = rows.every(row => row[key] === undefined || row[key] === null || typeof row[key] === "string")
+    const values = new Array(rows.length)
+    for (let i = 0; i < rows.length; i++) {
+      const value = rows[i][key]
+      values[i] = interned ? table.intern(value) : (value ?? null)
+    }
+    columns.push({ key: table.intern(key), interned, values })
+  }
+  return columns
+}
+
+export function encodeCompactGraph(graph: VerboseGraph): CompactGraph {
+  const table = new StringTable()
+  const nodeIndex = new Map<string, number>()
+
+  const nodes = {
+    id: new Array<string>(graph.nodes.length),
+    label: new Array<number>(graph.nodes.length),
+    group: new Array<number>(graph.nodes.length),
+    props: [] as CompactColumn[],
+  }
+  graph.nodes.forEach((node, i) => {
+    nodes.id[i] = node.id
+    nodes.label[i] = table.intern(node.label)
+    nodes.group[i] = table.intern(node.group)
+    nodeIndex.set(node.id, i)
+  })
+  nodes.props = encodeColumns(graph.nodes, NODE_BASE_KEYS, table)
+
+  const links: CompactGraph["links"] = {
+    source: new Array<number>(graph.links.length),
+    target: new Array<number>(graph.links.length),
+    label: new Array<number>(graph.links.length),
+    props: [] as CompactColumn[],
+  }
+  const sourceId = new Array<number>(graph.links.length)
+  const targetId = new Array<number>(graph.links.length)
+  let outsideEndpoints = false
+  graph.links.forEach((link, i) => {
+    links.source[i] = nodeIndex.get(link.source) ?? -1
+    links.target[i] = nodeIndex.get(link.target) ?? -1
+    sourceId[i] = links.source[i] < 0 ? table.intern(link.source) : -1
+    targetId[i] = links.target[i] < 0 ? table.intern(link.target) : -1
+    if (sourceId[i] >= 0 || targetId[i] >= 0) outsideEndpoints = true
+    links.label[i] = table.intern(link.label)
+  })
+  if (outsideEndpoints) {
+    links.sourceId = sourceId
+    links.targetId = targetId
+  }
+  links.props = encodeColumns(graph.links, LINK_BASE_KEYS, table)
+
+  const compact: CompactGraph = { format: COMPACT_GRAPH_FORMAT, strings: table.strings, nodes, links }
+  if (graph.nextCursor !== undefined) compact.nextCursor = graph.nextCursor
+  return compact
+}
+
+function applyColumns(rows: Record<string, any>[], columns: CompactColumn[], strings: string[]) {
+  for (const column of columns) {
+    const key = strings[column.key]
+    for (let i = 0; i < rows.length; i++) {
+      const value = column.values[i]
+      if (column.interned) {
+        if ((value as number) >= 0) rows[i][key] = strings[value as number]
+      } else if (value !== null) {
+        rows[i][key] = value
+      }
+    }
+  }
+}
+
+// Mirror of the frontend decoder, used by the benchmark and for debugging responses.
+export function decodeCompactGraph(compact: CompactGraph): VerboseGraph {
+  const { strings } = compact
+  const nodes = compact.nodes.id.map((id, i) => {
+    const node: Record<string, any> = { id, label: strings[compact.nodes.label[i]] }
+    const group = compact.nodes.group[i]
+    if (group >= 0) node.group = strings[group]
+    return node
+  })
+  applyColumns(nodes, compact.nodes.props, strings)
+
+  // An endpoint without a node index was sent on an earlier page; its id is in sourceId / targetId.
+  const endpoint = (index: number, idColumn: number[] | undefined, i: number) =>
+    index >= 0 ? nodes[index].id : idColumn && idColumn[i] >= 0 ? strings[idColumn[i]] : undefined
+  const links = compact.links.source.map((source, i) => ({
+    source: endpoint(source, compact.links.sourceId, i),
+    target: endpoint(compact.links.target[i], compact.links.targetId, i),
+    label: strings[compact.links.label[i]],
+  } as Record<string, any>))
+  applyColumns(links, compact.links.props, strings)
+
+  const graph: VerboseGraph = { nodes, links }
+  if (compact.nextCursor !== undefined) graph.nextCursor = compact.nextCursor
+  return graph
+}
+
+// Serialize a graph in the requested format ("compact" or the default verbose one).
+export function serializeGraph(graph: VerboseGraph, format: string | undefined): string {
+  return JSON.stringify(format === "compact" ? encodeCompactGraph(graph) : graph)
+}
+
+// Send an already serialized JSON body, gzip-compressed when the client advertises support for it.
+export function jsonResponse(req: Request, body: string, headers: Record<string, string>): Response {
+  const responseHeaders: Record<string, string> = {
+    ...headers,
+    "Content-Type": "application/json",
+    "Vary": "Accept-Encoding",
+  }
+
+  if ((req.headers.get("Accept-Encoding") ?? "").includes("gzip")) {
+    const compressed = new Blob([body]).stream().pipeThrough(new CompressionStream("gzip"))
+    return new Response(compressed, {
+      headers: { ...responseHeaders, "Content-Encoding": "gzip" },
+      status: 200,
+    })
+  }
+
+  return new Response(body, { headers: responseHeaders, status: 200 })
+}
+
+export function graphResponse(
+  req: Request,
+  graph: VerboseGraph,
+  format: string | undefined,
+  headers: Record<string, string>,
+): Response {
+  return jsonResponse(req, serializeGraph(graph, format), headers)
+}
@@ -0,0 +1,82 @@
+// Payload size and parse time of the verbose vs compact graph formats on a synthetic
+// 20k-edge trace shaped like trace-graph output.
+//
+//   deno bench supabase/functions/_shared/compactGraph_bench.ts
+
+import { decodeCompactGraph, encodeCompactGraph, VerboseGraph } from "./compactGraph.ts"
+
+const NODE_COUNT = 4_000
+const EDGE_COUNT = 20_000
+const LABELS = ["Module", "System", "Subsystem", "Class", "Interface"]
+const DEPENDENCY_TYPES = [
+  "PublicDependencyModuleNames",
+  "PrivateDependencyModuleNames",
+  "PublicIncludePathModuleNames",
+  "PrivateIncludePathModuleNames",
+]
+
+// Small deterministic PRNG so runs are comparable.
+function mulberry32(seed: number) {
+  return () => {
+    seed |= 0
+    seed = (seed + 0x6D2B79F5) | 0
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed)
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296
+  }
+}
+
+function syntheticTrace(): VerboseGraph {
+  const random = mulberry32(42)
+  const nodes = Array.from({ length: NODE_COUNT }, (_, i) => {
+    const label = LABELS[Math.floor(random() * LABELS.length)]
+    return {
+      id: String(1000 + i),
+      label: `Module${i}`,
+      name: `Module${i}`,
+      type: label,
+      description: `Synthetic ${label.toLowerCase()} number ${i} of the Unreal Engine dependency graph.`,
+    }
+  })
+  const links = Array.from({ length: EDGE_COUNT }, () => {
+    // Skew targets towards low ids to mimic hub modules such as Core.
+    const source = Math.floor(random() * NODE_COUNT)
+    const target = Math.floor(random() ** 3 * NODE_COUNT)
+    return {
+      source: nodes[source].id,
+      target: nodes[target].id,
+      label: "DEPENDS_ON",
+      type: DEPENDENCY_TYPES[Math.floor(random() * DEPENDENCY_TYPES.length)],
+    }
+  })
+  return { nodes, links }
+}
+
+async function gzipSize(text: string): Promise<number> {
+  const stream = new Blob([text]).stream().pipeThrough(new CompressionStream("gzip"))
+  return (await new Response(stream).arrayBuffer()).byteLength
+}
+
+const graph = syntheticTrace()
+const verboseJson = JSON.stringify(graph)
+const compactJson = JSON.stringify(encodeCompactGraph(graph))
+
+const kib = (bytes: number) => `${(bytes / 1024).toFixed(1)} KiB`
+console.log(`verbose: ${kib(verboseJson.length)} raw, ${kib(await gzipSize(verboseJson))} gzip`)
+console.log(`compact: ${kib(compactJson.length)} raw, ${kib(await gzipSize(compactJson))} gzip`)
+
+Deno.bench("parse verbose", { group: "parse", baseline: true }, () => {
+  JSON.parse(verboseJson)
+})
+
+Deno.bench("parse + decode compact", { group: "parse" }, () => {
+  decodeCompactGraph(JSON.parse(compactJson))
+})
+
+Deno.bench("encode compact", { group: "encode" }, () => {
+  JSON.stringify(encodeCompactGraph(graph))
+})
+
+Deno.bench("encode verbose", { group: "encode", baseline: true }, () => {
+  JSON.stringify(graph)
+})
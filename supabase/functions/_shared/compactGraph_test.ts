@@ -0,0 +1,48 @@
+// Round-trip tests of the compact graph format.
+//
+//   deno test supabase/functions/_shared/compactGraph_test.ts
+
+import { assertEquals } from "https://deno.land/std@0.177.0/testing/asserts.ts"
+import { decodeCompactGraph, encodeCompactGraph, VerboseGraph } from "./compactGraph.ts"
+
+Deno.test("round-trips nodes, links and property columns", () => {
+  const graph: VerboseGraph = {
+    nodes: [
+      { id: "1", label: "Core", group: "Module", name: "Core", degree: 3 },
+      { id: "2", label: "Engine", name: "Engine", degree: 1 },
+    ],
+    links: [{ source: "2", target: "1", label: "DEPENDS_ON", type: "PublicDependencyModuleNames" }],
+    nextCursor: { degree: 1, id: "2" },
+  }
+  const compact = encodeCompactGraph(graph)
+
+  assertEquals(compact.links.source, [1])
+  assertEquals(compact.links.target, [0])
+  assertEquals(compact.links.sourceId, undefined)
+  assertEquals(decodeCompactGraph(JSON.parse(JSON.stringify(compact))), graph)
+})
+
+Deno.test("keeps links to nodes sent on an earlier page", () => {
+  // Second seed page: node 7 is new, node 1 was on the first page, so it is only
+  // referenced by the links.
+  const graph: VerboseGraph = {
+    nodes: [{ id: "7", label: "Renderer", name: "Renderer" }],
+    links: [
+      { source: "7", target: "1", label: "DEPENDS_ON", type: "PrivateDependencyModuleNames" },
+      { source: "1", target: "7", label: "DEPENDS_ON", type: "PublicIncludePathModuleNames" },
+    ],
+    nextCursor: null,
+  }
+  const compact = encodeCompactGraph(graph)
+
+  assertEquals(compact.links.source, [0, -1])
+  assertEquals(compact.links.target, [-1, 0])
+  assertEquals(compact.strings[compact.links.targetId![0]], "1")
+  assertEquals(compact.strings[compact.links.sourceId![1]], "1")
+  assertEquals(compact.links.sourceId![0], -1)
+  assertEquals(compact.links.targetId![1], -1)
+
+  const decoded = decodeCompactGraph(JSON.parse(JSON.stringify(compact)))
+  assertEquals(decoded.links, graph.links)
+  assertEquals(decoded.nodes, graph.nodes)
+})
@@ -0,0 +1,146 @@
+// Versioned response cache for the graph Edge Functions.
+//
+// The graph only changes when the migration script publishes a new version
+// (see publish_graph_version()), so responses are cached per version in two tiers:
+// a small in-memory LRU per function instance, backed by the graph_response_cache table.
+// Cache keys and ETags embed the version, so publishing a version invalidates everything,
+// and clients holding the current ETag get a 304 without touching Neo4j at all.
+
+import { createClient, SupabaseClient } from "https://esm.sh/@supabase/supabase-js@2"
+import { jsonResponse, serializeGraph, VerboseGraph } from "./compactGraph.ts"
+
+// How long an instance trusts its last version lookup before asking Postgres again.
+const VERSION_TTL_MS = 10_000
+const MEMORY_CACHE_MAX_ENTRIES = 200
+
+export interface GraphCacheKey {
+  endpoint: string
+  nodeId?: string | number | null
+  direction?: string | null
+  depth?: number | null
+  format?: string | null
+  level?: string | null
+  limit?: number | null
+  cursor?: string | null
+}
+
+interface CacheEntry {
+  etag: string
+  body: string
+}
+
+let cacheClient: SupabaseClient | null = null
+let versionState: { version: number; fetchedAt: number } | null = null
+// Map iteration order is insertion order, so re-inserting on hit gives us an LRU.
+const memoryCache = new Map<string, CacheEntry>()
+
+// Service-role client shared by the graph helpers (cache tables, layout lookups).
+export function getCacheClient(): SupabaseClient {
+  if (!cacheClient) {
+    const supabaseUrl = Deno.env.get("SUPABASE_URL") ?? Deno.env.get("PROJECT_URL")
+    const serviceRoleKey = Deno.env.get("SUPABASE_SERVICE_ROLE_KEY") ?? Deno.env.get("PROJECT_SERVICE_ROLE_KEY")
+    cacheClient = createClient(supabaseUrl ?? "", serviceRoleKey ?? "", { auth: { persistSession: false } })
+  }
+  return cacheClient
+}
+
+export async function currentGraphVersion(): Promise<number> {
+  if (versionState && Date.now() - versionState.fetchedAt < VERSION_TTL_MS) {
+    return versionState.version
+  }
+  const { data, error } = await getCacheClient().rpc("current_graph_version")
+  if (error) throw error
+  const version = Number(data ?? 0)
+  if (versionState && versionState.version !== version) {
+    // A new version was published; nothing from the old one can be served again.
+    memoryCache.clear()
+  }
+  versionState = { version, fetchedAt: Date.now() }
+  return version
+}
+
+function serializeKey(version: number, key: GraphCacheKey): string {
+  return [
+    version,
+    key.endpoint,
+    key.nodeId ?? "-",
+    key.direction ?? "-",
+    key.depth ?? "-",
+    key.format ?? "verbose",
+    key.level ?? "-",
+    key.limit ?? "-",
+    key.cursor ?? "-",
+  ].join(":")
+}
+
+async function makeEtag(version: number, cacheKey: string): Promise<string> {
+  const digest = await crypto.subtle.digest("SHA-1", new TextEncoder().encode(cacheKey))
+  const hex = Array.from(new Uint8Array(digest).slice(0, 8), b => b.toString(16).padStart(2, "0")).join("")
+  return `"g${version}-${hex}"`
+}
+
+function rememberInMemory(cacheKey: string, entry: CacheEntry) {
+  memoryCache.delete(cacheKey)
+  memoryCache.set(cacheKey, entry)
+  if (memoryCache.size > MEMORY_CACHE_MAX_ENTRIES) {
+    memoryCache.delete(memoryCache.keys().next().value!)
+  }
+}
+
+function etagMatches(req: Request, etag: string): boolean {
+  const ifNoneMatch = req.headers.get("If-None-Match")
+  if (!ifNoneMatch) return false
+  return ifNoneMatch.split(",").some(tag => tag.trim().replace(/^W\//, "") === etag)
+}
+
+// Serve a graph response from cache, or compute, serialize and cache it.
+// Cache failures are logged and never fail the request.
+export async function cachedGraphResponse(
+  req: Request,
+  key: GraphCacheKey,
+  compute: () => Promise<VerboseGraph>,
+  headers: Record<string, string>,
+): Promise<Response> {
+  let version: number
+  try {
+    version = await currentGraphVersion()
+  } catch (err) {
+    console.error("Graph version lookup failed, serving uncached:", err)
+    return jsonResponse(req, serializeGraph(await compute(), key.format ?? undefined), headers)
+  }
+
+  const cacheKey = serializeKey(version, key)
+  const etag = await makeEtag(version, cacheKey)
+  const cacheHeaders = { ...headers, "ETag": etag, "Cache-Control": "no-cache" }
+
+  if (etagMatches(req, etag)) {
+    return new Response(null, { headers: cacheHeaders, status: 304 })
+  }
+
+  const cached = memoryCache.get(cacheKey)
+  if (cached) {
+    rememberInMemory(cacheKey, cached)
+    return jsonResponse(req, cached.body, { ...cacheHeaders, "X-Graph-Cache": "memory" })
+  }
+
+  const client = getCacheClient()
+  const { data: row, error: readError } = await client
+    .from("graph_response_cache")
+    .select("etag, body")
+    .eq("cache_key", cacheKey)
+    .maybeSingle()
+  if (readError) console.error("Graph cache read failed:", readError)
+  if (row) {
+    rememberInMemory(cacheKey, row)
+    return jsonResponse(req, row.body, { ...cacheHeaders, "X-Graph-Cache": "postgres" })
+  }
+
+  const body = serializeGraph(await compute(), key.format ?? undefined)
+  rememberInMemory(cacheKey, { etag, body })
+  const { error: writeError } = await client
+    .from("graph_response_cache")
+    .upsert({ cache_key: cacheKey, version, etag, body })
+  if (writeError) console.error("Graph cache write failed:", writeError)
+
+  return jsonResponse(req, body, { ...cacheHeaders, "X-Graph-Cache": "miss" })
+}
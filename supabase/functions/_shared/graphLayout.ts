@@ -0,0 +1,41 @@
+// Attaches the precomputed layout coordinates (graph_layout table) to graph responses.
+//
+// compute_graph_layout.py runs the force simulation offline during the migration, for
+// both frontend layouts. Nodes come back with layoutX/layoutY ("force") and
+// radialX/radialY ("radial"), so the browser renders them in place and only runs a short
+// refinement. Nodes without a stored position are left untouched and get laid out by d3.
+
+import { getCacheClient } from "./graphCache.ts"
+import { VerboseGraph } from "./compactGraph.ts"
+
+interface LayoutRow {
+  node_id: string
+  x: number
+  y: number
+  radial_x: number
+  radial_y: number
+}
+
+// Layout lookup failures are logged and never fail the request.
+export async function withLayout(graph: VerboseGraph): Promise<VerboseGraph> {
+  if (!graph.nodes.length) return graph
+
+  const { data, error } = await getCacheClient()
+    .rpc("get_graph_layout", { node_ids: graph.nodes.map(node => node.id) })
+  if (error) {
+    console.error("Graph layout lookup failed:", error)
+    return graph
+  }
+
+  // One JSONB array, not a row set, so PostgREST's max_rows cap does not apply
+  const positions = new Map<string, LayoutRow>(((data ?? []) as LayoutRow[]).map(row => [row.node_id, row]))
+  for (const node of graph.nodes) {
+    const row = positions.get(node.id)
+    if (!row) continue
+    node.layoutX = row.x
+    node.layoutY = row.y
+    node.radialX = row.radial_x
+    node.radialY = row.radial_y
+  }
+  return graph
+}
@@ -10,6 +10,24 @@ const corsHeaders = {
   "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type",
 }
 
+const DEFAULT_SESSION_PAGE_SIZE = 50
+const DEFAULT_MESSAGE_PAGE_SIZE = 50
+// Keep in sync with the clamp inside get_chat_sessions() / get_chat_messages() so a full page still yields a cursor.
+const MAX_PAGE_SIZE = 200
+
+interface SessionCursor {
+  lastUpdated: string
+  sessionId: string
+}
+
+interface MessageCursor {
+  createdAt: string
+  id: number
+}
+
+const clampPageSize = (value: unknown, fallback: number) =>
+  Math.min(Math.max(Number(value) || fallback, 1), MAX_PAGE_SIZE)
+
 serve(async (req) => {
   // Handle CORS preflight requests
   if (req.method === "OPTIONS") {
@@ -18,13 +36,14 @@ serve(async (req) => {
 
   try {
     // Safely parse the request body. If it's empty or not JSON, proceed as if no sessionId was passed.
-    let sessionId: string | null = null;
+    let body: any = {};
     try {
-      const body = await req.json();
-      sessionId = body.sessionId;
+      body = (await req.json()) ?? {};
     } catch (e) {
       // This is expected when no body is sent, e.g., for fetching the session list.
     }
+    const sessionId: string | null = body.sessionId ?? null;
+    const messageId: number | null = body.messageId ?? null;
 
     // Create a Supabase client with the user's token.
     // This will work for both local development and deployed functions.
@@ -40,22 +59,57 @@ serve(async (req) => {
     );
 
     let data, error;
+    let responseBody;
 
-    if (sessionId) {
-      // Feature 1: Fetch all messages for a specific session
+    if (messageId) {
+      // Feature 3: Fetch the thinking steps of a single message on demand
       ({ data, error } = await supabaseClient
         .from("chat_history")
-        .select("*")
-        .eq("session_id", sessionId)
-        .order("created_at", { ascending: true }))
+        .select("id, thinking_steps")
+        .eq("id", messageId)
+        .single())
+      if (error) throw error
+      responseBody = data
+    } else if (sessionId) {
+      // Feature 1: Fetch one page of messages for a specific session, newest first.
+      // The cursor is the (created_at, id) of the oldest message of the previous page.
+      // thinking_steps is left out unless includeThinking is set; has_thinking marks the rows that have it.
+      const pageSize = clampPageSize(body.pageSize, DEFAULT_MESSAGE_PAGE_SIZE)
+      const cursor: MessageCursor | null = body.cursor ?? null
+      ;({ data, error } = await supabaseClient.rpc("get_chat_messages", {
+        target_session_id: sessionId,
+        page_size: pageSize,
+        before_created_at: cursor?.createdAt ?? null,
+        before_id: cursor?.id ?? null,
+        include_thinking: body.includeThinking === true,
+      }))
+      if (error) throw error
+
+      const last = data.length === pageSize ? data[data.length - 1] : null
+      responseBody = {
+        messages: data,
+        nextCursor: last ? { createdAt: last.created_at, id: last.id } : null,
+      }
     } else {
-      // Feature 2: Fetch the list of all unique sessions for the sidebar
-      ({ data, error } = await supabaseClient.rpc("get_chat_sessions"))
-    }
+      // Feature 2: Fetch one page of sessions for the sidebar, newest first.
+      // The cursor is the (last_updated, session_id) of the last session of the previous page.
+      const pageSize = clampPageSize(body.pageSize, DEFAULT_SESSION_PAGE_SIZE)
+      const cursor: SessionCursor | null = body.cursor ?? null
+      ;({ data, error } = await supabaseClient.rpc("get_chat_sessions", {
+        page_size: pageSize,
+        before_last_updated: cursor?.lastUpdated ?? null,
+        before_session_id: cursor?.sessionId ?? null,
+      }))
+      if (error) throw error
 
-    if (error) throw error
+      const last = data.length === pageSize ? data[data.length - 1] : null
+      responseBody = {
+        sessions: data,
+        nextCursor: last ? { lastUpdated: last.last_updated, sessionId: last.session_id } : null,
+      }
+    }
 
-    return new Response(JSON.stringify(data), {
+    return new Response(JSON.stringify(responseBody), {
       headers: { ...corsHeaders, "Content-Type": "application/json" },
       status: 200,
     })
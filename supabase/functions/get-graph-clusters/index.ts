@@ -0,0 +1,124 @@
+import { serve } from "https://deno.land/std@0.177.0/http/server.ts";
+import { cachedGraphResponse, getCacheClient } from "../_shared/graphCache.ts";
+import { jsonResponse, VerboseGraph } from "../_shared/compactGraph.ts";
+import { withLayout } from "../_shared/graphLayout.ts";
+
+// Serves the precomputed cluster aggregation (see compute_graph_clusters.py):
+//   { levels: true }                  -> the available aggregation levels
+//   { level }                         -> one super-node per cluster and weighted super-edges
+//   { level, expand: clusterId }      -> the members of one cluster and the edges touching them
+// Cluster nodes use "cluster:<level>:<clusterId>" ids; expanded members keep their Neo4j ids,
+// so they can be traced like any other node.
+
+const corsHeaders = {
+  "Access-Control-Allow-Origin": "*",
+  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type, if-none-match",
+  "Access-Control-Expose-Headers": "etag, x-graph-cache",
+};
+
+const DEFAULT_LEVEL = "label";
+// Members returned when expanding a cluster, best connected first
+const MAX_EXPANDED_NODES = 500;
+const MAX_EXPANDED_LINKS = 5000;
+
+const clusterNodeId = (level: string, clusterId: string) => `cluster:${level}:${clusterId}`;
+
+async function getLevels() {
+  const { data, error } = await getCacheClient()
+    .from("graph_cluster_levels")
+    .select("level, kind, ordinal, cluster_count, edge_count")
+    .order("ordinal");
+  if (error) throw error;
+  return data;
+}
+
+async function getOverview(level: string): Promise<VerboseGraph> {
+  // One RPC returning JSONB: table selects are capped at max_rows, and a level can have
+  // far more super-edges than that
+  const { data, error } = await getCacheClient().rpc("get_graph_cluster_overview", { target_level: level });
+  if (error) throw error;
+
+  return {
+    nodes: data.clusters.map((c: any) => ({
+      id: clusterNodeId(level, c.cluster_id),
+      label: c.name,
+      group: c.dominant_label,
+      cluster: true,
+      clusterLevel: level,
+      clusterId: c.cluster_id,
+      size: c.size,
+      internalWeight: c.internal_weight,
+    })),
+    links: data.edges.map((e: any) => ({
+      source: clusterNodeId(level, e.source_cluster),
+      target: clusterNodeId(level, e.target_cluster),
+      label: "DEPENDS_ON",
+      weight: e.weight,
+    })),
+  };
+}
+
+async function getExpansion(level: string, clusterId: string): Promise<VerboseGraph> {
+  const { data, error } = await getCacheClient().rpc("get_graph_cluster_expansion", {
+    target_level: level,
+    target_cluster: clusterId,
+    max_nodes: MAX_EXPANDED_NODES,
+    max_links: MAX_EXPANDED_LINKS,
+  });
+  if (error) throw error;
+
+  const graph = {
+    nodes: data.members.map((m: any) => ({
+      id: m.node_id,
+      label: m.name || m.node_label,
+      group: m.node_label,
+      memberOf: clusterNodeId(level, clusterId),
+      ...m.properties,
+    })),
+    links: data.links.map((l: any) => ({
+      source: l.source_id,
+      target: l.target_id,
+      label: "DEPENDS_ON",
+      type: l.dependency_type,
+      // Where to attach the edge while the other endpoint's cluster is still collapsed
+      otherCluster: l.other_cluster_id === null ? null : clusterNodeId(level, l.other_cluster_id),
+    })),
+  };
+  if (data.member_count > graph.nodes.length) {
+    console.log(`Expanded ${clusterId}@${level}: ${graph.nodes.length} of ${data.member_count} members`);
+  }
+  return withLayout(graph);
+}
+
+serve(async (req) => {
+  if (req.method === "OPTIONS") {
+    return new Response("ok", { headers: corsHeaders });
+  }
+
+  try {
+    let body: { level?: string; expand?: string; format?: string; levels?: boolean } = {};
+    try {
+      body = await req.json();
+    } catch (_e) {
+      // No body sent: overview of the default level.
+    }
+
+    if (body.levels) {
+      return jsonResponse(req, JSON.stringify({ levels: await getLevels() }), corsHeaders);
+    }
+
+    const level = body.level || DEFAULT_LEVEL;
+    const expand = body.expand ?? null;
+    return await cachedGraphResponse(
+      req,
+      { endpoint: "get-graph-clusters", level, nodeId: expand, format: body.format },
+      () => expand ? getExpansion(level, expand) : getOverview(level),
+      corsHeaders,
+    );
+  } catch (err) {
+    return new Response(String(err?.message ?? err), {
+      headers: { ...corsHeaders, "Content-Type": "application/json" },
+      status: 500,
+    });
+  }
+});
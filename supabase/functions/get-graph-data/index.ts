@@ -1,9 +1,12 @@
 import { serve } from "https://deno.land/std@0.177.0/http/server.ts";
 import neo4j from "npm:neo4j-driver";
+import { cachedGraphResponse } from "../_shared/graphCache.ts";
+import { withLayout } from "../_shared/graphLayout.ts";
 
 const corsHeaders = {
   "Access-Control-Allow-Origin": "*",
-  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type",
+  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type, if-none-match",
+  "Access-Control-Expose-Headers": "etag, x-graph-cache",
 };
 
 const NEO4J_URI = Deno.env.get("NEO4J_URI")!;
@@ -15,49 +18,139 @@ const driver = neo4j.driver(
   neo4j.auth.basic(NEO4J_USERNAME, NEO4J_PASSWORD)
 );
 
-async function getGraphData() {
+// Level-of-detail browsing: instead of one arbitrary sample, the graph is served in
+// bounded pages that the frontend merges into what it already shows.
+//   { mode: "seed" }               -> nodes by descending degree, most connected first
+//   { mode: "expand", nodeId }     -> neighbors of one node, most connected first
+// Both accept { limit, cursor } and return nextCursor (null on the last page), so the
+// whole graph stays reachable while each response stays small.
+const DEFAULT_PAGE_SIZE = 100;
+const MAX_PAGE_SIZE = 500;
+// Links of one seed page are read in chunks of this size until none are left, so hub
+// pages with many links still return all of them
+const LINK_CHUNK_SIZE = 2000;
+
+interface GraphCursor {
+  degree: number;
+  id: string;
+}
+
+function toGraphNode(node: any) {
+  return {
+    id: node.identity.toString(),
+    label: node.properties.name || node.labels[0],
+    group: node.labels[0], // Add group property for coloring
+    ...node.properties
+  };
+}
+
+function toGraphLink(relationship: any) {
+  return {
+    source: relationship.start.toString(),
+    target: relationship.end.toString(),
+    label: relationship.type,
+    ...relationship.properties
+  };
+}
+
+function parseCursor(cursor: any): GraphCursor | null {
+  if (!cursor || !Number.isFinite(Number(cursor.degree)) || cursor.id === undefined) return null;
+  return { degree: Math.trunc(Number(cursor.degree)), id: String(cursor.id) };
+}
+
+// Keyset condition on (degree DESC, id ASC): rows strictly after the cursor.
+const AFTER_CURSOR = "($cursorDegree IS NULL OR degree < $cursorDegree OR (degree = $cursorDegree AND id(n) > $cursorId))";
+
+function cursorParams(cursor: GraphCursor | null) {
+  return {
+    cursorDegree: cursor ? neo4j.int(cursor.degree) : null,
+    cursorId: cursor ? neo4j.int(cursor.id) : null,
+  };
+}
+
+function nextCursor(records: any[], limit: number): GraphCursor | null {
+  if (records.length < limit) return null;
+  const last = records[records.length - 1];
+  return { degree: last.get('degree').toNumber(), id: last.get('n').identity.toString() };
+}
+
+async function getSeedPage(limit: number, cursor: GraphCursor | null) {
+  const session = driver.session();
+  try {
+    const page = await session.run(
+      `MATCH (n)
+       WITH n, size([(n)--() | 1]) AS degree
+       WHERE ${AFTER_CURSOR}
+       RETURN n, degree
+       ORDER BY degree DESC, id(n) ASC
+       LIMIT $limit`,
+      { ...cursorParams(cursor), limit: neo4j.int(limit) }
+    );
+    const nodes = page.records.map(record => toGraphNode(record.get('n')));
+    const ids = page.records.map(record => record.get('n').identity);
+
+    // Links between this page and itself or any earlier page, i.e. every link whose
+    // endpoints the client has once it has loaded the pages up to this one. Read in
+    // relationship id order, keyset-paged on id(r), until a chunk comes back short.
+    const links: any[] = [];
+    let afterLink: any = null;
+    while (true) {
+      const chunk = await session.run(
+        `MATCH (n)-[r]-(m)
+         WHERE id(n) IN $ids AND ($afterLink IS NULL OR id(r) > $afterLink)
+         WITH r, m, size([(m)--() | 1]) AS degree
+         WHERE id(m) IN $ids
+            OR ($cursorDegree IS NOT NULL
+                AND (degree > $cursorDegree OR (degree = $cursorDegree AND id(m) <= $cursorId)))
+         WITH DISTINCT r
+         RETURN r
+         ORDER BY id(r) ASC
+         LIMIT $chunkSize`,
+        { ids, afterLink, ...cursorParams(cursor), chunkSize: neo4j.int(LINK_CHUNK_SIZE) }
+      );
+      links.push(...chunk.records.map(record => toGraphLink(record.get('r'))));
+      if (chunk.records.length < LINK_CHUNK_SIZE) break;
+      afterLink = chunk.records[chunk.records.length - 1].get('r').identity;
+    }
+
+    return {
+      nodes,
+      links,
+      nextCursor: nextCursor(page.records, limit),
+    };
+  } finally {
+    await session.close();
+  }
+}
+
+async function getNeighborPage(nodeId: string, limit: number, cursor: GraphCursor | null) {
   const session = driver.session();
   try {
     const result = await session.run(
-      'MATCH (n)-[r]->(m) RETURN n, r, m LIMIT 25'
+      `MATCH (c)-[r]-(n)
+       WHERE id(c) = $nodeId AND n <> c
+       WITH c, n, collect(r) AS rels, size([(n)--() | 1]) AS degree
+       WHERE ${AFTER_CURSOR}
+       RETURN c, n, rels, degree
+       ORDER BY degree DESC, id(n) ASC
+       LIMIT $limit`,
+      { nodeId: neo4j.int(nodeId), ...cursorParams(cursor), limit: neo4j.int(limit) }
     );
 
     const nodes = new Map();
-    const links = [];
-
+    const links: any[] = [];
     result.records.forEach(record => {
-      const nodeN = record.get('n');
-      const nodeM = record.get('m');
-      const relationship = record.get('r');
-
-      if (!nodes.has(nodeN.identity.toString())) {
-        nodes.set(nodeN.identity.toString(), {
-          id: nodeN.identity.toString(),
-          label: nodeN.properties.name || nodeN.labels[0],
-          group: nodeN.labels[0], // Add group property for coloring
-          ...nodeN.properties
-        });
-      }
-      if (!nodes.has(nodeM.identity.toString())) {
-        nodes.set(nodeM.identity.toString(), {
-          id: nodeM.identity.toString(),
-          label: nodeM.properties.name || nodeM.labels[0],
-          group: nodeM.labels[0], // Add group property for coloring
-          ...nodeM.properties
-        });
-      }
-
-      links.push({
-        source: relationship.start.toString(),
-        target: relationship.end.toString(),
-        label: relationship.type,
-        ...relationship.properties
-      });
+      const center = record.get('c');
+      const neighbor = record.get('n');
+      nodes.set(center.identity.toString(), toGraphNode(center));
+      nodes.set(neighbor.identity.toString(), toGraphNode(neighbor));
+      record.get('rels').forEach((relationship: any) => links.push(toGraphLink(relationship)));
     });
 
     return {
       nodes: Array.from(nodes.values()),
-      links: links
+      links,
+      nextCursor: nextCursor(result.records, limit),
     };
   } finally {
     await session.close();
@@ -70,11 +163,35 @@ serve(async (req) => {
   }
 
   try {
-    const graphData = await getGraphData();
-    return new Response(JSON.stringify(graphData), {
-      headers: { ...corsHeaders, "Content-Type": "application/json" },
-      status: 200,
-    });
+    // The body is optional: without one, the first seed page is returned.
+    let body: { mode?: string; nodeId?: string; limit?: number; cursor?: unknown; format?: string } = {};
+    try {
+      body = await req.json();
+    } catch (_e) {
+      // No body sent: defaults.
+    }
+
+    const mode = body.mode === "expand" ? "expand" : "seed";
+    if (mode === "expand" && !body.nodeId) {
+      throw new Error("Missing nodeId");
+    }
+    const limit = Math.min(Math.max(Math.trunc(Number(body.limit) || DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE);
+    const cursor = parseCursor(body.cursor);
+    const nodeId = mode === "expand" ? String(body.nodeId) : null;
+
+    return await cachedGraphResponse(
+      req,
+      {
+        endpoint: "get-graph-data",
+        direction: mode,
+        nodeId,
+        limit,
+        cursor: cursor ? `${cursor.degree}/${cursor.id}` : null,
+        format: body.format,
+      },
+      async () => withLayout(nodeId ? await getNeighborPage(nodeId, limit, cursor) : await getSeedPage(limit, cursor)),
+      corsHeaders,
+    );
   } catch (err) {
     return new Response(String(err?.message ?? err), {
       headers: { ...corsHeaders, "Content-Type": "application/json" },
@@ -147,9 +147,11 @@ serve(async (req) => {
     if (!openaiApiKey) {
       throw new Error("Missing environment variable OPENAI_API_KEY")
     }
+    // OPENAI_BASE_URL points the function at another OpenAI-compatible endpoint,
+    // e.g. the local chat stand-in used by load_rag_query.py
     const kimi = new OpenAI({
       apiKey: openaiApiKey,
-      baseURL: "https://api.moonshot.cn/v1",
+      baseURL: Deno.env.get("OPENAI_BASE_URL") ?? "https://api.moonshot.cn/v1",
     })
 
     // Persist user's message
@@ -1,15 +1,20 @@
 import { serve } from "https://deno.land/std@0.177.0/http/server.ts";
 import neo4j from "npm:neo4j-driver";
+import { cachedGraphResponse } from "../_shared/graphCache.ts";
+import { withLayout } from "../_shared/graphLayout.ts";
 
 const corsHeaders = {
   "Access-Control-Allow-Origin": "*",
-  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type",
+  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type, if-none-match",
+  "Access-Control-Expose-Headers": "etag, x-graph-cache",
 };
 
 const NEO4J_URI = Deno.env.get("NEO4J_URI")!;
 const NEO4J_USERNAME = Deno.env.get("NEO4J_USERNAME")!;
 const NEO4J_PASSWORD = Deno.env.get("NEO4J_PASSWORD")!;
 
+const MAX_TRACE_DEPTH = 10;
+
 const driver = neo4j.driver(
   NEO4J_URI,
   neo4j.auth.basic(NEO4J_USERNAME, NEO4J_PASSWORD)
@@ -57,29 +62,36 @@ serve(async (req) => {
   }
 
   try {
-    const { nodeId, direction } = await req.json();
+    const { nodeId, direction, format, depth: requestedDepth } = await req.json();
 
     if (!nodeId || !direction) {
       throw new Error("Missing nodeId or direction");
     }
 
-    const query = direction === 'UPSTREAM'
-      ? `MATCH p=(downstream)-[:DEPENDS_ON*1..10]->(upstream) WHERE id(upstream) = ${nodeId} RETURN p`
-      : `MATCH p=(downstream)-[:DEPENDS_ON*1..10]->(upstream) WHERE id(downstream) = ${nodeId} RETURN p`;
+    // Variable-length bounds cannot be query parameters, so clamp the depth to a safe integer.
+    const depth = Math.min(Math.max(Math.trunc(Number(requestedDepth) || MAX_TRACE_DEPTH), 1), MAX_TRACE_DEPTH);
 
-    const session = driver.session();
-    let graphData;
-    try {
-      const result = await session.run(query);
-      graphData = processRecords(result.records);
-    } finally {
-      await session.close();
-    }
+    const traceDirection = direction === 'UPSTREAM' ? 'UPSTREAM' : 'DOWNSTREAM';
+    const query = traceDirection === 'UPSTREAM'
+      ? `MATCH p=(downstream)-[:DEPENDS_ON*1..${depth}]->(upstream) WHERE id(upstream) = $nodeId RETURN p`
+      : `MATCH p=(downstream)-[:DEPENDS_ON*1..${depth}]->(upstream) WHERE id(downstream) = $nodeId RETURN p`;
 
-    return new Response(JSON.stringify(graphData), {
-      headers: { ...corsHeaders, "Content-Type": "application/json" },
-      status: 200,
-    });
+    const traceGraph = async () => {
+      const session = driver.session();
+      try {
+        const result = await session.run(query, { nodeId: neo4j.int(nodeId) });
+        return processRecords(result.records);
+      } finally {
+        await session.close();
+      }
+    };
+
+    return await cachedGraphResponse(
+      req,
+      { endpoint: "trace-graph", nodeId, direction: traceDirection, depth, format },
+      async () => withLayout(await traceGraph()),
+      corsHeaders,
+    );
   } catch (err) {
     return new Response(String(err?.message ?? err), {
       headers: { ...corsHeaders, "Content-Type": "application/json" },
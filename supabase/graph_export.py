@@ -0,0 +1,158 @@
+import io
+import sys
+import json
+import gzip
+
+# 可选的更快的 JSON 解码器：依次尝试 msgspec、orjson，都没有时使用标准库
+try:
+    import msgspec
+    _decode = msgspec.json.decode
+    _DecodeError = msgspec.DecodeError
+    DECODER = "msgspec"
+except ImportError:
+    try:
+        import orjson
+        _decode = orjson.loads
+        _DecodeError = orjson.JSONDecodeError
+        DECODER = "orjson"
+    except ImportError:
+        _decode = json.loads
+        _DecodeError = json.JSONDecodeError
+        DECODER = "json"
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+class ExportNode:
+    """导出文件中的一个节点
+
+    字段与导出格式一致，并提供 get()，迁移脚本中按字典读取节点的代码无需修改。
+    """
+    __slots__ = ("id", "labels", "properties")
+
+    def __init__(self, id, labels, properties):
+        self.id = id
+        self.labels = labels
+        self.properties = properties
+
+    def get(self, key, default=None):
+        if key == "type":
+            return "node"
+        if key in ExportNode.__slots__:
+            return getattr(self, key)
+        return default
+
+    def __repr__(self):
+        return f"ExportNode(id={self.id!r}, labels={self.labels!r})"
+
+class ExportRelationship:
+    """导出文件中的一个关系
+
+    start / end 是对端点 ExportNode 的引用，而不是导出文件里内嵌的节点副本。
+    """
+    __slots__ = ("id", "label", "properties", "start", "end")
+
+    def __init__(self, id, label, properties, start, end):
+        self.id = id
+        self.label = label
+        self.properties = properties
+        self.start = start
+        self.end = end
+
+    def get(self, key, default=None):
+        if key == "type":
+            return "relationship"
+        if key in ExportRelationship.__slots__:
+            return getattr(self, key)
+        return default
+
+    def __repr__(self):
+        return f"ExportRelationship(id={self.id!r}, label={self.label!r}, start={self.start.id!r}, end={self.end.id!r})"
+
+def open_export(path):
+    """以二进制方式打开导出文件，按文件头自动识别 gzip / zstd 压缩"""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, 'rb')
+    if magic == ZSTD_MAGIC:
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("读取 zstd 压缩的导出文件需要安装 zstandard（pip install zstandard）")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    return open(path, 'rb')
+
+def iter_export_items(path):
+    """逐行解码导出文件，生成原始的字典记录；无法解析的行会被跳过"""
+    with open_export(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield _decode(line)
+            except _DecodeError:
+                continue
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _intern_properties(props):
+    """属性名和 name 值在大量节点间重复，驻留后只保留一份"""
+    if not props:
+        return {}
+    interned = {sys.intern(key): value for key, value in props.items()}
+    if isinstance(interned.get("name"), str):
+        interned["name"] = sys.intern(interned["name"])
+    return interned
+
+def read_export(path):
+    """读取导出文件，返回 (all_nodes, all_relationships)，元素为 ExportNode / ExportRelationship
+
+    标签、名称、关系类型和依赖类型字符串都会被驻留；关系只保留端点的引用，
+    端点不在节点集合中时才用关系里内嵌的副本构造一个占位节点。
+    """
+    all_nodes = []
+    nodes_by_id = {}
+    all_relationships = []
+    # 出现在节点之前的端点先用占位节点，读完后再换成真正的节点
+    placeholders = {}
+
+    def endpoint(embedded):
+        node_id = embedded.get("id")
+        node = nodes_by_id.get(node_id)
+        if node is None:
+            node = placeholders.get(node_id)
+            if node is None:
+                node = ExportNode(node_id, tuple(_intern(label) for label in embedded.get("labels") or ()),
+                                  _intern_properties(embedded.get("properties")))
+                placeholders[node_id] = node
+        return node
+
+    for item in iter_export_items(path):
+        item_type = item.get("type")
+        if item_type == "node":
+            node = ExportNode(item.get("id"), tuple(_intern(label) for label in item.get("labels") or ()),
+                              _intern_properties(item.get("properties")))
+            all_nodes.append(node)
+            nodes_by_id[node.id] = node
+        elif item_type == "relationship":
+            props = item.get("properties") or {}
+            if isinstance(props.get("type"), str):
+                props["type"] = sys.intern(props["type"])
+            all_relationships.append(ExportRelationship(
+                item.get("id"),
+                _intern(item.get("label")),
+                props,
+                endpoint(item.get("start") or {}),
+                endpoint(item.get("end") or {}),
+            ))
+
+    resolved = {node_id for node_id in placeholders if node_id in nodes_by_id}
+    if resolved:
+        for rel in all_relationships:
+            if rel.start.id in resolved and rel.start is not nodes_by_id[rel.start.id]:
+                rel.start = nodes_by_id[rel.start.id]
+            if rel.end.id in resolved and rel.end is not nodes_by_id[rel.end.id]:
+                rel.end = nodes_by_id[rel.end.id]
+    return all_nodes, all_relationships
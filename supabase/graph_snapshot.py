@@ -0,0 +1,390 @@
+import os
+import json
+import time
+import shutil
+import argparse
+from itertools import chain
+
+import numpy as np
+
+from graph_export import iter_export_items
+
+# 快照格式版本；格式变化时递增，旧快照会被自动重建
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".snapshot"
+# 节点的多个标签用这个字符拼接后存入字符串表（Neo4j 标签名中不会出现）
+LABEL_SEPARATOR = ":"
+
+# 快照目录结构（每个数组都是 .npy 文件，可用 np.load(mmap_mode='r') 直接映射）：
+#   meta.json            版本、来源文件信息、节点/边数量、边标签和依赖类型名称、属性列说明
+#   strings.bin          字符串表：所有 UTF-8 字符串首尾相接
+#   string_offsets.npy   int64[S + 1]，第 i 个字符串为 strings.bin[offsets[i]:offsets[i + 1]]
+#   node_id.npy          int32[N]，节点 ID 在字符串表中的下标
+#   node_labels.npy      int32[N]，以 LABEL_SEPARATOR 拼接的标签
+#   prop_<k>.npy         int32[N]，第 k 个属性列（-1 表示缺失）；非字符串列存 JSON 文本
+#   out_indptr.npy       int64[N + 1]，CSR：节点 i 的出边为 [out_indptr[i], out_indptr[i + 1])
+#   out_target.npy       int32[E]，出边终点
+#   edge_label.npy       int16[E]，关系类型编码（meta.edge_labels 中的下标）
+#   edge_dep_type.npy    int16[E]，properties.type 的编码（meta.dependency_types 中的下标，-1 表示缺失）
+#   edge_id.npy          int32[E]，关系 ID
+#   edge_props.npy       int32[E]，除 type 外其余关系属性的 JSON 文本（-1 表示没有）
+#   in_indptr.npy        int64[N + 1]，CSC：节点 i 的入边为 [in_indptr[i], in_indptr[i + 1])
+#   in_source.npy        int32[E]，入边起点
+#   in_edge.npy          int64[E]，入边在 CSR 边数组中的位置
+# 边数组均按 CSR 顺序（起点升序）存放。
+
+class _StringTable:
+    """构建快照时使用的字符串驻留表"""
+
+    def __init__(self):
+        self.index = {}
+        self.strings = []
+
+    def intern(self, value):
+        if value is None:
+            return -1
+        i = self.index.get(value)
+        if i is None:
+            i = len(self.strings)
+            self.strings.append(value)
+            self.index[value] = i
+        return i
+
+    def save(self, directory):
+        encoded = [s.encode('utf-8') for s in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        with open(os.path.join(directory, "strings.bin"), 'wb') as f:
+            f.write(b"".join(encoded))
+        np.save(os.path.join(directory, "string_offsets.npy"), offsets)
+
+def snapshot_path(json_file_path):
+    """导出文件对应的快照目录"""
+    return json_file_path + SNAPSHOT_SUFFIX
+
+def _source_info(json_file_path):
+    stat = os.stat(json_file_path)
+    return {'source': os.path.basename(json_file_path), 'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+def build_snapshot(json_file_path, output_dir=None, items=None):
+    """把 JSON Lines 导出文件（可以是 gzip / zstd 压缩的）转换为二进制快照，返回快照目录
+
+    关系中内嵌的起点/终点节点副本只取其 id，属性以节点为准，只存一份。
+    items 为已经读入的导出记录（例如 read_export 返回的节点和关系），提供时不再解析导出文件。
+    """
+    output_dir = output_dir or snapshot_path(json_file_path)
+    strings = _StringTable()
+    node_ids, node_labels = [], []
+    node_props = []
+    relationships = []
+    edge_labels = _StringTable()
+    dependency_types = _StringTable()
+    # 导出文件中的 ID 可能是整数也可能是字符串；快照里统一存字符串，读回导出格式时再还原
+    integer_ids = {'node': True, 'relationship': True}
+
+    for item in (items if items is not None else iter_export_items(json_file_path)):
+        if item.get("type") in integer_ids and not isinstance(item.get("id"), int):
+            integer_ids[item.get("type")] = False
+        if item.get("type") == "node":
+            node_ids.append(strings.intern(str(item.get("id"))))
+            node_labels.append(strings.intern(LABEL_SEPARATOR.join(item.get("labels") or [])))
+            node_props.append(item.get("properties") or {})
+        elif item.get("type") == "relationship":
+            props = dict(item.get("properties") or {})
+            dep_type = props.pop("type", None)
+            relationships.append((
+                str(item.get("start", {}).get("id")),
+                str(item.get("end", {}).get("id")),
+                edge_labels.intern(item.get("label") or ""),
+                dependency_types.intern(dep_type) if isinstance(dep_type, str) else -1,
+                strings.intern(str(item.get("id"))),
+                strings.intern(json.dumps(props, ensure_ascii=False)) if props else -1,
+            ))
+
+    node_count = len(node_ids)
+    index = {strings.strings[s]: i for i, s in enumerate(node_ids)}
+
+    # 属性列：全是字符串的列直接驻留，否则存 JSON 文本
+    keys = {}
+    for props in node_props:
+        for key, value in props.items():
+            keys[key] = keys.get(key, True) and (value is None or isinstance(value, str))
+    property_columns = []
+    columns = {}
+    for k, (key, is_str) in enumerate(keys.items()):
+        column = np.full(node_count, -1, dtype=np.int32)
+        for i, props in enumerate(node_props):
+            value = props.get(key)
+            if value is not None:
+                column[i] = strings.intern(value if is_str else json.dumps(value, ensure_ascii=False))
+        file_name = f"prop_{k}.npy"
+        columns[file_name] = column
+        property_columns.append({'key': key, 'file': file_name, 'kind': 'str' if is_str else 'json'})
+    del node_props
+
+    # 只保留两端都在节点集合中的关系，按起点排序得到 CSR
+    kept = [r for r in relationships if r[0] in index and r[1] in index]
+    dropped = len(relationships) - len(kept)
+    del relationships
+    src = np.fromiter((index[r[0]] for r in kept), dtype=np.int64, count=len(kept))
+    dst = np.fromiter((index[r[1]] for r in kept), dtype=np.int32, count=len(kept))
+    order = np.argsort(src, kind='stable')
+    edge_count = len(kept)
+
+    def edge_column(position, dtype):
+        return np.fromiter((r[position] for r in kept), dtype=dtype, count=edge_count)[order]
+
+    arrays = {
+        "node_id.npy": np.array(node_ids, dtype=np.int32),
+        "node_labels.npy": np.array(node_labels, dtype=np.int32),
+        "out_indptr.npy": np.concatenate([[0], np.cumsum(np.bincount(src, minlength=node_count))]).astype(np.int64),
+        "out_target.npy": dst[order],
+        "edge_label.npy": edge_column(2, np.int16),
+        "edge_dep_type.npy": edge_column(3, np.int16),
+        "edge_id.npy": edge_column(4, np.int32),
+        "edge_props.npy": edge_column(5, np.int32),
+        **columns,
+    }
+    sorted_src = src[order]
+    in_order = np.argsort(arrays["out_target.npy"], kind='stable')
+    arrays["in_indptr.npy"] = np.concatenate([[0], np.cumsum(np.bincount(arrays["out_target.npy"], minlength=node_count))]).astype(np.int64)
+    arrays["in_source.npy"] = sorted_src[in_order].astype(np.int32)
+    arrays["in_edge.npy"] = in_order.astype(np.int64)
+
+    # 先写到临时目录再替换，避免其他进程读到写了一半的快照
+    temp_dir = output_dir + ".tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    strings.save(temp_dir)
+    for file_name, array in arrays.items():
+        np.save(os.path.join(temp_dir, file_name), array)
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        **_source_info(json_file_path),
+        'node_count': node_count,
+        'edge_count': edge_count,
+        'edge_labels': edge_labels.strings,
+        'dependency_types': dependency_types.strings,
+        'property_columns': property_columns,
+        'integer_ids': integer_ids,
+        'dropped_relationships': dropped,
+    }
+    with open(os.path.join(temp_dir, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(temp_dir, output_dir)
+    return output_dir
+
+class GraphSnapshot:
+    """内存映射的图快照；所有数组按需从磁盘分页读入，字符串按需解码"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"快照版本不匹配: {self.meta.get('version')}，需要 {SNAPSHOT_VERSION}")
+
+        self.node_count = self.meta['node_count']
+        self.edge_count = self.meta['edge_count']
+        self.edge_labels = self.meta['edge_labels']
+        self.dependency_types = self.meta['dependency_types']
+        self._string_bytes = np.memmap(os.path.join(directory, "strings.bin"), dtype=np.uint8, mode='r') \
+            if os.path.getsize(os.path.join(directory, "strings.bin")) else np.zeros(0, dtype=np.uint8)
+        self._string_offsets = self._load("string_offsets.npy")
+        self.node_id_index = self._load("node_id.npy")
+        self.node_label_index = self._load("node_labels.npy")
+        self.out_indptr = self._load("out_indptr.npy")
+        self.out_target = self._load("out_target.npy")
+        self.edge_label = self._load("edge_label.npy")
+        self.edge_dep_type = self._load("edge_dep_type.npy")
+        self.edge_id_index = self._load("edge_id.npy")
+        self.edge_props_index = self._load("edge_props.npy")
+        self.in_indptr = self._load("in_indptr.npy")
+        self.in_source = self._load("in_source.npy")
+        self.in_edge = self._load("in_edge.npy")
+        self.property_columns = {
+            column['key']: (self._load(column['file']), column['kind'])
+            for column in self.meta['property_columns']
+        }
+        self._integer_ids = self.meta.get('integer_ids', {})
+        self._id_lookup = None
+        self._decoded = None
+
+    def _load(self, file_name):
+        return np.load(os.path.join(self.directory, file_name), mmap_mode='r')
+
+    def decode_strings(self):
+        """一次性解码整个字符串表并缓存；需要遍历大部分节点或边时先调用，比逐个解码快得多"""
+        if self._decoded is None:
+            data = bytes(self._string_bytes)
+            offsets = self._string_offsets.tolist()
+            self._decoded = [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        return self._decoded
+
+    def string(self, i):
+        """字符串表中第 i 个字符串，-1 返回 None"""
+        if i < 0:
+            return None
+        if self._decoded is not None:
+            return self._decoded[i]
+        return bytes(self._string_bytes[self._string_offsets[i]:self._string_offsets[i + 1]]).decode('utf-8')
+
+    def node_id(self, i):
+        return self.string(int(self.node_id_index[i]))
+
+    def node_labels(self, i):
+        joined = self.string(int(self.node_label_index[i]))
+        return joined.split(LABEL_SEPARATOR) if joined else []
+
+    def node_label(self, i):
+        """第一个标签，没有标签时为 "Thing"（与迁移脚本的默认值一致）"""
+        labels = self.node_labels(i)
+        return labels[0] if labels else "Thing"
+
+    def node_property(self, i, key):
+        column = self.property_columns.get(key)
+        if column is None:
+            return None
+        values, kind = column
+        value = self.string(int(values[i]))
+        return json.loads(value) if kind == 'json' and value is not None else value
+
+    def node_name(self, i):
+        return self.node_property(i, "name")
+
+    def node_properties(self, i):
+        props = {}
+        for key, (values, kind) in self.property_columns.items():
+            value = self.string(int(values[i]))
+            if value is not None:
+                props[key] = json.loads(value) if kind == 'json' else value
+        return props
+
+    def index_of(self, node_id):
+        """节点 ID 对应的下标，不存在时返回 None"""
+        if self._id_lookup is None:
+            self.decode_strings()
+            self._id_lookup = {self.node_id(i): i for i in range(self.node_count)}
+        return self._id_lookup.get(str(node_id))
+
+    def successors(self, i):
+        return self.out_target[self.out_indptr[i]:self.out_indptr[i + 1]]
+
+    def predecessors(self, i):
+        return self.in_source[self.in_indptr[i]:self.in_indptr[i + 1]]
+
+    def edge_arrays(self, label=None):
+        """所有边的 (起点, 终点, CSR 边位置) 数组；指定 label 时只返回该关系类型的边"""
+        src = np.repeat(np.arange(self.node_count, dtype=np.int64), np.diff(self.out_indptr))
+        positions = np.arange(self.edge_count, dtype=np.int64)
+        if label is not None:
+            if label not in self.edge_labels:
+                empty = np.empty(0, dtype=np.int64)
+                return empty, empty, empty
+            mask = np.asarray(self.edge_label) == self.edge_labels.index(label)
+            src, positions = src[mask], positions[mask]
+        return src, np.asarray(self.out_target)[positions].astype(np.int64), positions
+
+    def edge_properties(self, position):
+        props = {}
+        extra = self.string(int(self.edge_props_index[position]))
+        if extra:
+            props.update(json.loads(extra))
+        dep_type = int(self.edge_dep_type[position])
+        if dep_type >= 0:
+            props["type"] = self.dependency_types[dep_type]
+        return props
+
+    def _export_id(self, value, kind):
+        return int(value) if self._integer_ids.get(kind) else value
+
+    def iter_nodes(self):
+        """按导出文件的格式逐个生成节点记录"""
+        self.decode_strings()
+        for i in range(self.node_count):
+            yield {"type": "node", "id": self._export_id(self.node_id(i), 'node'), "labels": self.node_labels(i), "properties": self.node_properties(i)}
+
+    def iter_relationships(self, nodes=None):
+        """按导出文件的格式逐个生成关系记录
+
+        start / end 只带 id 和节点属性的引用（传入 iter_nodes 的结果列表时与其共享同一个字典），
+        不再像原始导出那样为每条关系复制一份。
+        """
+        self.decode_strings()
+        for i in range(self.node_count):
+            start = {"id": self._export_id(self.node_id(i), 'node'), "properties": nodes[i]["properties"] if nodes else self.node_properties(i)}
+            for position in range(int(self.out_indptr[i]), int(self.out_indptr[i + 1])):
+                target = int(self.out_target[position])
+                yield {
+                    "type": "relationship",
+                    "id": self._export_id(self.string(int(self.edge_id_index[position])), 'relationship'),
+                    "label": self.edge_labels[int(self.edge_label[position])],
+                    "properties": self.edge_properties(position),
+                    "start": start,
+                    "end": {"id": self._export_id(self.node_id(target), 'node'), "properties": nodes[target]["properties"] if nodes else self.node_properties(target)},
+                }
+
+def is_snapshot_fresh(json_file_path, directory=None):
+    """快照存在、版本一致且与导出文件的大小和修改时间一致"""
+    directory = directory or snapshot_path(json_file_path)
+    try:
+        with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return False
+    source = _source_info(json_file_path)
+    return meta.get('version') == SNAPSHOT_VERSION and all(meta.get(k) == v for k, v in source.items() if k != 'source')
+
+def open_graph(path):
+    """所有流水线阶段读取图数据的入口
+
+    path 可以是快照目录，也可以是 JSON Lines 导出文件；后者在快照缺失或过期时先自动构建快照。
+    """
+    if os.path.isdir(path):
+        return GraphSnapshot(path)
+    if not is_snapshot_fresh(path):
+        start_time = time.time()
+        print(f"🗜️ 正在构建图快照: {snapshot_path(path)}")
+        build_snapshot(path)
+        print(f"  快照构建完成，耗时 {time.time() - start_time:.2f} 秒")
+    return GraphSnapshot(snapshot_path(path))
+
+def ensure_snapshot(json_file_path, all_nodes, all_relationships):
+    """快照缺失或过期时用 read_export 已经读入的记录构建，之后各阶段的 open_graph 直接映射快照，导出文件只解析一次"""
+    if os.path.isdir(json_file_path) or is_snapshot_fresh(json_file_path):
+        return
+    start_time = time.time()
+    print(f"🗜️ 正在用已读入的记录构建图快照: {snapshot_path(json_file_path)}")
+    build_snapshot(json_file_path, items=chain(all_nodes, all_relationships))
+    print(f"  快照构建完成，耗时 {time.time() - start_time:.2f} 秒")
+
+def load_export_records(path):
+    """经由快照读取导出文件，返回与逐行 json.loads 相同格式的 (all_nodes, all_relationships)
+
+    关系中的 start / end 属性与对应节点共享同一个字典；端点不在节点集合中的关系在构建快照时已被丢弃。
+    """
+    snapshot = open_graph(path)
+    all_nodes = list(snapshot.iter_nodes())
+    all_relationships = list(snapshot.iter_relationships(all_nodes))
+    return all_nodes, all_relationships
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="把 Neo4j 导出的 JSON Lines 文件转换为可内存映射的二进制图快照")
+    parser.add_argument("json_file", nargs="?", help="导出文件，默认为 unreal_engine_graph.json")
+    parser.add_argument("--output", help="快照目录，默认为 <导出文件>.snapshot")
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    json_path = args.json_file or os.path.join(script_dir, "unreal_engine_graph.json")
+
+    start_time = time.time()
+    directory = build_snapshot(json_path, args.output)
+    snapshot = GraphSnapshot(directory)
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f"✅ 快照已写入 {directory}")
+    print(f"  {snapshot.node_count} 个节点，{snapshot.edge_count} 条边，"
+          f"{size / 1024 / 1024:.2f} MiB（导出文件 {os.path.getsize(json_path) / 1024 / 1024:.2f} MiB），"
+          f"耗时 {time.time() - start_time:.2f} 秒")
+    if snapshot.meta.get('dropped_relationships'):
+        print(f"⚠️ 丢弃了 {snapshot.meta['dropped_relationships']} 条端点不在节点集合中的关系")
@@ -0,0 +1,376 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import socket
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import urllib.request
+from datetime import datetime, timezone
+
+from synthetic_graph import write_synthetic_export
+from standin_servers import deterministic_embedding
+from migrate_sharded import generate_documents
+from ue_pipeline.text import truncate_text_for_embedding
+
+# 离线端到端压测：用 standin_servers.py 中的替身代替 OpenAI 和 Supabase，在合成图上完整运行迁移脚本，
+# 注入延迟、429 / 5xx、丢失响应和进程崩溃，然后检查：
+#   - 迁移最终完成（崩溃或中断后重新运行，最多 --max-runs 次）
+#   - ue_documents 中恰好是应有的文档，每条一次，向量属于这条文档本身
+#   - 续跑没有重复向量化已保存进度的文档（多出的向量化请求不超过检查点间隔）
+#   - 吞吐量（文档数 / 总耗时）不低于 --min-docs-per-second
+# 不需要任何凭据和网络；每个场景在单独的临时目录中运行，进度文件互不影响。
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINES = {
+    "robust": ["migrate_neo4j_to_supabase_robust.py"],
+    "sharded": ["migrate_sharded.py", "--shards", "4", "--workers", "4"],
+}
+NODE_COUNT = 150
+EDGE_COUNT = 600
+MAX_RUNS = 6
+# 单次迁移运行的超时（秒）
+RUN_TIMEOUT = 600
+# 崩溃的替身服务器过多久后重新启动（秒）
+RESTART_DELAY = 1.0
+# 每次中断后允许重复向量化的文档数（另加层次结构文档，它们一次性生成，不保存中间进度）。
+# 节点和关系分别计数保存进度，从节点切换到关系时最后不满一个间隔的节点要等下一次保存：
+# 串行迁移每 5 个节点 / 20 个关系保存一次，最多丢失 4 + 19 个；
+# 分片迁移每个分片的节点和关系各每 20 条保存一次，4 个分片最多丢失 4 × (19 + 19) 个
+RESUME_SLACK = {"robust": 4 + 19, "sharded": 4 * (19 + 19)}
+# 向量经过 float32 传输后与替身计算的向量之间允许的误差
+EMBEDDING_TOLERANCE = 1e-6
+RESULTS_DIR = "load_results"
+
+# 每个场景：两个替身服务器的参数，以及可选的一次崩溃——
+# target 为被 SIGKILL 的进程，when 为触发条件（已完成的向量化 / 已插入的文档占应有数量的比例）
+SCENARIOS = {
+    "baseline": {},
+    "faults": {
+        "embeddings": {"latency": "lognormal:0.02,0.2", "rate_429": 0.05, "rate_5xx": 0.05},
+        "postgrest": {"latency": "lognormal:0.01,0.1", "rate_5xx": 0.05, "drop_rate": 0.1},
+    },
+    "kill-migration-embedding": {
+        "embeddings": {"latency": "fixed:0.01"},
+        "kill": {"target": "migration", "when": ("embedded", 0.4)},
+    },
+    "kill-migration-insert": {
+        "postgrest": {"latency": "fixed:0.05"},
+        "kill": {"target": "migration", "when": ("inserted", 0.5)},
+    },
+    "embeddings-crash": {
+        "embeddings": {"latency": "fixed:0.01"},
+        "kill": {"target": "embeddings", "when": ("embedded", 0.3)},
+    },
+    "postgrest-crash": {
+        "postgrest": {"latency": "fixed:0.05"},
+        "kill": {"target": "postgrest", "when": ("inserted", 0.5)},
+    },
+}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def fetch_json(url, timeout=30):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read() or b"null")
+
+class Standin:
+    """一个替身服务器子进程；崩溃后在同一端口上重新启动，postgrest 从日志文件恢复数据"""
+
+    def __init__(self, kind, workdir, options, seed):
+        self.kind = kind
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.log_path = os.path.join(workdir, f"{kind}.log")
+        self.command = [sys.executable, os.path.join(SCRIPT_DIR, "standin_servers.py"), kind,
+                        "--port", str(self.port), "--seed", str(seed)]
+        for name, value in options.items():
+            self.command += [f"--{name.replace('_', '-')}", str(value)]
+        if kind == "postgrest":
+            self.command += ["--state-file", os.path.join(workdir, "postgrest-journal.jsonl")]
+        self.process = None
+        self.restarts = 0
+        # 之前各个进程的请求计数；表的行数、插入计数和图谱版本属于数据库，以当前进程为准
+        self.previous = {}
+
+    def start(self):
+        log = open(self.log_path, 'a', encoding='utf-8')
+        self.process = subprocess.Popen(self.command, stdout=log, stderr=subprocess.STDOUT)
+        log.close()
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            try:
+                return self.stats()
+            except OSError:
+                if self.process.poll() is not None:
+                    break
+                time.sleep(0.05)
+        raise RuntimeError(f"{self.kind} 替身服务器没有启动，见 {self.log_path}")
+
+    def stats(self):
+        return fetch_json(f"{self.url}/__stats", timeout=5)
+
+    def total_stats(self):
+        """跨重启累计的统计"""
+        stats = self.stats()
+        for key, value in self.previous.items():
+            stats[key] = stats.get(key, 0) + value
+        return stats
+
+    def kill(self):
+        if self.process and self.process.poll() is None:
+            # 先记下计数再杀掉；两者之间完成的少数请求不计入
+            try:
+                for key, value in self.stats().items():
+                    if isinstance(value, int) and key != "graph_version":
+                        self.previous[key] = self.previous.get(key, 0) + value
+            except OSError:
+                pass
+            self.process.kill()
+            self.process.wait()
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.kill()
+
+def migration_env(postgrest, embeddings):
+    env = dict(os.environ)
+    # 替身不校验密钥；去掉可能覆盖下面设置的变量，保证不会连到真实服务
+    for name in ("NEXT_PUBLIC_SUPABASE_URL", "OPENAI_API_KEY_FOR_EMBEDDING"):
+        env.pop(name, None)
+    env.update({
+        "SUPABASE_URL": postgrest.url,
+        "SUPABASE_SERVICE_ROLE_KEY": "standin-service-role-key",
+        "OPENAI_API_KEY": "sk-standin",
+        "EMBEDDING_ENDPOINTS": json.dumps([
+            {"name": f"standin-{suffix}", "base_url": f"{embeddings.url}/v1", "api_key": "sk-standin"}
+            for suffix in ("a", "b")
+        ]),
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+def migration_finished(pipeline, workdir):
+    """迁移脚本在出错时保存进度并正常退出，只有进度文件都被清理才算完成"""
+    leftovers = ["migration_shards"] if pipeline == "sharded" else ["migration_progress.json"]
+    leftovers.append("migration_insert_progress.json")
+    return not any(os.path.exists(os.path.join(workdir, name)) for name in leftovers)
+
+def progress_value(condition, embeddings, postgrest):
+    """崩溃触发条件的当前值；替身正在重启时返回 None"""
+    try:
+        if condition == "embedded":
+            return embeddings.total_stats().get("inputs", 0)
+        return postgrest.total_stats().get("inserted", {}).get("ue_documents", 0)
+    except OSError:
+        return None
+
+def run_scenario(name, scenario, pipeline, export_path, documents, workdir, max_runs, seed):
+    """运行一个场景直到迁移完成或用完重跑次数，返回结果（包括各项检查）"""
+    expected = [text for _, text in documents]
+    hierarchy = sum(1 for key, _ in documents if key.startswith("hierarchy:"))
+    embeddings = Standin("embeddings", workdir, scenario.get("embeddings", {}), seed)
+    postgrest = Standin("postgrest", workdir, scenario.get("postgrest", {}), seed)
+    servers = {"embeddings": embeddings, "postgrest": postgrest}
+    kill = scenario.get("kill")
+    kill_at = None
+    if kill:
+        condition, fraction = kill["when"]
+        total = len(expected) if condition == "embedded" else len(set(expected))
+        kill_at = max(1, int(total * fraction))
+    command = [sys.executable, os.path.join(SCRIPT_DIR, PIPELINES[pipeline][0]), export_path] \
+        + PIPELINES[pipeline][1:] + ["--throttle-scale", "0"]
+
+    runs = []
+    killed = False
+    start_time = time.time()
+    try:
+        embeddings.start()
+        postgrest.start()
+        env = migration_env(postgrest, embeddings)
+        while len(runs) < max_runs:
+            log_path = os.path.join(workdir, f"migration-{len(runs) + 1}.log")
+            with open(log_path, 'w', encoding='utf-8') as log:
+                # 单独的进程组：杀掉迁移时连同分片模式的工作进程一起杀掉，模拟整台机器崩溃
+                process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+                                           start_new_session=True)
+            run_start = time.time()
+            while process.poll() is None:
+                if time.time() - run_start > RUN_TIMEOUT:
+                    os.killpg(process.pid, signal.SIGKILL)
+                    break
+                if kill and not killed:
+                    value = progress_value(kill["when"][0], embeddings, postgrest)
+                    if value is not None and value >= kill_at:
+                        killed = True
+                        if kill["target"] == "migration":
+                            os.killpg(process.pid, signal.SIGKILL)
+                        else:
+                            servers[kill["target"]].kill()
+                            time.sleep(RESTART_DELAY)
+                            servers[kill["target"]].restarts += 1
+                            servers[kill["target"]].start()
+                time.sleep(0.02)
+            process.wait()
+            runs.append({"returncode": process.returncode, "seconds": time.time() - run_start, "log": log_path})
+            if process.returncode == 0 and migration_finished(pipeline, workdir):
+                break
+        wall_seconds = time.time() - start_time
+
+        embedding_stats = embeddings.total_stats()
+        postgrest_stats = postgrest.total_stats()
+        rows = fetch_json(f"{postgrest.url}/rest/v1/ue_documents?select=content,embedding,content_hash", timeout=120)
+    finally:
+        embeddings.stop()
+        postgrest.stop()
+
+    completed = bool(runs) and runs[-1]["returncode"] == 0 and migration_finished(pipeline, workdir)
+    checks = check_results(rows, expected, embedding_stats, postgrest_stats, completed,
+                           interruptions=len(runs) - 1, slack=RESUME_SLACK[pipeline], hierarchy=hierarchy)
+    unique = len(set(expected))
+    return {
+        "scenario": name,
+        "pipeline": pipeline,
+        "runs": runs,
+        "killed": kill["target"] if killed else None,
+        "restarts": {kind: server.restarts for kind, server in servers.items()},
+        "wall_seconds": wall_seconds,
+        "documents": unique,
+        "docs_per_second": unique / wall_seconds if wall_seconds else 0.0,
+        "embedding_server": embedding_stats,
+        "postgrest_server": postgrest_stats,
+        "checks": checks,
+    }
+
+def check_results(rows, expected, embedding_stats, postgrest_stats, completed, interruptions, slack, hierarchy):
+    """返回 {检查名: (是否通过, 说明)}"""
+    checks = {"completed": (completed, "迁移完成并清理了进度文件" if completed else "用完重跑次数仍未完成")}
+
+    expected_contents = set(expected)
+    contents = [row["content"] for row in rows]
+    missing = len(expected_contents - set(contents))
+    unexpected = len(set(contents) - expected_contents)
+    duplicates = len(contents) - len(set(contents))
+    checks["exactly_once"] = (
+        missing == 0 and unexpected == 0 and duplicates == 0,
+        f"{len(contents)} 行，应有 {len(expected_contents)}；缺少 {missing}，多出 {unexpected}，重复 {duplicates}",
+    )
+
+    mismatched = 0
+    for row in rows:
+        reference = deterministic_embedding(truncate_text_for_embedding(row["content"]))
+        embedding = row.get("embedding") or []
+        if len(embedding) != len(reference) or \
+                max(abs(a - b) for a, b in zip(embedding, reference)) > EMBEDDING_TOLERANCE:
+            mismatched += 1
+    checks["embeddings_match"] = (mismatched == 0, f"{mismatched} 条文档的向量与其内容不符")
+
+    # 每次中断后最多重复向量化一个检查点间隔的文档，外加层次结构文档
+    embedded = embedding_stats.get("inputs", 0)
+    budget = len(expected) + interruptions * (slack + hierarchy)
+    checks["resume_without_rework"] = (
+        embedded <= budget,
+        f"向量化 {embedded} 次，应有 {len(expected)} 次，{interruptions} 次中断后最多允许 {budget} 次",
+    )
+
+    inserted = postgrest_stats.get("inserted", {}).get("ue_documents", 0)
+    checks["inserted_once"] = (inserted == len(expected_contents),
+                               f"替身数据库共插入 {inserted} 行，应有 {len(expected_contents)}")
+    published = postgrest_stats.get("graph_version", 0)
+    checks["graph_version_published"] = (published >= 1, f"图谱版本 {published}")
+    return checks
+
+def expected_documents(export_path):
+    """迁移应当写入的全部文档 [(key, content)]，内容可能重复"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return generate_documents(export_path, dry_run=True)
+
+def print_result(result, min_docs_per_second):
+    runs = result["runs"]
+    print(f"\n📋 场景 {result['scenario']}（{result['pipeline']}）：运行 {len(runs)} 次"
+          f"（退出码 {[run['returncode'] for run in runs]}），总耗时 {result['wall_seconds']:.1f} 秒，"
+          f"{result['docs_per_second']:.1f} 文档/秒")
+    if result["killed"]:
+        print(f"  💥 已杀掉 {result['killed']}，替身服务器重启次数 {result['restarts']}")
+    for server in ("embedding_server", "postgrest_server"):
+        stats = result[server]
+        print(f"  {server}: 请求 {stats['requests']}，成功 {stats['ok']}，注入 429 {stats['injected_429']} / "
+              f"5xx {stats['injected_5xx']}，丢弃响应 {stats['dropped']}")
+    for check, (passed, detail) in result["checks"].items():
+        print(f"  {'✅' if passed else '❌'} {check}: {detail}")
+    if min_docs_per_second:
+        passed = result["docs_per_second"] >= min_docs_per_second
+        result["checks"]["throughput"] = (passed, f"{result['docs_per_second']:.1f} 文档/秒，下限 {min_docs_per_second}")
+        print(f"  {'✅' if passed else '❌'} throughput: {result['checks']['throughput'][1]}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="用本地替身服务器离线运行完整迁移，注入故障并检查结果")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"逗号分隔的场景，默认全部：{', '.join(SCENARIOS)}")
+    parser.add_argument("--pipeline", choices=sorted(PIPELINES), default="robust", help="运行哪个迁移脚本")
+    parser.add_argument("--nodes", type=int, default=NODE_COUNT, help="合成图的节点数")
+    parser.add_argument("--edges", type=int, default=EDGE_COUNT, help="合成图的关系数")
+    parser.add_argument("--seed", type=int, default=42, help="合成图和故障注入的随机种子")
+    parser.add_argument("--max-runs", type=int, default=MAX_RUNS, help="每个场景最多运行迁移的次数")
+    parser.add_argument("--min-docs-per-second", type=float, help="吞吐量下限，低于它时视为失败")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="结果 JSON 的目录")
+    parser.add_argument("--keep", action="store_true", help="保留每个场景的工作目录（日志、进度文件）")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知的场景: {', '.join(unknown)}")
+
+    base_dir = tempfile.mkdtemp(prefix="load_harness_")
+    export_path = os.path.join(base_dir, "synthetic.json")
+    stats = write_synthetic_export(export_path, args.nodes, args.edges, seed=args.seed)
+    print(f"🧪 合成图：{stats['nodes']} 个节点，{stats['relationships']} 条关系")
+    documents = expected_documents(export_path)
+    print(f"📄 应写入 {len(set(text for _, text in documents))} 个不同的文档（共 {len(documents)} 次向量化）")
+
+    results = []
+    for name in names:
+        workdir = os.path.join(base_dir, name)
+        os.makedirs(workdir)
+        print(f"\n▶️ 场景 {name}，工作目录 {workdir}")
+        result = run_scenario(name, SCENARIOS[name], args.pipeline, export_path, documents, workdir,
+                              args.max_runs, args.seed)
+        print_result(result, args.min_docs_per_second)
+        results.append(result)
+
+    failed = [r["scenario"] for r in results if not all(passed for passed, _ in r["checks"].values())]
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    os.makedirs(args.results_dir, exist_ok=True)
+    results_path = os.path.join(args.results_dir, f"load-{run_id}.json")
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "run_id": run_id,
+            "pipeline": args.pipeline,
+            "nodes": stats["nodes"],
+            "relationships": stats["relationships"],
+            "seed": args.seed,
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n📝 结果已写入 {results_path}")
+
+    if args.keep or failed:
+        print(f"📁 工作目录保留在 {base_dir}")
+    else:
+        shutil.rmtree(base_dir, ignore_errors=True)
+    if failed:
+        print(f"❌ 未通过的场景: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ 全部场景通过")
@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from collections import Counter
+from datetime import datetime, timezone
+
+# httpx 随 supabase 一起安装
+import httpx
+
+from run_metrics import percentile
+from ue_pipeline import config
+
+# rag-query 的并发压测：按给定的并发数或到达率回放问题集，测量每个请求的
+#   ttfb         发出请求到收到响应头
+#   first_token  发出请求到收到第一个回答字符（rag-query 只把 <answer> 中的内容返回给客户端）
+#   total        发出请求到响应结束
+# 以及错误率和吞吐量，输出分位数报告并写入 JSON。
+#
+# --target function（默认）请求 Edge Function；--target chat 直接请求 OpenAI 兼容的 chat 接口（例如
+# standin_servers.py chat），作为只有模型、没有函数开销（创建客户端、读取整张文档表、写 chat_history）的对照。
+# 本地压测时让函数使用 chat 替身：在函数环境中设置 OPENAI_BASE_URL=http://host.docker.internal:<端口>/v1。
+#
+# 指定 --rate 时为开环：请求按泊松过程到达，不等前一个请求结束，--concurrency 只限制同时进行的请求数；
+# 延迟从计划到达的时间算起，包含等待并发名额的时间（queue），不会因为服务变慢而少发请求。
+# 不指定 --rate 时为闭环：--concurrency 个用户各自发完一个再发下一个。
+
+FUNCTION_PATH = "/functions/v1/rag-query"
+LOCAL_FUNCTION_URL = "http://127.0.0.1:54321" + FUNCTION_PATH
+CHAT_MODEL = "moonshot-v1-8k"
+QUESTIONS = [
+    "Engine 模块依赖哪些模块？",
+    "哪些模块依赖 CoreUObject？",
+    "Slate 和 SlateCore 是什么关系？",
+    "渲染相关的模块有哪些？",
+    "RenderCore 和 RHI 之间的依赖类型是什么？",
+    "UMG 依赖了哪些公共模块？",
+    "虚幻引擎有哪些系统级组件？",
+    "哪些模块之间存在循环依赖？",
+    "NetCore 被哪些模块使用？",
+    "如果修改 Core 模块会影响哪些模块？",
+    "PhysicsCore 的作用是什么？",
+    "AudioMixer 依赖哪些模块？",
+]
+CONCURRENCY = 10
+REQUESTS = 100
+TIMEOUT = 120.0
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+METRICS = ("queue", "ttfb", "first_token", "total")
+RESULTS_DIR = "load_results"
+
+def load_questions(path):
+    """每行一个问题；JSON Lines 时读取 query 字段"""
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = json.loads(line).get("query", "")
+            if line:
+                questions.append(line)
+    if not questions:
+        raise ValueError(f"{path} 中没有问题")
+    return questions
+
+def chat_prompt(question):
+    """与 rag-query 相同格式的提示词；上下文为空，只测量模型本身"""
+    return ("You are a helpful assistant for the Unreal Engine Knowledge Graph. "
+            "First, provide your step-by-step thinking process inside <thinking> XML tags. "
+            "Second, provide the final, user-facing answer inside <answer> XML tags.\n\n"
+            f"Context:\n---\n\n---\n\nQuestion:\n{question}")
+
+async def call_function(client, url, key, question, session_id, sample, start):
+    headers = {"Authorization": f"Bearer {key}", "apikey": key}
+    async with client.stream("POST", url, json={"query": question, "sessionId": session_id}, headers=headers) as response:
+        sample["ttfb"] = time.perf_counter() - start
+        sample["status"] = response.status_code
+        if response.status_code != 200:
+            body = (await response.aread()).decode('utf-8', 'replace')
+            sample["error"] = f"HTTP {response.status_code}"
+            sample["detail"] = body[:200]
+            return
+        async for text in response.aiter_text():
+            if text and "first_token" not in sample:
+                sample["first_token"] = time.perf_counter() - start
+            sample["answer_chars"] += len(text)
+
+async def call_chat(client, url, key, question, session_id, sample, start):
+    body = {
+        "model": CHAT_MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a helpful and concise assistant."},
+            {"role": "user", "content": chat_prompt(question)},
+        ],
+        "stream": True,
+    }
+    headers = {"Authorization": f"Bearer {key}"}
+    async with client.stream("POST", url.rstrip("/") + "/chat/completions", json=body, headers=headers) as response:
+        sample["ttfb"] = time.perf_counter() - start
+        sample["status"] = response.status_code
+        if response.status_code != 200:
+            detail = (await response.aread()).decode('utf-8', 'replace')
+            sample["error"] = f"HTTP {response.status_code}"
+            sample["detail"] = detail[:200]
+            return
+        reply = ""
+        async for line in response.aiter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            try:
+                event = json.loads(line[6:])
+            except json.JSONDecodeError:
+                # 无法解析的事件只记为这个请求的错误，不中断整个压测
+                sample["error"] = "malformed SSE"
+                sample["detail"] = line[:200]
+                return
+            choices = event.get("choices") or [{}]
+            reply += choices[0].get("delta", {}).get("content") or ""
+            # 与函数一样，只有 <answer> 标签之后的内容才算回答
+            _, tag, answer = reply.partition("<answer>")
+            if tag and answer.strip() and "first_token" not in sample:
+                sample["first_token"] = time.perf_counter() - start
+        answer = reply.partition("<answer>")[2].partition("</answer>")[0]
+        sample["answer_chars"] = len(answer.strip())
+
+CALLS = {"function": call_function, "chat": call_chat}
+
+async def run_load(target, url, key, questions, concurrency, requests, duration, rate, sessions, timeout, seed):
+    """发出请求并返回 (样本列表, 总秒数)"""
+    rng = random.Random(seed)
+    order = list(questions)
+    rng.shuffle(order)
+    # 固定数量的会话时请求轮流使用它们（同一会话的 chat_history 持续增长），否则每个请求一个新会话
+    session_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(sessions)] if sessions else None
+    call = CALLS[target]
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(timeout, connect=10.0)) as client:
+        async def one(i, scheduled):
+            async with semaphore:
+                start = time.perf_counter()
+                sample = {"index": i, "queue": start - scheduled, "answer_chars": 0, "status": None}
+                samples.append(sample)
+                session_id = session_ids[i % len(session_ids)] if session_ids \
+                    else str(uuid.UUID(int=rng.getrandbits(128), version=4))
+                try:
+                    await call(client, url, key, order[i % len(order)], session_id, sample, scheduled)
+                except httpx.HTTPError as e:
+                    sample["error"] = type(e).__name__
+                    sample["detail"] = str(e)[:200]
+                end = time.perf_counter()
+                # 开环时从计划到达的时间算起（包含排队），闭环时两者相同
+                sample["total"] = end - scheduled
+                if not sample.get("error") and not sample["answer_chars"]:
+                    sample["error"] = "empty answer"
+
+        begin = time.perf_counter()
+        deadline = begin + duration if duration else None
+        if rate:
+            tasks = []
+            scheduled = begin
+            for i in range(requests):
+                scheduled += rng.expovariate(rate)
+                if deadline and scheduled > deadline:
+                    break
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                tasks.append(asyncio.create_task(one(i, scheduled)))
+            await asyncio.gather(*tasks)
+        else:
+            counter = iter(range(requests))
+
+            async def user():
+                for i in counter:
+                    if deadline and time.perf_counter() > deadline:
+                        return
+                    await one(i, time.perf_counter())
+            await asyncio.gather(*(user() for _ in range(concurrency)))
+        return samples, time.perf_counter() - begin
+
+def summarize(samples, wall_seconds):
+    succeeded = [s for s in samples if not s.get("error")]
+    summary = {
+        "requests": len(samples),
+        "succeeded": len(succeeded),
+        "error_rate": (len(samples) - len(succeeded)) / len(samples) if samples else 0.0,
+        "errors": dict(Counter(s["error"] for s in samples if s.get("error"))),
+        "wall_seconds": wall_seconds,
+        "offered_rps": len(samples) / wall_seconds if wall_seconds else 0.0,
+        "throughput_rps": len(succeeded) / wall_seconds if wall_seconds else 0.0,
+        "answer_chars_per_second": sum(s["answer_chars"] for s in succeeded) / wall_seconds if wall_seconds else 0.0,
+        "latency": {},
+    }
+    for metric in METRICS:
+        values = sorted(s[metric] for s in succeeded if metric in s)
+        if not values:
+            continue
+        entry = {f"p{int(q * 100)}": percentile(values, q) for q in QUANTILES}
+        entry.update({"max": values[-1], "mean": sum(values) / len(values), "count": len(values)})
+        summary["latency"][metric] = entry
+    return summary
+
+def print_summary(summary):
+    print(f"\n📊 {summary['requests']} 个请求，成功 {summary['succeeded']}，错误率 {summary['error_rate']:.1%}，"
+          f"耗时 {summary['wall_seconds']:.1f} 秒")
+    print(f"   发出 {summary['offered_rps']:.2f} 请求/秒，完成 {summary['throughput_rps']:.2f} 请求/秒，"
+          f"回答 {summary['answer_chars_per_second']:.0f} 字符/秒")
+    for error, count in summary["errors"].items():
+        print(f"   ❌ {error}: {count}")
+    if not summary["latency"]:
+        return
+    columns = [f"p{int(q * 100)}" for q in QUANTILES] + ["max", "mean"]
+    print(f"   {'指标 (毫秒)':<14}" + "".join(f"{c:>10}" for c in columns))
+    for metric, entry in summary["latency"].items():
+        print(f"   {metric:<16}" + "".join(f"{entry[c] * 1000:>10.0f}" for c in columns))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="并发回放问题集压测 rag-query，测量首字节、首个回答字符和总延迟")
+    parser.add_argument("--target", choices=sorted(CALLS), default="function",
+                        help="function：请求 Edge Function；chat：直接请求 OpenAI 兼容的 chat 接口作为对照")
+    parser.add_argument("--url", help=f"function 时为函数地址（默认 SUPABASE_URL{FUNCTION_PATH}，未设置时为本地 "
+                                      f"{LOCAL_FUNCTION_URL}）；chat 时为接口的 base URL，例如 http://127.0.0.1:8001/v1")
+    parser.add_argument("--key", help="function 时默认为 SUPABASE_ANON_KEY / NEXT_PUBLIC_SUPABASE_ANON_KEY；chat 时为 API key")
+    parser.add_argument("--questions", help="问题文件，每行一个问题或 {\"query\": ...}；默认使用内置的问题")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="同时进行的请求数（闭环时为用户数）")
+    parser.add_argument("--rate", type=float, help="开环到达率（请求/秒，泊松分布）；不指定时为闭环")
+    parser.add_argument("--requests", type=int, default=REQUESTS, help="请求总数")
+    parser.add_argument("--duration", type=float, help="最长运行时间（秒），先到先停")
+    parser.add_argument("--sessions", type=int, default=0, help="使用的会话数；0 表示每个请求一个新会话")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="单个请求的超时（秒）")
+    parser.add_argument("--seed", type=int, default=42, help="问题顺序、会话 ID 和到达间隔的随机种子")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="结果 JSON 的目录")
+    args = parser.parse_args()
+
+    url, key = args.url, args.key
+    if args.target == "function":
+        if not url:
+            base_url = config.supabase_url()
+            url = base_url.rstrip("/") + FUNCTION_PATH if base_url else LOCAL_FUNCTION_URL
+        # 只在没有 --url 时 supabase_url() 才会加载 .env.local，这里显式加载
+        config.load_env()
+        key = key or os.getenv("SUPABASE_ANON_KEY") or os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+        if not key:
+            parser.error("请用 --key 指定 anon key，或在 .env.local 中设置 SUPABASE_ANON_KEY")
+    elif not url:
+        parser.error("--target chat 需要 --url")
+    questions = load_questions(args.questions) if args.questions else QUESTIONS
+
+    mode = f"开环 {args.rate} 请求/秒" if args.rate else f"闭环 {args.concurrency} 个用户"
+    print(f"🚀 压测 {url}（{args.target}，{mode}，最多 {args.concurrency} 个并发，{args.requests} 个请求）")
+    samples, wall_seconds = asyncio.run(run_load(
+        args.target, url, key or "sk-standin", questions, args.concurrency, args.requests, args.duration,
+        args.rate, args.sessions, args.timeout, args.seed))
+    summary = summarize(samples, wall_seconds)
+    print_summary(summary)
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    os.makedirs(args.results_dir, exist_ok=True)
+    results_path = os.path.join(args.results_dir, f"rag-query-{run_id}.json")
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "run_id": run_id,
+            "target": args.target,
+            "url": url,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "sessions": args.sessions,
+            "seed": args.seed,
+            "summary": summary,
+            "samples": sorted(samples, key=lambda s: s["index"]),
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n📝 结果已写入 {results_path}")
+    if not summary["succeeded"]:
+        sys.exit(1)
@@ -0,0 +1,283 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import multiprocessing
+
+from graph_export import read_export
+from embedding_pool import merge_stats, print_stats
+from ue_pipeline.text import enhance_node_with_relationships, generate_relationship_text, generate_hierarchy_and_type_documents
+import ue_pipeline.embedding
+from ue_pipeline.embedding import create_embedding_with_retry, throttle
+from ue_pipeline.checkpoint import save_progress
+from ue_pipeline.loading import (
+    prepare_graph_snapshot, compute_graph_analytics, update_graph_layout, update_graph_clusters, publish_graph_version,
+    insert_documents,
+)
+from ue_pipeline.clients import get_supabase, get_embedding_pool, embedding_pool_stats, reset_clients
+
+# 分片模式：按节点 / 关系 ID 的稳定哈希把文本生成和向量化分到多个进程，每个分片单独保存进度。
+# 中断后重新运行只会继续未完成的分片；所有分片完成后按导出文件中的顺序合并，结果与分片数无关。
+
+DEFAULT_SHARDS = 16
+SHARD_DIR = "migration_shards"
+# 每个分片每处理多少条保存一次进度
+CHECKPOINT_EVERY = 20
+
+# 由父进程在创建进程池之前设置，fork 出的工作进程直接共享（不需要序列化整个图）
+_graph = {}
+
+def shard_of(kind, item_id, shard_count):
+    """稳定哈希分片：同一个 ID 在任何进程、任何一次运行中都落在同一个分片（不受 PYTHONHASHSEED 影响）"""
+    digest = hashlib.blake2b(f"{kind}:{item_id}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shard_count
+
+def shard_file(shard_dir, shard):
+    return os.path.join(shard_dir, f"shard-{shard:04d}.json")
+
+def read_shard(shard_dir, shard):
+    """读取一个分片的进度，不存在时返回空进度"""
+    try:
+        with open(shard_file(shard_dir, shard), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"processed_nodes": [], "processed_relationships": [], "documents": [], "current_phase": "nodes"}
+
+def build_incidence(all_relationships):
+    """节点 ID -> 与它相连的关系列表；生成节点文本时只需扫描这些关系，而不是全部关系"""
+    incidence = {}
+    for rel in all_relationships:
+        start_id, end_id = rel.get("start", {}).get("id"), rel.get("end", {}).get("id")
+        incidence.setdefault(start_id, []).append(rel)
+        if end_id != start_id:
+            incidence.setdefault(end_id, []).append(rel)
+    return incidence
+
+def node_neighborhood(node_id, incidence, nodes_by_id):
+    """节点相连的关系和这些关系的端点节点；用它们生成节点文本，结果与传入完整的节点和关系列表相同"""
+    rels = incidence.get(node_id, [])
+    neighbor_ids = {rel.get("start", {}).get("id") for rel in rels} | {rel.get("end", {}).get("id") for rel in rels}
+    return rels, [nodes_by_id[i] for i in neighbor_ids if i in nodes_by_id]
+
+def generate_documents(json_file_path, dry_run=False):
+    """生成迁移的全部文档文本，返回 [(key, content)]，顺序与 migrate_data 插入的顺序相同
+
+    dry_run 时图谱指标只计算不写入数据库，整个过程不访问任何接口。
+    """
+    all_nodes, all_relationships = read_export(json_file_path)
+    print(f"读取到 {len(all_nodes)} 个节点和 {len(all_relationships)} 个关系")
+    # 图谱阶段读取的快照直接用这些记录构建，导出文件只解析一次
+    prepare_graph_snapshot(json_file_path, all_nodes, all_relationships)
+    node_metrics = compute_graph_analytics(json_file_path, dry_run=dry_run)
+    incidence = build_incidence(all_relationships)
+    nodes_by_id = {node.get("id"): node for node in all_nodes}
+
+    documents = []
+    for node in all_nodes:
+        node_id = node.get("id")
+        if not node.get("properties", {}).get("name"):
+            continue
+        rels, neighbors = node_neighborhood(node_id, incidence, nodes_by_id)
+        text = enhance_node_with_relationships(node, rels, neighbors, node_metrics.get(str(node_id)))
+        if text:
+            documents.append((f"node:{node_id}", text))
+    for rel in all_relationships:
+        if rel.get("label") == "DEPENDS_ON":
+            text = generate_relationship_text(rel, all_nodes)
+            if text:
+                documents.append((f"relationship:{rel.get('id')}", text))
+    for i, text in enumerate(generate_hierarchy_and_type_documents(all_nodes, all_relationships)):
+        documents.append((f"hierarchy:{i}", text))
+    return documents
+
+def check_manifest(shard_dir, json_file_path, shard_count):
+    """分片目录必须对应同一个导出文件和同一个分片数，否则已保存的进度无法按分片续跑"""
+    stat = os.stat(json_file_path)
+    manifest = {
+        "source": os.path.abspath(json_file_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "shard_count": shard_count,
+    }
+    manifest_file = os.path.join(shard_dir, "manifest.json")
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        existing = None
+    if existing and existing != manifest:
+        raise ValueError(f"{shard_dir} 中的进度来自另一个导出文件或分片数（{existing.get('shard_count')}），"
+                         f"请删除该目录或使用相同的 --shards 重新运行")
+    if not existing:
+        os.makedirs(shard_dir, exist_ok=True)
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+def _init_worker():
+    # 每个工作进程使用自己的端点池和 HTTP 连接，不与父进程共享 fork 之前创建的客户端
+    reset_clients()
+
+def run_shard(shard):
+    """处理一个分片中的节点和 DEPENDS_ON 关系，返回 (分片号, 是否完成, 文档数, 端点统计)"""
+    shard_count = _graph["shard_count"]
+    progress_file = shard_file(_graph["shard_dir"], shard)
+    progress = read_shard(_graph["shard_dir"], shard)
+    if progress.get("current_phase") == "done":
+        return shard, True, len(progress["documents"]), []
+
+    processed_nodes = set(progress.get("processed_nodes", []))
+    processed_relationships = set(progress.get("processed_relationships", []))
+    documents = progress.get("documents", [])
+
+    def checkpoint(phase):
+        save_progress(progress_file, {
+            "processed_nodes": list(processed_nodes),
+            "processed_relationships": list(processed_relationships),
+            "documents": documents,
+            "current_phase": phase,
+        })
+
+    def embed(key, text, processed, item_id, phase):
+        try:
+            embedding = create_embedding_with_retry(text)
+        except Exception as e:
+            print(f"    -> ERROR: 分片 {shard} 处理 {key} 时发生错误: {e}")
+            checkpoint(phase)
+            return False
+        # key 用于合并时按导出文件中的顺序排序，插入前会去掉
+        documents.append({'key': key, 'content': text, 'embedding': embedding})
+        processed.add(item_id)
+        if len(processed) % CHECKPOINT_EVERY == 0:
+            checkpoint(phase)
+        return True
+
+    incidence = _graph["incidence"]
+    nodes_by_id = _graph["nodes_by_id"]
+    node_metrics = _graph["node_metrics"]
+    for node in _graph["all_nodes"]:
+        node_id = node.get("id")
+        if node_id in processed_nodes or not node.get("properties", {}).get("name") \
+                or shard_of("node", node_id, shard_count) != shard:
+            continue
+        rels, neighbors = node_neighborhood(node_id, incidence, nodes_by_id)
+        text = enhance_node_with_relationships(node, rels, neighbors, node_metrics.get(str(node_id)))
+        if not text:
+            continue
+        if not embed(f"node:{node_id}", text, processed_nodes, node_id, "nodes"):
+            return shard, False, len(documents), embedding_pool_stats(take=True)
+        throttle(0.5, 1.5)
+
+    for rel in _graph["all_relationships"]:
+        rel_id = rel.get("id")
+        if rel.get("label") != "DEPENDS_ON" or rel_id in processed_relationships \
+                or shard_of("relationship", rel_id, shard_count) != shard:
+            continue
+        text = generate_relationship_text(rel, _graph["all_nodes"])
+        if not text:
+            continue
+        if not embed(f"relationship:{rel_id}", text, processed_relationships, rel_id, "relationships"):
+            return shard, False, len(documents), embedding_pool_stats(take=True)
+        throttle(0.3, 0.8)
+
+    checkpoint("done")
+    return shard, True, len(documents), embedding_pool_stats(take=True)
+
+def merge_shards(shard_dir, shard_count, all_nodes, all_relationships):
+    """合并所有分片的文档：节点在前、关系在后，各自按导出文件中的顺序排列，与分片数和完成顺序无关"""
+    order = {f"node:{node.get('id')}": i for i, node in enumerate(all_nodes)}
+    order.update({f"relationship:{rel.get('id')}": len(all_nodes) + i for i, rel in enumerate(all_relationships)})
+    documents = []
+    for shard in range(shard_count):
+        documents.extend(read_shard(shard_dir, shard)["documents"])
+    documents.sort(key=lambda doc: order[doc['key']])
+    return [{'content': doc['content'], 'embedding': doc['embedding']} for doc in documents]
+
+def migrate_sharded(json_file_path, shard_count=DEFAULT_SHARDS, workers=None, shard_dir=SHARD_DIR):
+    print(f"开始分片处理JSON Lines文件: {json_file_path}（{shard_count} 个分片）")
+    # 缺少凭据时立即报错，而不是等到工作进程中的第一次向量化
+    get_supabase()
+    get_embedding_pool()
+    check_manifest(shard_dir, json_file_path, shard_count)
+
+    print("正在读取节点和关系数据...")
+    all_nodes, all_relationships = read_export(json_file_path)
+    print(f"读取到 {len(all_nodes)} 个节点和 {len(all_relationships)} 个关系")
+    # 图谱阶段读取的快照直接用这些记录构建，导出文件只解析一次
+    prepare_graph_snapshot(json_file_path, all_nodes, all_relationships)
+
+    # 图谱指标只在父进程计算一次，工作进程共享结果
+    _graph.update({
+        "all_nodes": all_nodes,
+        "all_relationships": all_relationships,
+        "nodes_by_id": {node.get("id"): node for node in all_nodes},
+        "incidence": build_incidence(all_relationships),
+        "node_metrics": compute_graph_analytics(json_file_path),
+        "shard_count": shard_count,
+        "shard_dir": shard_dir,
+    })
+
+    pending = [s for s in range(shard_count) if read_shard(shard_dir, s).get("current_phase") != "done"]
+    print(f"📊 待处理分片: {len(pending)}/{shard_count}")
+
+    failed = []
+    endpoint_stats = []
+    if pending:
+        # fork：工作进程直接继承上面加载好的图，不必各自重新读取导出文件
+        context = multiprocessing.get_context("fork")
+        with context.Pool(processes=min(workers or os.cpu_count(), len(pending)), initializer=_init_worker) as pool:
+            for shard, done, document_count, stats in pool.imap_unordered(run_shard, pending):
+                endpoint_stats.append(stats)
+                print(f"{'✅' if done else '⚠️'} 分片 {shard} {'完成' if done else '中断'}，已生成 {document_count} 个文档")
+                if not done:
+                    failed.append(shard)
+    if failed:
+        print_stats(merge_stats(endpoint_stats))
+        print(f"🔄 分片 {sorted(failed)} 未完成，进度已保存，重新运行脚本将只继续这些分片")
+        return
+
+    documents_to_insert = merge_shards(shard_dir, shard_count, all_nodes, all_relationships)
+    print(f"🔗 已合并 {shard_count} 个分片，共 {len(documents_to_insert)} 个文档")
+
+    # 层次结构文档数量很少，在父进程中生成
+    print("\n正在生成层次结构和类型关系文档...")
+    for doc in generate_hierarchy_and_type_documents(all_nodes, all_relationships):
+        try:
+            documents_to_insert.append({'content': doc, 'embedding': create_embedding_with_retry(doc)})
+        except Exception as e:
+            print(f"    -> ERROR: 生成层次结构文档时发生错误: {e}")
+    endpoint_stats.append(embedding_pool_stats(take=True))
+    print_stats(merge_stats(endpoint_stats))
+
+    print(f"\n任务完成! 准备将 {len(documents_to_insert)} 个文档分批插入到Supabase...")
+    try:
+        total_inserted = insert_documents(documents_to_insert, os.path.join(shard_dir, "insert_progress.json"))
+    except Exception as e:
+        print(f"❌ 批量插入数据库时发生严重错误: {e}")
+        print("💡 分片进度仍然保留，重新运行脚本会直接合并并插入")
+        return
+    print(f"🎉 所有批次插入完成！总共成功插入 {total_inserted} 条记录。")
+    update_graph_layout(json_file_path)
+    update_graph_clusters(json_file_path)
+    publish_graph_version(json_file_path, len(all_nodes), len(all_relationships))
+
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    print("🧹 已清理分片进度目录")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="多进程分片迁移：按稳定哈希把节点和关系的文本生成与向量化分配到进程池")
+    parser.add_argument("json_file", nargs="?", help="Neo4j 导出的 JSON Lines 文件，默认为 unreal_engine_graph.json")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help="分片数；续跑时必须与第一次运行相同")
+    parser.add_argument("--workers", type=int, help="进程数，默认为 CPU 核数")
+    parser.add_argument("--shard-dir", default=SHARD_DIR, help="保存各分片进度的目录")
+    parser.add_argument("--throttle-scale", type=float, default=1.0,
+                        help="每个文档之后随机延迟的倍数，0 表示不等待（对着本地替身服务器压测时使用）")
+    args = parser.parse_args()
+    ue_pipeline.embedding.THROTTLE_SCALE = args.throttle_scale
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    json_path = args.json_file or os.path.join(script_dir, "unreal_engine_graph.json")
+    if os.path.exists(json_path):
+        migrate_sharded(json_path, args.shards, args.workers, args.shard_dir)
+    else:
+        print(f"错误: 找不到文件 {json_path}")
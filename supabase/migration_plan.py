@@ -0,0 +1,160 @@
+import io
+import json
+import math
+import contextlib
+
+from embedding_pool import EMBEDDING_MODEL, load_endpoint_config
+
+# 迁移前的估算（--plan）：生成全部文档文本但不调用任何接口，精确统计 token 数，
+# 按配置的速率限制和并发估算向量化费用和耗时，并列出最长的文档。
+
+# text-embedding-3-small 的价格（美元 / 百万 token）
+EMBEDDING_PRICE_PER_MILLION = 0.02
+# 模型单次输入的 token 上限，超过时请求会失败
+MODEL_MAX_TOKENS = 8191
+# 未配置速率限制时按 OpenAI tier 1 估算
+DEFAULT_RPM = 3000
+DEFAULT_TPM = 1_000_000
+# 没有运行报告时假设的单次向量化请求延迟（秒）和插入速度（条/秒）
+DEFAULT_LATENCY = 0.3
+DEFAULT_INSERT_RATE = 50.0
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 20
+# 串行 / 分片迁移每个文档之后随机等待的平均秒数（见 migrate_data 中的 throttle）
+THROTTLE_MEAN = {"node": 1.0, "relationship": 0.55, "hierarchy": 0.75}
+
+def token_counter():
+    """返回 (计数函数, 是否精确)；没有 tiktoken 时按每 token 2.5 个字符估算"""
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(EMBEDDING_MODEL)
+        return (lambda text: len(encoding.encode(text))), True
+    except Exception as e:
+        print(f"⚠️ 无法使用 tiktoken（{e}），token 数按字符数估算；pip install tiktoken 可得到精确值")
+        return (lambda text: math.ceil(len(text) / 2.5)), False
+
+def rate_limits(default_api_key=None, rpm=None, tpm=None):
+    """所有端点的速率限制之和；端点配置中没写的按 rpm / tpm 参数或默认值计算"""
+    endpoints = load_endpoint_config(default_api_key)
+    total_rpm = sum(e.get("rpm") or rpm or DEFAULT_RPM for e in endpoints)
+    total_tpm = sum(e.get("tpm") or tpm or DEFAULT_TPM for e in endpoints)
+    return len(endpoints), total_rpm, total_tpm
+
+def measure_documents(documents, count_tokens):
+    """统计每个文档实际发送的 token 数（截断之后），返回 [(key, kind, tokens, 字符数, 是否截断, 文本)]"""
+    from ue_pipeline.text import truncate_text_for_embedding
+
+    measured = []
+    for key, text in documents:
+        # 截断函数会打印截断过程，这里只需要结果
+        with contextlib.redirect_stdout(io.StringIO()):
+            sent = truncate_text_for_embedding(text)
+        measured.append((key, key.split(":", 1)[0], count_tokens(sent), len(text), sent != text, sent))
+    return measured
+
+def project(measured, concurrency, batch_size, throttle, latency, rpm, tpm, insert_rate):
+    """估算一种运行方式的向量化耗时：取并发、每分钟请求数、每分钟 token 数三者中最慢的一个"""
+    requests = sum(math.ceil(n / batch_size) for n in count_by_kind(measured).values())
+    tokens = sum(m[2] for m in measured)
+    waiting = sum(THROTTLE_MEAN[m[1]] for m in measured) if throttle else 0.0
+    bounds = {
+        "并发": (requests * latency + waiting) / concurrency,
+        "RPM": requests / rpm * 60,
+        "TPM": tokens / tpm * 60,
+    }
+    limit = max(bounds, key=bounds.get)
+    insert_seconds = len(measured) / insert_rate
+    return {
+        "requests": requests,
+        "embedding_seconds": bounds[limit],
+        "insert_seconds": insert_seconds,
+        "total_seconds": bounds[limit] + insert_seconds,
+        "bound_by": limit,
+    }
+
+def count_by_kind(measured):
+    counts = {}
+    for m in measured:
+        counts[m[1]] = counts.get(m[1], 0) + 1
+    return counts
+
+def format_duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours} 小时 {minutes} 分 {seconds} 秒" if hours else f"{minutes} 分 {seconds} 秒"
+
+def plan_migration(json_file_path, rpm=None, tpm=None, latency=None, insert_rate=None, workers=DEFAULT_WORKERS,
+                   batch_size=DEFAULT_BATCH_SIZE, price=EMBEDDING_PRICE_PER_MILLION, report_file=None, top=10):
+    """打印迁移计划并返回其内容；不调用 OpenAI，也不写入数据库"""
+    from ue_pipeline import config
+    from migrate_sharded import generate_documents
+
+    # 有上一次运行的报告（run_metrics.py）时，用实测的请求延迟和插入速度
+    if report_file:
+        with open(report_file, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        measured_latency = report.get("latency", {}).get("embedding_request_seconds", {}).get("p50")
+        measured_insert_rate = report.get("rates", {}).get("inserted_per_second")
+        latency = latency or measured_latency
+        insert_rate = insert_rate or measured_insert_rate
+        print(f"📂 使用运行报告 {report_file}: 请求延迟 p50 {latency or 0:.3f} 秒，插入 {insert_rate or 0:.1f} 条/秒")
+    latency = latency or DEFAULT_LATENCY
+    insert_rate = insert_rate or DEFAULT_INSERT_RATE
+
+    print(f"🔍 正在生成全部文档文本（不调用任何接口）: {json_file_path}")
+    documents = generate_documents(json_file_path, dry_run=True)
+    count_tokens, exact = token_counter()
+    measured = measure_documents(documents, count_tokens)
+    endpoint_count, total_rpm, total_tpm = rate_limits(config.openai_api_key(), rpm, tpm)
+
+    total_tokens = sum(m[2] for m in measured)
+    by_kind = {}
+    for key, kind, tokens, chars, truncated, _ in measured:
+        entry = by_kind.setdefault(kind, {"documents": 0, "tokens": 0, "characters": 0, "truncated": 0})
+        entry["documents"] += 1
+        entry["tokens"] += tokens
+        entry["characters"] += chars
+        entry["truncated"] += truncated
+    over_limit = [m for m in measured if m[2] > MODEL_MAX_TOKENS]
+
+    scenarios = {
+        "串行（migrate_neo4j_to_supabase_robust.py）": project(
+            measured, 1, 1, True, latency, total_rpm, total_tpm, insert_rate),
+        f"分片（migrate_sharded.py，{workers} 个进程）": project(
+            measured, workers, 1, True, latency, total_rpm, total_tpm, insert_rate),
+        f"队列（ingestion_queue.py，{workers} 个 worker，每批 {batch_size} 条）": project(
+            measured, workers, batch_size, False, latency, total_rpm, total_tpm, insert_rate),
+    }
+    outliers = sorted(measured, key=lambda m: m[2], reverse=True)[:top]
+
+    print(f"\n📋 迁移计划（token 数{'精确统计' if exact else '为估算值'}）")
+    print(f"  文档: {len(measured)} 个，共 {total_tokens} tokens，"
+          f"平均 {total_tokens / max(len(measured), 1):.0f} tokens/文档")
+    for kind, entry in by_kind.items():
+        print(f"  - {kind}: {entry['documents']} 个，{entry['tokens']} tokens，{entry['characters']} 字符，"
+              f"截断 {entry['truncated']} 个")
+    print(f"  费用: 约 ${total_tokens / 1_000_000 * price:.4f}（{EMBEDDING_MODEL}，${price}/百万 tokens）")
+    print(f"  速率限制: {endpoint_count} 个端点，合计 {total_rpm} RPM / {total_tpm} TPM；"
+          f"请求延迟 {latency:.2f} 秒，插入 {insert_rate:.0f} 条/秒")
+    print("\n⏱️ 预计耗时:")
+    for name, s in scenarios.items():
+        print(f"  - {name}: {format_duration(s['total_seconds'])}（向量化 {format_duration(s['embedding_seconds'])}，"
+              f"受{s['bound_by']}限制，{s['requests']} 次请求；插入 {format_duration(s['insert_seconds'])}）")
+    print(f"\n📏 最长的 {len(outliers)} 个文档:")
+    for key, kind, tokens, chars, truncated, text in outliers:
+        flag = "，已截断" if truncated else ""
+        print(f"  - {key}: {tokens} tokens，{chars} 字符{flag} | {text[:60]}...")
+    if over_limit:
+        print(f"❌ {len(over_limit)} 个文档截断后仍超过模型上限 {MODEL_MAX_TOKENS} tokens，向量化时会失败")
+
+    return {
+        "documents": len(measured),
+        "tokens": total_tokens,
+        "tokens_exact": exact,
+        "by_kind": by_kind,
+        "cost_usd": total_tokens / 1_000_000 * price,
+        "rate_limits": {"endpoints": endpoint_count, "rpm": total_rpm, "tpm": total_tpm},
+        "scenarios": scenarios,
+        "outliers": [{"key": m[0], "tokens": m[2], "characters": m[3], "truncated": m[4]} for m in outliers],
+        "over_limit": [m[0] for m in over_limit],
+    }
@@ -0,0 +1,115 @@
+-- Maintain a per-session summary so the sidebar no longer has to scan the whole
+-- chat_history table with window functions on every load.
+
+-- Composite index used by per-session history reads and by the backfill below.
+CREATE INDEX IF NOT EXISTS chat_history_session_id_created_at_idx
+ON public.chat_history (session_id, created_at);
+
+-- One row per chat session, kept up to date by a trigger on chat_history.
+CREATE TABLE IF NOT EXISTS public.chat_sessions (
+  session_id UUID PRIMARY KEY,
+  first_message TEXT,
+  first_message_at TIMESTAMPTZ NOT NULL,
+  last_updated TIMESTAMPTZ NOT NULL,
+  message_count BIGINT NOT NULL DEFAULT 0
+);
+
+-- Keyset pagination index: the sidebar lists sessions by (last_updated, session_id) descending.
+CREATE INDEX IF NOT EXISTS chat_sessions_last_updated_session_id_idx
+ON public.chat_sessions (last_updated DESC, session_id DESC);
+
+-- Same access model as chat_history: public read, writes only through the trigger.
+ALTER TABLE public.chat_sessions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access"
+ON public.chat_sessions
+FOR SELECT
+TO public
+USING (true);
+
+-- Upsert the summary row for every inserted message.
+-- SECURITY DEFINER is required because inserts arrive as the 'anon' role,
+-- which has no write policy on chat_sessions.
+CREATE OR REPLACE FUNCTION public.update_chat_session_summary()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO public.chat_sessions AS s (session_id, first_message, first_message_at, last_updated, message_count)
+  VALUES (NEW.session_id, NEW.content, NEW.created_at, NEW.created_at, 1)
+  ON CONFLICT (session_id) DO UPDATE SET
+    -- Only replace the first message if this row is older than the one we have
+    first_message = CASE WHEN EXCLUDED.first_message_at < s.first_message_at
+                         THEN EXCLUDED.first_message ELSE s.first_message END,
+    first_message_at = LEAST(s.first_message_at, EXCLUDED.first_message_at),
+    last_updated = GREATEST(s.last_updated, EXCLUDED.last_updated),
+    message_count = s.message_count + 1;
+  RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER chat_history_update_session_summary
+AFTER INSERT ON public.chat_history
+FOR EACH ROW
+EXECUTE FUNCTION public.update_chat_session_summary();
+
+-- Backfill the summary from existing history.
+INSERT INTO public.chat_sessions (session_id, first_message, first_message_at, last_updated, message_count)
+SELECT
+  f.session_id,
+  f.content,
+  f.created_at,
+  agg.last_updated,
+  agg.message_count
+FROM (
+  SELECT session_id, MAX(created_at) AS last_updated, COUNT(*) AS message_count
+  FROM public.chat_history
+  GROUP BY session_id
+) agg
+JOIN LATERAL (
+  SELECT h.session_id, h.content, h.created_at
+  FROM public.chat_history h
+  WHERE h.session_id = agg.session_id
+  ORDER BY h.created_at, h.id
+  LIMIT 1
+) f ON true
+ON CONFLICT (session_id) DO NOTHING;
+
+-- Replace the window-function implementation with a keyset-paginated read of the summary table.
+-- The signature changes, so the old zero-argument version has to be dropped explicitly.
+DROP FUNCTION IF EXISTS get_chat_sessions();
+
+-- Pass the (last_updated, session_id) of the last row of the previous page as the cursor.
+-- Leave both cursor arguments NULL to fetch the first page.
+CREATE OR REPLACE FUNCTION get_chat_sessions(
+  page_size INT DEFAULT 50,
+  before_last_updated TIMESTAMPTZ DEFAULT NULL,
+  before_session_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+  session_id UUID,
+  first_message TEXT,
+  last_updated TIMESTAMPTZ,
+  message_count BIGINT
+) AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    s.session_id,
+    s.first_message,
+    s.last_updated,
+    s.message_count
+  FROM
+    public.chat_sessions s
+  WHERE
+    before_last_updated IS NULL
+    OR (s.last_updated, s.session_id) < (before_last_updated, before_session_id)
+  ORDER BY
+    s.last_updated DESC,
+    s.session_id DESC
+  LIMIT
+    LEAST(GREATEST(page_size, 1), 200);
+END;
+$$ LANGUAGE plpgsql STABLE;
@@ -0,0 +1,53 @@
+-- Page through the messages of one session, newest first, keyed on (created_at, id).
+-- (created_at alone is not unique, so id breaks ties and keeps the cursor stable.)
+
+-- Replace the (session_id, created_at) index with one that also covers the tie-breaker,
+-- so both the cursor predicate and the ORDER BY are served by a single backwards index scan.
+CREATE INDEX IF NOT EXISTS chat_history_session_id_created_at_id_idx
+ON public.chat_history (session_id, created_at, id);
+
+DROP INDEX IF EXISTS public.chat_history_session_id_created_at_idx;
+
+-- thinking_steps can be much larger than the answer itself, so it is only returned when
+-- include_thinking is set. has_thinking tells the client whether there is anything to fetch later.
+CREATE OR REPLACE FUNCTION get_chat_messages(
+  target_session_id UUID,
+  page_size INT DEFAULT 50,
+  before_created_at TIMESTAMPTZ DEFAULT NULL,
+  before_id BIGINT DEFAULT NULL,
+  include_thinking BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (
+  id BIGINT,
+  created_at TIMESTAMPTZ,
+  session_id UUID,
+  role TEXT,
+  content TEXT,
+  thinking_steps TEXT,
+  has_thinking BOOLEAN
+) AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    h.id,
+    h.created_at,
+    h.session_id,
+    h.role,
+    h.content,
+    CASE WHEN include_thinking THEN h.thinking_steps ELSE NULL END,
+    COALESCE(h.thinking_steps, '') <> ''
+  FROM
+    public.chat_history h
+  WHERE
+    h.session_id = target_session_id
+    AND (
+      before_created_at IS NULL
+      OR (h.created_at, h.id) < (before_created_at, before_id)
+    )
+  ORDER BY
+    h.created_at DESC,
+    h.id DESC
+  LIMIT
+    LEAST(GREATEST(page_size, 1), 200);
+END;
+$$ LANGUAGE plpgsql STABLE;
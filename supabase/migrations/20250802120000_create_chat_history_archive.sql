@@ -0,0 +1,25 @@
+-- Cold storage for idle chat sessions, filled by archive_chat_history.py.
+-- Each row holds one archived batch of a session's messages as a zlib-compressed JSON array,
+-- so a session that is resumed and goes idle again simply gets another row.
+CREATE TABLE IF NOT EXISTS public.chat_history_archive (
+  id BIGSERIAL PRIMARY KEY,
+  session_id UUID NOT NULL,
+  first_message TEXT,
+  first_message_at TIMESTAMPTZ,
+  last_updated TIMESTAMPTZ NOT NULL,
+  message_count BIGINT NOT NULL,
+  -- zlib-compressed UTF-8 JSON: [{id, created_at, role, content, thinking_steps}, ...]
+  messages BYTEA NOT NULL,
+  -- On-disk size of the original chat_history rows, for reporting the compression ratio
+  original_bytes BIGINT NOT NULL,
+  archived_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+);
+
+-- The payload is already compressed; skip TOAST's own compression attempt.
+ALTER TABLE public.chat_history_archive ALTER COLUMN messages SET STORAGE EXTERNAL;
+
+CREATE INDEX IF NOT EXISTS chat_history_archive_session_id_idx
+ON public.chat_history_archive (session_id);
+
+-- Backend-only table: RLS with no policies denies anon access; the job connects directly.
+ALTER TABLE public.chat_history_archive ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,71 @@
+-- Graph version stamps and a response cache for the graph Edge Functions.
+--
+-- The Neo4j graph only changes when the migration script runs, so every graph response
+-- can be cached until the next migration publishes a new version. Cache keys and ETags
+-- embed the version, and publishing a version purges all older entries.
+
+CREATE TABLE IF NOT EXISTS public.graph_versions (
+  version BIGSERIAL PRIMARY KEY,
+  published_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+  -- Free-form description of what was migrated, e.g. the export file name
+  source TEXT,
+  node_count BIGINT,
+  relationship_count BIGINT
+);
+
+CREATE TABLE IF NOT EXISTS public.graph_response_cache (
+  -- "<version>:<endpoint>:<nodeId>:<direction>:<depth>:<format>"
+  cache_key TEXT PRIMARY KEY,
+  version BIGINT NOT NULL,
+  etag TEXT NOT NULL,
+  -- Serialized response body, ready to be sent as-is
+  body TEXT NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS graph_response_cache_version_idx
+ON public.graph_response_cache (version);
+
+-- Backend-only tables: RLS with no policies. The Edge Functions use the service role key
+-- for the cache, and the migration script publishes versions with the service role key.
+ALTER TABLE public.graph_versions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.graph_response_cache ENABLE ROW LEVEL SECURITY;
+
+-- Drop every cache entry that belongs to an older version as soon as a new one is published.
+CREATE OR REPLACE FUNCTION public.purge_stale_graph_cache()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  DELETE FROM public.graph_response_cache WHERE version < NEW.version;
+  RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER graph_versions_purge_stale_cache
+AFTER INSERT ON public.graph_versions
+FOR EACH ROW
+EXECUTE FUNCTION public.purge_stale_graph_cache();
+
+-- Latest published version, or 0 before the first migration has published one.
+CREATE OR REPLACE FUNCTION current_graph_version()
+RETURNS BIGINT AS $$
+  SELECT COALESCE(MAX(version), 0) FROM public.graph_versions;
+$$ LANGUAGE sql STABLE;
+
+-- Called by the migration script once all documents have been inserted.
+CREATE OR REPLACE FUNCTION publish_graph_version(
+  source TEXT DEFAULT NULL,
+  node_count BIGINT DEFAULT NULL,
+  relationship_count BIGINT DEFAULT NULL
+)
+RETURNS BIGINT AS $$
+DECLARE
+  new_version BIGINT;
+BEGIN
+  INSERT INTO public.graph_versions (source, node_count, relationship_count)
+  VALUES (publish_graph_version.source, publish_graph_version.node_count, publish_graph_version.relationship_count)
+  RETURNING version INTO new_version;
+  RETURN new_version;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,45 @@
+-- Precomputed node coordinates for the graph visualization.
+--
+-- compute_graph_layout.py runs the force simulation for the whole dependency graph
+-- offline, once per migration, for both layout modes of the frontend. The graph
+-- Edge Functions attach these coordinates to the nodes they return, so the browser
+-- only has to run a short refinement instead of a full simulation from scratch.
+
+CREATE TABLE IF NOT EXISTS public.graph_layout (
+  -- Neo4j node identity, as returned in the "id" field of the graph endpoints
+  node_id TEXT PRIMARY KEY,
+  -- Coordinates for the "force" layout
+  x REAL NOT NULL,
+  y REAL NOT NULL,
+  -- Coordinates for the "radial" layout
+  radial_x REAL NOT NULL,
+  radial_y REAL NOT NULL,
+  -- Identifies the layout run that wrote the row; rows from older runs are deleted
+  layout_run UUID NOT NULL,
+  computed_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS graph_layout_layout_run_idx
+ON public.graph_layout (layout_run);
+
+-- Backend-only table, like graph_response_cache: written by the migration script and
+-- read by the Edge Functions, both with the service role key.
+ALTER TABLE public.graph_layout ENABLE ROW LEVEL SECURITY;
+
+-- Coordinates for a set of nodes. Called with the node ids of one graph response;
+-- the ids travel in the request body, so large subgraphs do not hit URL length limits.
+-- Returns a single JSONB array rather than a set of rows: PostgREST caps set-returning
+-- RPCs at max_rows (config.toml), which would silently drop coordinates on large graphs.
+DROP FUNCTION IF EXISTS get_graph_layout(TEXT[]);
+CREATE OR REPLACE FUNCTION get_graph_layout(node_ids TEXT[])
+RETURNS JSONB AS $$
+  SELECT COALESCE(jsonb_agg(jsonb_build_object(
+    'node_id', l.node_id,
+    'x', l.x,
+    'y', l.y,
+    'radial_x', l.radial_x,
+    'radial_y', l.radial_y
+  )), '[]'::jsonb)
+  FROM public.graph_layout l
+  WHERE l.node_id = ANY(node_ids);
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,155 @@
+-- Precomputed cluster aggregation of the DEPENDS_ON graph.
+--
+-- compute_graph_clusters.py groups the nodes offline at several aggregation levels:
+-- "label" (one cluster per node label) and "community-1", "community-2", ... (label
+-- propagation communities, each level coarsening the previous one). For every level it
+-- stores the clusters as super-nodes, the DEPENDS_ON edges between clusters as weighted
+-- super-edges, and what is needed to expand a single cluster back into its nodes.
+-- The get-graph-clusters Edge Function serves an overview of one level, whose size is
+-- bounded by the number of clusters rather than the size of the graph.
+
+CREATE TABLE IF NOT EXISTS public.graph_cluster_levels (
+  level TEXT PRIMARY KEY,
+  -- "label" or "community"
+  kind TEXT NOT NULL,
+  -- Display order, from the finest level to the coarsest
+  ordinal INT NOT NULL,
+  cluster_count INT NOT NULL,
+  edge_count INT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS public.graph_clusters (
+  level TEXT NOT NULL,
+  cluster_id TEXT NOT NULL,
+  -- Display name, e.g. the label, or the best connected member plus the member count
+  name TEXT NOT NULL,
+  -- Most common node label among the members, used for coloring
+  dominant_label TEXT,
+  size INT NOT NULL,
+  -- Number of DEPENDS_ON edges between two members of the cluster
+  internal_weight INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (level, cluster_id)
+);
+
+-- Super-edges: number of DEPENDS_ON edges from members of one cluster to members of another.
+CREATE TABLE IF NOT EXISTS public.graph_cluster_edges (
+  level TEXT NOT NULL,
+  source_cluster TEXT NOT NULL,
+  target_cluster TEXT NOT NULL,
+  weight INT NOT NULL,
+  PRIMARY KEY (level, source_cluster, target_cluster)
+);
+
+-- Cluster membership, with what a node needs to be displayed without asking Neo4j.
+CREATE TABLE IF NOT EXISTS public.graph_cluster_members (
+  level TEXT NOT NULL,
+  cluster_id TEXT NOT NULL,
+  -- Neo4j node identity, as returned in the "id" field of the graph endpoints
+  node_id TEXT NOT NULL,
+  name TEXT,
+  node_label TEXT,
+  properties JSONB,
+  -- DEPENDS_ON degree, used to pick the members shown when a cluster is too large to expand fully
+  degree INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (level, cluster_id, node_id)
+);
+
+CREATE INDEX IF NOT EXISTS graph_cluster_members_degree_idx
+ON public.graph_cluster_members (level, cluster_id, degree DESC);
+
+-- Node-level DEPENDS_ON edges touching each cluster, used to expand it. Edges between two
+-- clusters are stored once for each side; other_cluster_id is the cluster of the endpoint
+-- outside the expanded cluster, or NULL when both endpoints are members.
+CREATE TABLE IF NOT EXISTS public.graph_cluster_links (
+  id BIGSERIAL PRIMARY KEY,
+  level TEXT NOT NULL,
+  cluster_id TEXT NOT NULL,
+  source_id TEXT NOT NULL,
+  target_id TEXT NOT NULL,
+  dependency_type TEXT,
+  other_cluster_id TEXT
+);
+
+CREATE INDEX IF NOT EXISTS graph_cluster_links_cluster_idx
+ON public.graph_cluster_links (level, cluster_id);
+
+-- Backend-only tables, like graph_layout: written by the migration script and read by
+-- the Edge Functions, both with the service role key.
+ALTER TABLE public.graph_cluster_levels ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.graph_clusters ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.graph_cluster_edges ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.graph_cluster_members ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.graph_cluster_links ENABLE ROW LEVEL SECURITY;
+
+-- Expansion of one cluster: its best connected members (at most max_nodes) and the
+-- node-level edges that touch them, at most max_links. Internal edges are only returned
+-- when both endpoints made the cut.
+CREATE OR REPLACE FUNCTION get_graph_cluster_expansion(
+  target_level TEXT,
+  target_cluster TEXT,
+  max_nodes INT DEFAULT 500,
+  max_links INT DEFAULT 5000
+)
+RETURNS JSONB AS $$
+  WITH members AS (
+    SELECT m.node_id, m.name, m.node_label, m.properties
+    FROM public.graph_cluster_members m
+    WHERE m.level = target_level AND m.cluster_id = target_cluster
+    ORDER BY m.degree DESC, m.node_id
+    LIMIT LEAST(GREATEST(max_nodes, 1), 2000)
+  ),
+  links AS (
+    SELECT l.source_id, l.target_id, l.dependency_type, l.other_cluster_id
+    FROM public.graph_cluster_links l
+    WHERE l.level = target_level
+      AND l.cluster_id = target_cluster
+      AND (
+        (l.other_cluster_id IS NULL
+          AND l.source_id IN (SELECT node_id FROM members)
+          AND l.target_id IN (SELECT node_id FROM members))
+        OR (l.other_cluster_id IS NOT NULL
+          AND (l.source_id IN (SELECT node_id FROM members) OR l.target_id IN (SELECT node_id FROM members)))
+      )
+    -- Internal edges first: they matter most for the expanded view
+    ORDER BY (l.other_cluster_id IS NOT NULL), l.id
+    LIMIT LEAST(GREATEST(max_links, 1), 20000)
+  )
+  SELECT jsonb_build_object(
+    'members', COALESCE((SELECT jsonb_agg(to_jsonb(members)) FROM members), '[]'::jsonb),
+    'links', COALESCE((SELECT jsonb_agg(to_jsonb(links)) FROM links), '[]'::jsonb),
+    'member_count', (
+      SELECT COUNT(*) FROM public.graph_cluster_members m
+      WHERE m.level = target_level AND m.cluster_id = target_cluster
+    )
+  );
+$$ LANGUAGE sql STABLE;
+
+-- Overview of one level: every cluster and every super-edge. Returned as a single JSONB
+-- object like the expansion: PostgREST caps table reads and set-returning RPCs at
+-- max_rows (config.toml), and a fine community level easily has tens of thousands of
+-- super-edges, so plain selects would silently drop most of them.
+CREATE OR REPLACE FUNCTION get_graph_cluster_overview(target_level TEXT)
+RETURNS JSONB AS $$
+  SELECT jsonb_build_object(
+    'clusters', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object(
+        'cluster_id', c.cluster_id,
+        'name', c.name,
+        'dominant_label', c.dominant_label,
+        'size', c.size,
+        'internal_weight', c.internal_weight
+      ) ORDER BY c.cluster_id)
+      FROM public.graph_clusters c
+      WHERE c.level = target_level
+    ), '[]'::jsonb),
+    'edges', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object(
+        'source_cluster', e.source_cluster,
+        'target_cluster', e.target_cluster,
+        'weight', e.weight
+      ) ORDER BY e.source_cluster, e.target_cluster)
+      FROM public.graph_cluster_edges e
+      WHERE e.level = target_level
+    ), '[]'::jsonb)
+  );
+$$ LANGUAGE sql STABLE;
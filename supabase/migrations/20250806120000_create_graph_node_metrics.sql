@@ -0,0 +1,42 @@
+-- Per-node dependency graph metrics computed by compute_graph_analytics.py.
+--
+-- They tell which modules are hubs: direct in/out degree (also split by dependency
+-- type), PageRank, sampled betweenness and transitive fan-in/fan-out. The migration
+-- also appends a short summary of them to the enhanced node text that gets embedded.
+
+CREATE TABLE IF NOT EXISTS public.graph_node_metrics (
+  -- Neo4j node identity, as returned in the "id" field of the graph endpoints
+  node_id TEXT PRIMARY KEY,
+  name TEXT,
+  out_degree INT NOT NULL DEFAULT 0,
+  in_degree INT NOT NULL DEFAULT 0,
+  -- e.g. {"PublicDependencyModuleNames": 12, "PrivateDependencyModuleNames": 30}
+  out_degree_by_type JSONB NOT NULL DEFAULT '{}'::jsonb,
+  in_degree_by_type JSONB NOT NULL DEFAULT '{}'::jsonb,
+  pagerank DOUBLE PRECISION NOT NULL DEFAULT 0,
+  -- 1 = highest PageRank
+  pagerank_rank INT,
+  betweenness DOUBLE PRECISION NOT NULL DEFAULT 0,
+  -- Number of nodes this node transitively depends on / that transitively depend on it
+  fan_out INT NOT NULL DEFAULT 0,
+  fan_in INT NOT NULL DEFAULT 0,
+  is_hub BOOLEAN NOT NULL DEFAULT FALSE,
+  -- Identifies the analytics run that wrote the row; rows from older runs are deleted
+  metrics_run UUID NOT NULL,
+  computed_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS graph_node_metrics_pagerank_idx
+ON public.graph_node_metrics (pagerank DESC);
+
+CREATE INDEX IF NOT EXISTS graph_node_metrics_metrics_run_idx
+ON public.graph_node_metrics (metrics_run);
+
+-- Read-only for everyone: the metrics describe the public graph, like ue_documents.
+ALTER TABLE public.graph_node_metrics ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access"
+ON public.graph_node_metrics
+FOR SELECT
+TO public
+USING (true);
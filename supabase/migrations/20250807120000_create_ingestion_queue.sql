@@ -0,0 +1,69 @@
+-- Work queue for distributed embedding of the migration documents.
+--
+-- ingestion_queue.py enqueues one task per document (node text, DEPENDS_ON relationship
+-- text or hierarchy document) with its text already generated. Any number of workers, on
+-- any number of machines, connect directly to Postgres (PostgREST cannot take row locks),
+-- claim batches of tasks with FOR UPDATE SKIP LOCKED, embed them, and insert the documents
+-- into ue_documents in the same transaction that marks the tasks done. A claimed task
+-- carries a lease; if its worker crashes, the task becomes claimable again once the lease
+-- expires.
+
+CREATE TABLE IF NOT EXISTS public.ingestion_jobs (
+  job_id TEXT PRIMARY KEY,
+  -- Export file the tasks were generated from
+  source TEXT,
+  task_count INT NOT NULL DEFAULT 0,
+  created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+  -- Set once the layout / cluster stages ran and the graph version was published
+  finalized_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS public.ingestion_tasks (
+  id BIGSERIAL PRIMARY KEY,
+  job_id TEXT NOT NULL REFERENCES public.ingestion_jobs (job_id) ON DELETE CASCADE,
+  -- "node:<id>", "relationship:<id>" or "hierarchy:<n>"; makes enqueueing idempotent
+  task_key TEXT NOT NULL,
+  content TEXT NOT NULL,
+  -- pending -> running -> done, or failed after max_attempts claims
+  status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+  attempts INT NOT NULL DEFAULT 0,
+  worker_id TEXT,
+  lease_expires_at TIMESTAMPTZ,
+  last_error TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+  claimed_at TIMESTAMPTZ,
+  completed_at TIMESTAMPTZ,
+  UNIQUE (job_id, task_key)
+);
+
+-- Claim order: pending tasks, and running tasks whose lease expired
+CREATE INDEX IF NOT EXISTS ingestion_tasks_claim_idx
+ON public.ingestion_tasks (job_id, status, id);
+
+-- Backend-only tables: RLS with no policies denies anon access; the workers connect directly.
+ALTER TABLE public.ingestion_jobs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.ingestion_tasks ENABLE ROW LEVEL SECURITY;
+
+-- Progress and throughput per job, e.g. SELECT * FROM ingestion_job_progress;
+-- security_invoker keeps the RLS of ingestion_tasks in force for the API roles.
+CREATE OR REPLACE VIEW public.ingestion_job_progress
+WITH (security_invoker = true) AS
+SELECT
+  t.job_id,
+  COUNT(*) AS total,
+  COUNT(*) FILTER (WHERE t.status = 'pending') AS pending,
+  COUNT(*) FILTER (WHERE t.status = 'running' AND t.lease_expires_at >= NOW()) AS running,
+  -- Claimed by a worker that stopped renewing or crashed; claimable again
+  COUNT(*) FILTER (WHERE t.status = 'running' AND t.lease_expires_at < NOW()) AS expired,
+  COUNT(*) FILTER (WHERE t.status = 'done') AS done,
+  COUNT(*) FILTER (WHERE t.status = 'failed') AS failed,
+  ROUND(100.0 * COUNT(*) FILTER (WHERE t.status = 'done') / COUNT(*), 1) AS percent_done,
+  COUNT(DISTINCT t.worker_id) FILTER (WHERE t.status = 'running' AND t.lease_expires_at >= NOW()) AS active_workers,
+  COUNT(*) FILTER (WHERE t.completed_at > NOW() - INTERVAL '1 minute') AS done_last_minute,
+  -- Average throughput since the first claim
+  ROUND((COUNT(*) FILTER (WHERE t.status = 'done') * 60.0
+    / NULLIF(EXTRACT(EPOCH FROM MAX(t.completed_at) - MIN(t.claimed_at)), 0))::NUMERIC, 1) AS tasks_per_minute,
+  MIN(t.claimed_at) AS started_at,
+  MAX(t.completed_at) AS last_completed_at
+FROM public.ingestion_tasks t
+GROUP BY t.job_id;
@@ -0,0 +1,19 @@
+-- Content hash unique key on ue_documents, so that inserting a document twice is a no-op.
+--
+-- The migration scripts insert documents in batches and resume after failures. A batch
+-- that was committed but whose response was lost (e.g. a client-side timeout) is sent
+-- again on retry; with this key it becomes an upsert (ON CONFLICT (content_hash) DO
+-- NOTHING) instead of duplicating rows. Identical texts always get identical embeddings
+-- from the same model, so keeping only one of them loses nothing.
+
+ALTER TABLE public.ue_documents
+ADD COLUMN IF NOT EXISTS content_hash TEXT GENERATED ALWAYS AS (md5(content)) STORED;
+
+-- Drop the duplicates left by earlier reruns, keeping the oldest row of each text
+DELETE FROM public.ue_documents d
+USING public.ue_documents keep
+WHERE d.content_hash = keep.content_hash
+  AND d.id > keep.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ue_documents_content_hash_key
+ON public.ue_documents (content_hash);
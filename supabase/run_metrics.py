@@ -0,0 +1,231 @@
+import os
+import io
+import sys
+import math
+import json
+import time
+import pstats
+import cProfile
+import resource
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# 迁移运行的结构化指标：每个阶段的墙钟时间和 CPU 时间、各类调用的延迟分布（p50/p95/p99）、
+# 计数器（文档数、token 数、重试次数……）和峰值内存。运行结束后写出 JSON 报告和
+# Prometheus textfile（node_exporter 的 textfile collector 可以直接读取）。
+#
+# 可选按阶段采集 cProfile（CPU）和 tracemalloc（内存分配）；tracemalloc 会明显拖慢运行，只在排查时打开。
+
+PROMETHEUS_PREFIX = "ue_migration"
+QUANTILES = (0.5, 0.95, 0.99)
+# JSON 报告中延迟直方图的桶上界（秒）
+HISTOGRAM_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PROFILE_MODES = ("cpu", "memory", "all")
+
+def percentile(sorted_values, q):
+    """最近秩法分位数；sorted_values 需已排序"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def peak_rss_bytes():
+    # ru_maxrss 在 macOS 上的单位是字节，在 Linux 上是 KB
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+class RunMetrics:
+    """一次运行的所有指标"""
+
+    def __init__(self, profile=None, report_dir=None):
+        if profile not in (None,) + PROFILE_MODES:
+            raise ValueError(f"未知的 profile 模式 {profile}，可选: {', '.join(PROFILE_MODES)}")
+        self.profile = profile
+        self.report_dir = report_dir
+        self.run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.started_at = time.time()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.stages = {}
+        self.current = None
+        self.samples = {}
+        self.counters = {}
+        self.info = {}
+
+    def begin_stage(self, name):
+        """开始一个阶段并结束上一个阶段，用于顺序执行的阶段；同名阶段多次进入时累加"""
+        self.end_stage()
+        profiler = None
+        if self.profile in ("cpu", "all"):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        tracing = self.profile in ("memory", "all") and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start(25)
+        self.current = (name, time.perf_counter(), time.process_time(), profiler, tracing)
+
+    def end_stage(self):
+        if not self.current:
+            return
+        name, start_wall, start_cpu, profiler, tracing = self.current
+        self.current = None
+        entry = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "runs": 0})
+        entry["wall_seconds"] += time.perf_counter() - start_wall
+        entry["cpu_seconds"] += time.process_time() - start_cpu
+        entry["runs"] += 1
+        if profiler:
+            profiler.disable()
+            entry["cpu_profile"] = self._dump_profile(name, profiler)
+        if tracing:
+            entry.update(self._dump_allocations(name))
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name):
+        self.begin_stage(name)
+        try:
+            yield
+        finally:
+            self.end_stage()
+
+    def observe(self, name, seconds):
+        """记录一次调用的耗时"""
+        self.samples.setdefault(name, []).append(seconds)
+
+    def increment(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_info(self, **info):
+        """附加到报告中的描述信息，例如输入文件、文档数、端点统计"""
+        self.info.update(info)
+
+    def _profile_path(self, name, suffix):
+        os.makedirs(self.report_dir or ".", exist_ok=True)
+        return os.path.join(self.report_dir or ".", f"{self.run_id}-{name}{suffix}")
+
+    def _dump_profile(self, name, profiler):
+        path = self._profile_path(name, ".prof")
+        profiler.dump_stats(path)
+        # 报告里只放累计耗时最高的几个函数，完整数据用 `python -m pstats <文件>` 或 snakeviz 查看
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(15)
+        with open(self._profile_path(name, "-cpu.txt"), 'w', encoding='utf-8') as f:
+            f.write(stream.getvalue())
+        return path
+
+    def _dump_allocations(self, name):
+        _, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")[:20]
+        path = self._profile_path(name, "-memory.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stat in top:
+                f.write(f"{stat}\n")
+        return {"traced_peak_bytes": peak, "memory_profile": path}
+
+    def histogram(self, name):
+        values = sorted(self.samples.get(name, []))
+        summary = {
+            "count": len(values),
+            "sum": sum(values),
+            "max": values[-1] if values else 0.0,
+        }
+        for q in QUANTILES:
+            summary[f"p{int(q * 100)}"] = percentile(values, q)
+        buckets, i = {}, 0
+        for bound in HISTOGRAM_BUCKETS:
+            while i < len(values) and values[i] <= bound:
+                i += 1
+            buckets[f"le_{bound:g}"] = i
+        summary["buckets"] = buckets
+        return summary
+
+    def report(self):
+        self.end_stage()
+        wall = time.perf_counter() - self.start_wall
+        counters = dict(self.counters)
+        embed_wall = sum(self.stages.get(s, {}).get("wall_seconds", 0.0) for s in ("nodes", "relationships", "hierarchy"))
+        insert_wall = self.stages.get("insert", {}).get("wall_seconds", 0.0)
+        return {
+            "run_id": self.run_id,
+            "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            "wall_seconds": wall,
+            "cpu_seconds": time.process_time() - self.start_cpu,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": self.stages,
+            "latency": {name: self.histogram(name) for name in sorted(self.samples)},
+            "counters": counters,
+            "rates": {
+                # 按向量化阶段（节点、关系、层次文档）的墙钟时间计算
+                "documents_per_second": counters.get("documents_embedded", 0) / embed_wall if embed_wall else 0.0,
+                "tokens_per_second": counters.get("embedding_tokens", 0) / embed_wall if embed_wall else 0.0,
+                "inserted_per_second": counters.get("documents_inserted", 0) / insert_wall if insert_wall else 0.0,
+            },
+            "info": self.info,
+        }
+
+    def prometheus(self, report=None):
+        """把报告转成 Prometheus 文本格式"""
+        report = report or self.report()
+        p = PROMETHEUS_PREFIX
+        lines = [
+            f"# HELP {p}_run_timestamp_seconds Start time of the migration run.",
+            f"# TYPE {p}_run_timestamp_seconds gauge",
+            f"{p}_run_timestamp_seconds {self.started_at:.3f}",
+            f"# HELP {p}_wall_seconds Wall time of the whole run.",
+            f"# TYPE {p}_wall_seconds gauge",
+            f"{p}_wall_seconds {report['wall_seconds']:.6f}",
+            f"# HELP {p}_peak_rss_bytes Peak resident set size of the migration process.",
+            f"# TYPE {p}_peak_rss_bytes gauge",
+            f"{p}_peak_rss_bytes {report['peak_rss_bytes']}",
+            f"# HELP {p}_stage_wall_seconds Wall time per pipeline stage.",
+            f"# TYPE {p}_stage_wall_seconds gauge",
+        ]
+        lines += [f'{p}_stage_wall_seconds{{stage="{name}"}} {s["wall_seconds"]:.6f}' for name, s in report["stages"].items()]
+        lines += [
+            f"# HELP {p}_stage_cpu_seconds CPU time per pipeline stage.",
+            f"# TYPE {p}_stage_cpu_seconds gauge",
+        ]
+        lines += [f'{p}_stage_cpu_seconds{{stage="{name}"}} {s["cpu_seconds"]:.6f}' for name, s in report["stages"].items()]
+        for name, h in report["latency"].items():
+            metric = f"{p}_{name}"
+            lines += [f"# HELP {metric} Duration of each {name.removesuffix('_seconds').replace('_', ' ')} call.", f"# TYPE {metric} summary"]
+            lines += [f'{metric}{{quantile="{q}"}} {h[f"p{int(q * 100)}"]:.6f}' for q in QUANTILES]
+            lines += [f"{metric}_sum {h['sum']:.6f}", f"{metric}_count {h['count']}"]
+        for name, value in sorted(report["counters"].items()):
+            metric = f"{p}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in report["rates"].items():
+            metric = f"{p}_{name}"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value:.6f}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """写出 JSON 报告和 Prometheus textfile，返回两个文件的路径"""
+        report_dir = self.report_dir or "."
+        os.makedirs(report_dir, exist_ok=True)
+        report = self.report()
+        report_path = os.path.join(report_dir, f"run-{self.run_id}.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        # textfile collector 会读取目录下所有 .prom 文件，先写临时文件再改名，避免读到写了一半的文件
+        prom_path = os.path.join(report_dir, f"{PROMETHEUS_PREFIX}.prom")
+        with open(prom_path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(self.prometheus(report))
+        os.replace(prom_path + ".tmp", prom_path)
+        return report_path, prom_path
+
+    def print_summary(self):
+        report = self.report()
+        print(f"\n⏱️ 运行耗时 {report['wall_seconds']:.1f} 秒（CPU {report['cpu_seconds']:.1f} 秒），"
+              f"峰值内存 {report['peak_rss_bytes'] / 2**20:.0f} MiB")
+        for name, s in report["stages"].items():
+            print(f"  - 阶段 {name}: {s['wall_seconds']:.1f} 秒（CPU {s['cpu_seconds']:.1f} 秒）")
+        for name, h in report["latency"].items():
+            print(f"  - {name}: {h['count']} 次，p50 {h['p50'] * 1000:.0f} ms / p95 {h['p95'] * 1000:.0f} ms / "
+                  f"p99 {h['p99'] * 1000:.0f} ms")
+        rates = report["rates"]
+        print(f"  - {rates['documents_per_second']:.2f} 文档/秒，{rates['tokens_per_second']:.0f} tokens/秒")
+
+# 当前运行的指标；迁移入口可以用新的 RunMetrics 替换它（例如打开 profile）
+metrics = RunMetrics()
@@ -0,0 +1,447 @@
+import os
+import sys
+import json
+import math
+import time
+import base64
+import random
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+# 本地替身服务器，用于在没有 OpenAI / Supabase 账号的情况下端到端运行迁移（见 load_harness.py）：
+#
+#   embeddings  OpenAI 兼容的 POST /v1/embeddings，对同一段文本总是返回同一个单位向量
+#   postgrest   PostgREST 兼容的 /rest/v1/<table> 和 /rest/v1/rpc/<function>，数据保存在内存中
+#               （可选把每次提交追加到日志文件，进程被杀掉后重启时重放）；ue_documents 与数据库一样按
+#               content_hash = md5(content) 唯一，支持 on_conflict + resolution=ignore-duplicates
+#   chat        OpenAI 兼容的 POST /v1/chat/completions，按 rag-query 提示词要求的格式输出
+#               <thinking>…</thinking><answer>…</answer>，stream 时以 SSE 逐块返回（见 load_rag_query.py）
+#
+# 都支持可配置的延迟分布和故障注入：按比例返回 429 / 5xx、提交后丢弃响应（客户端超时，
+# 但数据已写入）、处理第 N 个请求时直接退出进程。GET /__stats 返回请求计数和注入的故障数。
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+CHAT_MODEL = "moonshot-v1-8k"
+# chat 回答中随机选用的词，内容只用于填充长度
+CHAT_WORDS = ["模块", "依赖", "引擎", "渲染", "Core", "CoreUObject", "Engine", "Slate", "反射", "子系统",
+              "运行时", "编辑器", "构建", "接口", "加载", "同步", "上下文", "关系", "因此", "可以"]
+EMBEDDING_DIMENSIONS = 1536
+# 没有声明 on_conflict 时 upsert 使用的主键（与 migrations/ 中的定义一致）
+PRIMARY_KEYS = {
+    "ue_documents": ("content_hash",),
+    "graph_node_metrics": ("node_id",),
+    "graph_layout": ("node_id",),
+    "graph_cluster_levels": ("level",),
+    "graph_clusters": ("level", "cluster_id"),
+    "graph_cluster_edges": ("level", "source_cluster", "target_cluster"),
+    "graph_cluster_members": ("level", "cluster_id", "node_id"),
+}
+# 1% 分位数对应的标准正态分位点，用于由 p99 推出对数正态分布的 sigma
+Z_99 = 2.326
+
+def deterministic_embedding(text, dimensions=EMBEDDING_DIMENSIONS):
+    """由文本的 md5 决定的单位向量；load_harness 用它校验每条文档存入的向量是否属于它自己"""
+    rng = random.Random(int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:8], 'big'))
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector]
+
+def parse_latency(spec):
+    """延迟分布：fixed:秒、uniform:最小,最大、lognormal:中位数,p99；返回采样函数"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        median, p99 = values
+        sigma = math.log(p99 / median) / Z_99 if p99 > median else 0.0
+        return lambda rng: rng.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"未知的延迟分布 {spec}，可选 fixed:秒 / uniform:最小,最大 / lognormal:中位数,p99")
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, latency="fixed:0", rate_429=0.0, rate_5xx=0.0, drop_rate=0.0,
+                 kill_after=None, seed=0, state_file=None, token_interval=0.0, thinking_tokens=40, answer_tokens=60):
+        super().__init__(address, handler)
+        self.latency = parse_latency(latency)
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.drop_rate = drop_rate
+        self.kill_after = kill_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "injected_429": 0, "injected_5xx": 0, "dropped": 0}
+        self.tables = {}
+        self.next_id = 1
+        self.graph_version = 0
+        self.state_file = state_file
+        self.token_interval = token_interval
+        self.thinking_tokens = thinking_tokens
+        self.answer_tokens = answer_tokens
+        self.journal = None
+        if state_file:
+            if os.path.exists(state_file):
+                self.replay(state_file)
+            self.journal = open(state_file, 'a', encoding='utf-8')
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def apply(self, change):
+        """执行一次已提交的修改；调用方持有 lock"""
+        op = change["op"]
+        if op == "insert":
+            self.tables.setdefault(change["table"], []).extend(change["rows"])
+            # 插入计数属于数据库而不是进程，重放后与崩溃前一致
+            inserted = self.stats.setdefault("inserted", {})
+            inserted[change["table"]] = inserted.get(change["table"], 0) + len(change["rows"])
+            self.next_id = max([self.next_id] + [row["id"] + 1 for row in change["rows"] if isinstance(row.get("id"), int)])
+        elif op == "update":
+            rows = self.tables[change["table"]]
+            for i, row in change["rows"]:
+                rows[i] = row
+        elif op == "delete":
+            filters = {column: (f[0], set(f[1]) if f[0] == "in" else f[1]) for column, f in change["filters"].items()}
+            self.tables[change["table"]] = [row for row in self.tables.get(change["table"], []) if not matches(row, filters)]
+        elif op == "version":
+            self.graph_version = change["version"]
+
+    def commit(self, change):
+        """执行修改并追加到日志文件；写入操作系统缓冲区后才返回，进程被杀掉也不会丢失，模拟数据库的持久性"""
+        self.apply(change)
+        if self.journal:
+            self.journal.write(json.dumps(change, default=list) + "\n")
+            self.journal.flush()
+
+    def replay(self, state_file):
+        with open(state_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                # 进程退出时可能留下写了一半的最后一行，那次修改没有提交
+                try:
+                    self.apply(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        print(f"📂 从 {state_file} 恢复了 {sum(len(rows) for rows in self.tables.values())} 行", flush=True)
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def send_json(self, status, body, headers=None):
+        payload = b"" if body is None else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def drop(self):
+        """不发送响应直接断开连接"""
+        self.server.count("dropped")
+        self.close_connection = True
+        self.connection.shutdown(2)
+
+    def before_request(self):
+        """计数、延迟和故障注入；返回 False 表示已经以注入的错误响应"""
+        server = self.server
+        with server.lock:
+            server.stats["requests"] += 1
+            number = server.stats["requests"]
+            delay = server.latency(server.rng)
+            roll = server.rng.random()
+        if server.kill_after and number >= server.kill_after:
+            print(f"💥 第 {number} 个请求，进程退出", flush=True)
+            os._exit(1)
+        time.sleep(delay)
+        if roll < server.rate_429:
+            self.server.count("injected_429")
+            self.send_json(429, {"error": {"message": "Rate limit reached (stand-in)", "type": "rate_limit_exceeded"}},
+                           {"Retry-After": "1"})
+            return False
+        if roll < server.rate_429 + server.rate_5xx:
+            self.server.count("injected_5xx")
+            self.send_json(503, {"error": {"message": "Service unavailable (stand-in)", "type": "server_error"}})
+            return False
+        return True
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/__stats":
+            with self.server.lock:
+                stats = dict(self.server.stats)
+                stats["tables"] = {name: len(rows) for name, rows in self.server.tables.items()}
+                stats["graph_version"] = self.server.graph_version
+            self.send_json(200, stats)
+            return
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+    def do_PATCH(self):
+        self.handle_request("PATCH")
+
+    def handle_request(self, method):
+        self.send_json(404, {"message": f"{method} {self.path} not supported by stand-in"})
+
+class EmbeddingsHandler(StandinHandler):
+    def handle_request(self, method):
+        if method != "POST" or urlparse(self.path).path.rstrip("/") != "/v1/embeddings":
+            return super().handle_request(method)
+        body = self.read_json() or {}
+        if not self.before_request():
+            return
+        texts = body.get("input")
+        texts = [texts] if isinstance(texts, str) else texts
+        data = []
+        for i, text in enumerate(texts):
+            vector = deterministic_embedding(text)
+            if body.get("encoding_format") == "base64":
+                # openai-python 默认请求 base64（小端 float32）
+                vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode('ascii')
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        # token 数只用于统计，按每 token 约 2.5 个字符估算
+        tokens = sum(math.ceil(len(text) / 2.5) for text in texts)
+        self.server.count("ok")
+        self.server.count("inputs", len(texts))
+        self.send_json(200, {"object": "list", "data": data, "model": body.get("model", EMBEDDING_MODEL),
+                             "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+def parse_filter(value):
+    """PostgREST 过滤条件：eq.x / neq.x / in.(a,b,"c")"""
+    op, _, operand = value.partition(".")
+    if op == "in":
+        items = operand.strip("()")
+        return op, {item.strip().strip('"') for item in items.split(",")} if items else set()
+    return op, operand
+
+def matches(row, filters):
+    for column, (op, operand) in filters.items():
+        value = "" if row.get(column) is None else str(row.get(column))
+        if op == "eq" and value != operand or op == "neq" and value == operand \
+                or op == "in" and value not in operand:
+            return False
+    return True
+
+class PostgrestHandler(StandinHandler):
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if parts[:2] != ["rest", "v1"] or len(parts) < 3:
+            return super().handle_request(method)
+        # 任何方法都要读完请求体（postgrest-py 的 DELETE 也带 {}），否则会残留在长连接中被当成下一个请求
+        body = self.read_json()
+        if not self.before_request():
+            return
+        params = parse_qsl(url.query, keep_blank_values=True)
+        prefer = dict(item.strip().split("=", 1) for item in (self.headers.get("Prefer") or "").split(",") if "=" in item)
+        if parts[2] == "rpc":
+            return self.rpc(parts[3] if len(parts) > 3 else "", body or {})
+        table = parts[2]
+        filters = {key: parse_filter(value) for key, value in params
+                   if key not in ("select", "order", "limit", "offset", "on_conflict", "columns")}
+        if method == "POST":
+            return self.insert(table, body if isinstance(body, list) else [body], dict(params), prefer)
+        if method == "GET":
+            return self.select(table, dict(params).get("select", "*"), filters, prefer)
+        if method == "DELETE":
+            return self.delete(table, filters, prefer)
+        self.send_json(501, {"code": "PGRST501", "message": f"{method} is not supported by the stand-in"})
+
+    def respond_rows(self, status, rows, prefer, total=None):
+        headers = {}
+        if prefer.get("count") == "exact":
+            headers["Content-Range"] = f"*/{len(rows) if total is None else total}"
+        body = rows if prefer.get("return", "representation") == "representation" else None
+        self.send_json(status, body, headers)
+
+    def insert(self, table, rows, params, prefer):
+        server = self.server
+        key_columns = tuple(params["on_conflict"].split(",")) if params.get("on_conflict") else PRIMARY_KEYS.get(table)
+        resolution = prefer.get("resolution")
+        with server.lock:
+            existing = server.tables.get(table, [])
+            index = {tuple(str(row.get(c)) for c in key_columns): i for i, row in enumerate(existing)} if key_columns else {}
+            inserted = []
+            updated = {}
+            pending = {}
+            next_id = server.next_id
+            for row in rows:
+                row = dict(row)
+                if table == "ue_documents":
+                    # 数据库中的生成列
+                    row["content_hash"] = hashlib.md5(row["content"].encode('utf-8')).hexdigest()
+                key = tuple(str(row.get(c)) for c in key_columns) if key_columns else None
+                if key is not None and (key in index or key in pending):
+                    if resolution == "ignore-duplicates":
+                        continue
+                    if resolution == "merge-duplicates":
+                        if key in pending:
+                            pending[key].update(row)
+                        else:
+                            i = index[key]
+                            updated[i] = dict(updated.get(i, existing[i]), **row)
+                        continue
+                    # 整批回滚，与数据库的唯一约束一致
+                    self.send_json(409, {"code": "23505", "details": f"Key {key} already exists.", "hint": None,
+                                         "message": f'duplicate key value violates unique constraint "{table}_pkey"'})
+                    return
+                if "id" not in row:
+                    row["id"] = next_id
+                    next_id += 1
+                inserted.append(row)
+                if key is not None:
+                    pending[key] = row
+            if updated:
+                server.commit({"op": "update", "table": table, "rows": sorted(updated.items())})
+            if inserted:
+                server.commit({"op": "insert", "table": table, "rows": inserted})
+            server.stats["ok"] += 1
+            drop = server.rng.random() < server.drop_rate
+        if drop:
+            # 已提交但客户端收不到响应，重试时会再次发送同一批
+            return self.drop()
+        self.respond_rows(201, inserted, prefer)
+
+    def select(self, table, columns, filters, prefer):
+        with self.server.lock:
+            rows = [row for row in self.server.tables.get(table, []) if matches(row, filters)]
+            self.server.stats["ok"] += 1
+        if columns != "*":
+            names = [c.strip() for c in columns.split(",")]
+            rows = [{name: row.get(name) for name in names} for row in rows]
+        self.respond_rows(200, rows, dict(prefer, **{"return": "representation"}))
+
+    def delete(self, table, filters, prefer):
+        server = self.server
+        with server.lock:
+            removed = [row for row in server.tables.get(table, []) if matches(row, filters)]
+            server.commit({"op": "delete", "table": table, "filters": filters})
+            server.stats["ok"] += 1
+        self.respond_rows(200 if prefer.get("return") == "representation" else 204, removed, prefer)
+
+    def rpc(self, function, args):
+        server = self.server
+        if function != "publish_graph_version":
+            self.send_json(404, {"code": "PGRST202", "message": f"Could not find the function public.{function}"})
+            return
+        with server.lock:
+            version = server.graph_version + 1
+            server.commit({"op": "version", "version": version})
+            server.stats["ok"] += 1
+        self.send_json(200, version)
+
+def chat_reply(question, thinking_tokens, answer_tokens):
+    """由问题决定的 <thinking>/<answer> 格式回复"""
+    rng = random.Random(int.from_bytes(hashlib.md5(question.encode('utf-8')).digest()[:8], 'big'))
+    thinking = "".join(rng.choice(CHAT_WORDS) for _ in range(thinking_tokens))
+    answer = "".join(rng.choice(CHAT_WORDS) for _ in range(answer_tokens))
+    return f"<thinking>\n{thinking}\n</thinking>\n<answer>\n{answer}\n</answer>"
+
+class ChatHandler(StandinHandler):
+    def handle_request(self, method):
+        if method != "POST" or urlparse(self.path).path.rstrip("/") != "/v1/chat/completions":
+            return super().handle_request(method)
+        body = self.read_json() or {}
+        # 延迟相当于首个 token 之前的排队和预填充时间
+        if not self.before_request():
+            return
+        server = self.server
+        messages = body.get("messages") or []
+        prompt = messages[-1].get("content", "") if messages else ""
+        # rag-query 把整张 ue_documents 表拼进提示词，记录提示词的长度
+        with server.lock:
+            server.stats["prompt_chars"] = server.stats.get("prompt_chars", 0) + len(prompt)
+            server.stats["max_prompt_chars"] = max(server.stats.get("max_prompt_chars", 0), len(prompt))
+        question = prompt.rsplit("Question:", 1)[-1].strip()
+        reply = chat_reply(question, server.thinking_tokens, server.answer_tokens)
+        model = body.get("model", CHAT_MODEL)
+        usage = {"prompt_tokens": math.ceil(len(prompt) / 2.5), "completion_tokens": len(reply)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if not body.get("stream"):
+            server.count("ok")
+            self.send_json(200, {"id": "chatcmpl-standin", "object": "chat.completion", "created": int(time.time()),
+                                 "model": model, "usage": usage, "choices": [{
+                                     "index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": reply}}]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # 每块 1~6 个字符，标签会被切开，与真实模型的流式输出一样
+        rng = random.Random(len(prompt))
+        position = 0
+        try:
+            while position < len(reply):
+                size = rng.randint(1, 6)
+                self.send_event({"choices": [{"index": 0, "delta": {"content": reply[position:position + size]},
+                                              "finish_reason": None}]}, model)
+                position += size
+                if server.token_interval:
+                    time.sleep(server.token_interval)
+            self.send_event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}, model)
+            self.send_chunk(b"data: [DONE]\n\n")
+            self.send_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前断开
+            server.count("client_disconnects")
+            self.close_connection = True
+            return
+        server.count("ok")
+
+    def send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+
+    def send_event(self, event, model):
+        event = dict({"id": "chatcmpl-standin", "object": "chat.completion.chunk", "created": int(time.time()),
+                      "model": model}, **event)
+        self.send_chunk(b"data: " + json.dumps(event, ensure_ascii=False).encode('utf-8') + b"\n\n")
+
+HANDLERS = {"embeddings": EmbeddingsHandler, "postgrest": PostgrestHandler, "chat": ChatHandler}
+
+def serve(kind, port, **options):
+    server = StandinServer(("127.0.0.1", port), HANDLERS[kind], **options)
+    print(f"🧪 {kind} 替身服务器监听 http://127.0.0.1:{server.server_address[1]}", flush=True)
+    server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="OpenAI embeddings / chat 和 PostgREST 的本地替身服务器，支持延迟分布和故障注入")
+    parser.add_argument("kind", choices=sorted(HANDLERS))
+    parser.add_argument("--port", type=int, default=0, help="监听端口，0 表示随机")
+    parser.add_argument("--latency", default="fixed:0", help="每个请求的延迟：fixed:秒、uniform:最小,最大、lognormal:中位数,p99")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回 429 的请求比例")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="返回 503 的请求比例")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="postgrest：写入提交后不返回响应、直接断开连接的比例")
+    parser.add_argument("--kill-after", type=int, help="收到第 N 个请求时进程直接退出（模拟崩溃）")
+    parser.add_argument("--seed", type=int, default=0, help="延迟和故障注入的随机种子")
+    parser.add_argument("--state-file", help="postgrest：每次提交追加到这个日志文件，重启时重放恢复数据")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="chat：流式输出中相邻两块之间的间隔（秒）")
+    parser.add_argument("--thinking-tokens", type=int, default=40, help="chat：<thinking> 中的词数")
+    parser.add_argument("--answer-tokens", type=int, default=60, help="chat：<answer> 中的词数")
+    args = parser.parse_args()
+    try:
+        serve(args.kind, args.port, latency=args.latency, rate_429=args.rate_429, rate_5xx=args.rate_5xx,
+              drop_rate=args.drop_rate, kill_after=args.kill_after, seed=args.seed, state_file=args.state_file,
+              token_interval=args.token_interval, thinking_tokens=args.thinking_tokens, answer_tokens=args.answer_tokens)
+    except KeyboardInterrupt:
+        sys.exit(0)
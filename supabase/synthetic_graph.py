@@ -0,0 +1,139 @@
+import gzip
+import json
+import random
+import argparse
+from itertools import accumulate
+
+# 合成的虚幻引擎依赖图，格式与 Neo4j 导出的 JSON Lines 完全相同（迁移脚本、graph_export.py 直接读取）。
+# 用于在不同规模上测量流水线各阶段的耗时；同一个 seed 总是生成同一个文件。
+#
+# 图的形状接近 UE 源码的模块依赖：
+#   - 节点标签为 Module / System / Subsystem / Class / Interface，部分节点带描述，少数没有名称
+#   - 关系都是 DEPENDS_ON，依赖类型为 Build.cs 中的四种 *ModuleNames
+#   - 入度服从幂律：Core、CoreUObject、Engine 等核心模块排在最前，被大量依赖；出度也有长尾
+#   - 包含长度 2~6 的依赖环（UE 中的 CircularlyReferencedDependentModules）
+
+LABEL_WEIGHTS = {"Module": 0.45, "Class": 0.30, "Interface": 0.12, "Subsystem": 0.08, "System": 0.05}
+DEPENDENCY_TYPE_WEIGHTS = {
+    "PublicDependencyModuleNames": 0.45,
+    "PrivateDependencyModuleNames": 0.40,
+    "PublicIncludePathModuleNames": 0.08,
+    "PrivateIncludePathModuleNames": 0.07,
+}
+# 入度最高的枢纽模块，按被依赖的程度排序
+HUB_MODULES = [
+    "Core", "CoreUObject", "Engine", "RenderCore", "RHI", "SlateCore", "Slate", "InputCore",
+    "ApplicationCore", "Projects", "Json", "UMG", "Renderer", "NetCore", "PhysicsCore", "AudioMixer",
+]
+DESCRIPTION_TEMPLATES = [
+    "{name} 提供{area}相关的运行时功能。",
+    "{name} 负责{area}，供编辑器和运行时共同使用。",
+    "{name} 是{area}的基础组件，封装了平台相关的实现。",
+]
+AREAS = ["渲染", "网络同步", "物理模拟", "音频", "输入处理", "资源加载", "动画", "用户界面", "脚本反射", "内存管理"]
+
+NODE_COUNT = 20_000
+EDGE_COUNT = 100_000
+
+def zipf_cum_weights(count, exponent):
+    """排名为 r（从 0 开始）的元素权重为 1 / (r + 1)^exponent，返回累积权重供 random.choices 使用"""
+    return list(accumulate(1.0 / (rank + 1) ** exponent for rank in range(count)))
+
+def make_nodes(node_count, rng, description_ratio, unnamed_ratio):
+    labels = list(LABEL_WEIGHTS)
+    label_weights = list(LABEL_WEIGHTS.values())
+    nodes = []
+    for i in range(node_count):
+        if i < len(HUB_MODULES):
+            label, name = "Module", HUB_MODULES[i]
+        else:
+            label = rng.choices(labels, label_weights)[0]
+            name = None if rng.random() < unnamed_ratio else f"{label}_{i}"
+        properties = {"path": f"Engine/Source/Runtime/{name or i}/{name or i}.Build.cs"}
+        if name:
+            properties["name"] = name
+            if rng.random() < description_ratio:
+                properties["description"] = rng.choice(DESCRIPTION_TEMPLATES).format(name=name, area=rng.choice(AREAS))
+        nodes.append({"type": "node", "id": str(i), "labels": [label], "properties": properties})
+    return nodes
+
+def write_synthetic_export(path, node_count=NODE_COUNT, edge_count=EDGE_COUNT, seed=42, in_exponent=1.0,
+                           out_exponent=0.6, cycle_ratio=0.02, description_ratio=0.6, unnamed_ratio=0.02):
+    """写入合成导出文件（路径以 .gz 结尾时用 gzip 压缩），返回生成的统计信息
+
+    关系中内嵌完整的起点 / 终点节点，与 Neo4j 的导出一致。节点只在内存中保留一份序列化后的片段，
+    关系逐行写出，几百万条边也不会占用太多内存。
+    """
+    rng = random.Random(seed)
+    node_count = max(node_count, 2)
+    nodes = make_nodes(node_count, rng, description_ratio, unnamed_ratio)
+    # 关系里内嵌的端点节点，序列化一次后重复使用
+    embedded = [json.dumps({k: node[k] for k in ("id", "labels", "properties")}, ensure_ascii=False) for node in nodes]
+
+    # 被依赖的排名：枢纽模块在最前，其余节点随机排列；依赖别人的排名另行随机排列
+    hub_count = min(len(HUB_MODULES), node_count)
+    rest = list(range(hub_count, node_count))
+    rng.shuffle(rest)
+    in_rank = list(range(hub_count)) + rest
+    out_rank = list(range(node_count))
+    rng.shuffle(out_rank)
+    in_weights = zipf_cum_weights(node_count, in_exponent)
+    out_weights = zipf_cum_weights(node_count, out_exponent)
+    dependency_types = list(DEPENDENCY_TYPE_WEIGHTS)
+    dependency_weights = list(DEPENDENCY_TYPE_WEIGHTS.values())
+
+    # 先生成依赖环，环上的边计入 edge_count
+    cycle_edges = []
+    cycle_budget = int(edge_count * cycle_ratio)
+    while cycle_budget - len(cycle_edges) >= 2:
+        length = min(rng.randint(2, 6), cycle_budget - len(cycle_edges), node_count)
+        cycle = rng.sample(range(node_count), length)
+        cycle_edges.extend((cycle[i], cycle[(i + 1) % length]) for i in range(length))
+
+    def edges():
+        yield from cycle_edges
+        remaining = edge_count - len(cycle_edges)
+        while remaining > 0:
+            batch = min(remaining, 100_000)
+            starts = rng.choices(out_rank, cum_weights=out_weights, k=batch)
+            ends = rng.choices(in_rank, cum_weights=in_weights, k=batch)
+            for start, end in zip(starts, ends):
+                if end == start:
+                    # 不生成自环，改为依赖排名最前的另一个模块
+                    end = in_rank[0] if start != in_rank[0] else in_rank[1]
+                yield start, end
+            remaining -= batch
+
+    stats = {"nodes": node_count, "relationships": 0, "cycle_edges": len(cycle_edges), "labels": {}, "dependency_types": {}}
+    for node in nodes:
+        stats["labels"][node["labels"][0]] = stats["labels"].get(node["labels"][0], 0) + 1
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for node in nodes:
+            f.write(json.dumps(node, ensure_ascii=False) + "\n")
+        for i, (start, end) in enumerate(edges()):
+            dependency_type = rng.choices(dependency_types, dependency_weights)[0]
+            stats["dependency_types"][dependency_type] = stats["dependency_types"].get(dependency_type, 0) + 1
+            f.write(f'{{"type":"relationship","id":"{i}","label":"DEPENDS_ON",'
+                    f'"properties":{{"type":"{dependency_type}"}},"start":{embedded[start]},"end":{embedded[end]}}}\n')
+            stats["relationships"] += 1
+    return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="生成合成的虚幻引擎依赖图（Neo4j JSON Lines 导出格式）")
+    parser.add_argument("output", help="输出文件；以 .gz 结尾时用 gzip 压缩")
+    parser.add_argument("--nodes", type=int, default=NODE_COUNT, help="节点数")
+    parser.add_argument("--edges", type=int, default=EDGE_COUNT, help="DEPENDS_ON 关系数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子；相同的参数和种子生成相同的文件")
+    parser.add_argument("--in-exponent", type=float, default=1.0, help="入度幂律指数，越大枢纽模块越集中")
+    parser.add_argument("--out-exponent", type=float, default=0.6, help="出度幂律指数")
+    parser.add_argument("--cycle-ratio", type=float, default=0.02, help="依赖环上的边占全部关系的比例")
+    parser.add_argument("--description-ratio", type=float, default=0.6, help="带描述的节点比例")
+    args = parser.parse_args()
+
+    stats = write_synthetic_export(args.output, args.nodes, args.edges, args.seed, args.in_exponent,
+                                   args.out_exponent, args.cycle_ratio, args.description_ratio)
+    print(f"✅ 已写入 {args.output}: {stats['nodes']} 个节点，{stats['relationships']} 条关系"
+          f"（其中 {stats['cycle_edges']} 条在依赖环上）")
+    print("  标签: " + "，".join(f"{label} {count}" for label, count in stats["labels"].items()))
+    print("  依赖类型: " + "，".join(f"{t} {count}" for t, count in stats["dependency_types"].items()))
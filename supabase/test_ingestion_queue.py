@@ -0,0 +1,94 @@
+import os
+import time
+import uuid
+import multiprocessing
+
+import psycopg2
+import pytest
+
+from ingestion_queue import DATABASE_URL, enqueue_tasks, claim_tasks, job_progress, run_worker
+
+# 对本地 Postgres（`supabase start`，需已应用 migrations）测试工作队列：
+# 多个 worker 进程并发领取，其中一个领取后直接崩溃，检查租约过期后任务被接手、每个文档只写入一次。
+
+TASK_COUNT = 200
+WORKER_COUNT = 4
+LEASE_SECONDS = 3
+EMBEDDING_DIMENSIONS = 1536
+
+def fake_embed(texts):
+    """不调用 OpenAI 的确定性向量，只用于测试"""
+    time.sleep(0.05)
+    return [[(len(text) % 7 + 1) / 10] * EMBEDDING_DIMENSIONS for text in texts]
+
+def crashing_worker(job_id):
+    # 领取一批任务后不完成也不归还，模拟 worker 进程崩溃
+    conn = psycopg2.connect(DATABASE_URL)
+    tasks = claim_tasks(conn, job_id, "crashing-worker", batch_size=10, lease_seconds=LEASE_SECONDS)
+    print(f"💥 崩溃的 worker 领取了 {len(tasks)} 个任务后退出")
+    os._exit(1)
+
+def worker(job_id):
+    run_worker(job_id, embed=fake_embed, batch_size=7, lease_seconds=LEASE_SECONDS, idle_wait=0.5)
+
+@pytest.fixture
+def conn():
+    try:
+        connection = psycopg2.connect(DATABASE_URL)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"无法连接本地 Postgres（{DATABASE_URL}）: {e}")
+    yield connection
+    connection.close()
+
+def test_ingestion_queue(conn):
+    job_id = f"test-{uuid.uuid4().hex[:8]}"
+    prefix = f"[{job_id}]"
+    try:
+        tasks = [(f"node:{i}", f"{prefix} 测试文档 {i}") for i in range(TASK_COUNT)]
+        inserted = enqueue_tasks(conn, job_id, tasks, source="test")
+        # 重复 enqueue 不会产生重复任务
+        inserted_again = enqueue_tasks(conn, job_id, tasks, source="test")
+        print(f"📥 已写入 {inserted} 个任务，重复写入新增 {inserted_again} 个")
+
+        # 先让崩溃的 worker 领走第一批，再启动正常的 worker
+        process = multiprocessing.Process(target=crashing_worker, args=(job_id,))
+        process.start()
+        process.join()
+
+        start_time = time.time()
+        processes = [multiprocessing.Process(target=worker, args=(job_id,)) for _ in range(WORKER_COUNT)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        elapsed = time.time() - start_time
+
+        progress = job_progress(conn, job_id)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*), COUNT(DISTINCT content) FROM public.ue_documents WHERE content LIKE %s",
+                           (prefix + '%',))
+            document_count, distinct_count = cursor.fetchone()
+            cursor.execute("SELECT COUNT(*) FROM public.ingestion_tasks WHERE job_id = %s AND attempts > 1", (job_id,))
+            retried = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(DISTINCT worker_id) FROM public.ingestion_tasks WHERE job_id = %s", (job_id,))
+            worker_count = cursor.fetchone()[0]
+        conn.commit()
+
+        print(f"📊 耗时 {elapsed:.1f} 秒，完成 {progress['done']}/{progress['total']}，失败 {progress['failed']}，"
+              f"{worker_count} 个 worker 参与，{retried} 个任务被重新领取")
+        assert inserted == TASK_COUNT and inserted_again == 0, \
+            f"重复 enqueue 不应新增任务：第一次 {inserted}，第二次 {inserted_again}"
+        assert progress['done'] == TASK_COUNT and progress['failed'] == 0, \
+            f"所有任务应完成：完成 {progress['done']}/{TASK_COUNT}，失败 {progress['failed']}"
+        assert document_count == TASK_COUNT and distinct_count == TASK_COUNT, \
+            f"每个文档应只写入一次：{document_count} 行，{distinct_count} 个不同内容，应为 {TASK_COUNT}"
+        assert retried == 10, f"崩溃 worker 领取的 10 个任务应在租约过期后被接手，实际 {retried} 个"
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM public.ue_documents WHERE content LIKE %s", (prefix + '%',))
+            cursor.execute("DELETE FROM public.ingestion_jobs WHERE job_id = %s", (job_id,))
+        conn.commit()
+        print(f"🧹 已清理测试任务 {job_id}")
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, "-s"]))
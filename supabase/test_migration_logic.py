@@ -1,243 +1,84 @@
-import json
 import os
 
-def find_node_by_id(node_id, all_nodes):
-    """根据ID查找节点"""
-    for node in all_nodes:
-        if node.get("id") == node_id:
-            return node
-    return None
+from graph_export import read_export
+from synthetic_graph import write_synthetic_export
+# 与迁移脚本使用同一份文本生成和进度代码；ue_pipeline.text / checkpoint 不依赖 Supabase / OpenAI，不需要任何凭据
+from ue_pipeline.text import enhance_node_with_relationships, generate_relationship_text, generate_hierarchy_and_type_documents
+from ue_pipeline.checkpoint import save_progress, load_progress, documents_digest, load_insert_progress, save_insert_progress
 
-def generate_base_node_text(node):
-    """生成节点的基础文本描述"""
-    props = node.get("properties", {})
-    name = props.get("name")
-    description = props.get("description")
-    labels = node.get("labels", ["Thing"])
-    label = labels[0] if labels else "Thing"
-    
-    # 根据标签类型生成更精确的描述
-    if label == "Module":
-        if name and description:
-            return f"虚幻引擎模块'{name}': {description}"
-        elif name:
-            return f"虚幻引擎模块'{name}'，这是一个功能模块。"
-    elif label == "System":
-        if name and description:
-            return f"虚幻引擎系统'{name}': {description}"
-        elif name:
-            return f"虚幻引擎系统'{name}'，这是一个系统级组件。"
-    elif label == "Class":
-        if name and description:
-            return f"虚幻引擎类'{name}': {description}"
-        elif name:
-            return f"虚幻引擎类'{name}'，这是一个类定义。"
-    elif label == "Interface":
-        if name and description:
-            return f"虚幻引擎接口'{name}': {description}"
-        elif name:
-            return f"虚幻引擎接口'{name}'，这是一个接口定义。"
-    elif label == "Subsystem":
-        if name and description:
-            return f"虚幻引擎子系统'{name}': {description}"
-        elif name:
-            return f"虚幻引擎子系统'{name}'，这是一个子系统组件。"
-    else:
-        if name and description:
-            return f"关于虚幻引擎的'{name}' ({label}): {description}"
-        elif name:
-            return f"虚幻引擎中有一个概念或功能叫做'{name}' ({label})。"
-        else:
-            return None
+def test_migration_logic(tmp_path):
+    """在合成的小导出文件上检查迁移生成的文档文本和进度文件"""
+    export_path = str(tmp_path / "graph.json")
+    stats = write_synthetic_export(export_path, node_count=50, edge_count=300, seed=7)
+    all_nodes, all_relationships = read_export(export_path)
+    assert len(all_nodes) == stats["nodes"], f"应读到 {stats['nodes']} 个节点，实际 {len(all_nodes)} 个"
+    assert len(all_relationships) == stats["relationships"], \
+        f"应读到 {stats['relationships']} 个关系，实际 {len(all_relationships)} 个"
 
-def enhance_node_with_relationships(node, all_relationships, all_nodes):
-    """为节点添加关系信息，生成增强的文本描述"""
-    base_text = generate_base_node_text(node)
-    if not base_text:
-        return None
-    
-    node_id = node.get("id")
-    dependencies = []
-    dependents = []
-    hierarchy_info = []
-    
-    # 查找与此节点相关的关系
+    # 节点文本：Core 是入度最高的枢纽模块，文本中应有基础描述、被依赖关系和层次信息
+    core = next(node for node in all_nodes if node.get("properties", {}).get("name") == "Core")
+    core_text = enhance_node_with_relationships(core, all_relationships, all_nodes)
+    assert core_text.startswith("虚幻引擎模块'Core'"), f"Core 的文本缺少模块描述: {core_text[:80]}"
+    assert "被'" in core_text, "Core 被大量依赖，文本中应包含被依赖关系"
+    assert "这是一个功能模块" in core_text, "Module 节点的文本应包含层次信息"
+    assert core_text.endswith("。"), "节点文本应以句号结尾"
+    # 没有名称的节点不生成文档
+    for node in all_nodes:
+        if not node.get("properties", {}).get("name"):
+            assert enhance_node_with_relationships(node, all_relationships, all_nodes) is None, \
+                f"无名称的节点 {node.get('id')} 不应生成文档"
+
+    # 关系文本：两端都有名称时包含两端名称和依赖类型对应的描述
+    phrases = {
+        "PublicDependencyModuleNames": "公开依赖",
+        "PrivateDependencyModuleNames": "私有依赖",
+        "PublicIncludePathModuleNames": "公开包含路径依赖",
+        "PrivateIncludePathModuleNames": "私有包含路径依赖",
+    }
+    named = 0
     for rel in all_relationships:
-        if rel.get("start", {}).get("id") == node_id:
-            # 当前节点是关系的起始点（依赖其他模块）
-            target_id = rel.get("end", {}).get("id")
-            rel_type = rel.get("label")
-            rel_props = rel.get("properties", {})
-            dependency_type = rel_props.get("type", "")
-            target_node = find_node_by_id(target_id, all_nodes)
-            if target_node:
-                target_name = target_node.get("properties", {}).get("name")
-                target_labels = target_node.get("labels", [])
-                if target_name:
-                    # 根据依赖类型生成更精确的描述
-                    if dependency_type == "PublicDependencyModuleNames":
-                        dependencies.append(f"公开依赖'{target_name}'")
-                    elif dependency_type == "PrivateDependencyModuleNames":
-                        dependencies.append(f"私有依赖'{target_name}'")
-                    elif dependency_type == "PublicIncludePathModuleNames":
-                        dependencies.append(f"公开包含路径依赖'{target_name}'")
-                    elif dependency_type == "PrivateIncludePathModuleNames":
-                        dependencies.append(f"私有包含路径依赖'{target_name}'")
-                    else:
-                        dependencies.append(f"依赖'{target_name}'")
-                    
-        elif rel.get("end", {}).get("id") == node_id:
-            # 当前节点是关系的终止点（被其他模块依赖）
-            source_id = rel.get("start", {}).get("id")
-            rel_type = rel.get("label")
-            rel_props = rel.get("properties", {})
-            dependency_type = rel_props.get("type", "")
-            source_node = find_node_by_id(source_id, all_nodes)
-            if source_node:
-                source_name = source_node.get("properties", {}).get("name")
-                source_labels = source_node.get("labels", [])
-                if source_name:
-                    # 根据依赖类型生成更精确的描述
-                    if dependency_type == "PublicDependencyModuleNames":
-                        dependents.append(f"被'{source_name}'公开依赖")
-                    elif dependency_type == "PrivateDependencyModuleNames":
-                        dependents.append(f"被'{source_name}'私有依赖")
-                    elif dependency_type == "PublicIncludePathModuleNames":
-                        dependents.append(f"被'{source_name}'公开包含路径依赖")
-                    elif dependency_type == "PrivateIncludePathModuleNames":
-                        dependents.append(f"被'{source_name}'私有包含路径依赖")
-                    else:
-                        dependents.append(f"被'{source_name}'依赖")
-    
-    # 添加层次结构信息
-    node_labels = node.get("labels", [])
-    if "System" in node_labels:
-        hierarchy_info.append("这是一个系统级组件")
-    elif "Subsystem" in node_labels:
-        hierarchy_info.append("这是一个子系统组件")
-    elif "Module" in node_labels:
-        hierarchy_info.append("这是一个功能模块")
-    elif "Class" in node_labels:
-        hierarchy_info.append("这是一个类定义")
-    elif "Interface" in node_labels:
-        hierarchy_info.append("这是一个接口定义")
-    
-    # 组合最终文本
-    relationship_text = []
-    if dependencies:
-        relationship_text.append("它" + "，".join(dependencies))
-    if dependents:
-        relationship_text.append("，".join(dependents))
-    if hierarchy_info:
-        relationship_text.append("，".join(hierarchy_info))
-    
-    if relationship_text:
-        base_text += " " + "，".join(relationship_text) + "。"
-    
-    return base_text
+        start_name = rel.get("start").get("properties", {}).get("name")
+        end_name = rel.get("end").get("properties", {}).get("name")
+        rel_text = generate_relationship_text(rel, all_nodes)
+        if not (start_name and end_name):
+            assert rel_text is None, f"端点缺少名称的关系 {rel.get('id')} 不应生成文档"
+            continue
+        named += 1
+        expected = f"'{start_name}' {phrases[rel.get('properties')['type']]} '{end_name}'"
+        assert expected in rel_text, f"关系 {rel.get('id')} 的文本应包含 {expected!r}: {rel_text}"
+    assert named > 0, "合成图中应有两端都有名称的关系"
 
-def generate_relationship_text(relationship, all_nodes):
-    """为关系生成独立的描述文本"""
-    rel_type = relationship.get("label")
-    rel_props = relationship.get("properties", {})
-    dependency_type = rel_props.get("type", "")
-    start_node = relationship.get("start", {})
-    end_node = relationship.get("end", {})
-    
-    start_name = start_node.get("properties", {}).get("name")
-    end_name = end_node.get("properties", {}).get("name")
-    
-    if start_name and end_name:
-        # 根据依赖类型生成更精确的描述
-        if dependency_type == "PublicDependencyModuleNames":
-            return f"在虚幻引擎中，'{start_name}' 公开依赖 '{end_name}'，这意味着'{start_name}'可以访问'{end_name}'的公共接口。"
-        elif dependency_type == "PrivateDependencyModuleNames":
-            return f"在虚幻引擎中，'{start_name}' 私有依赖 '{end_name}'，这意味着'{start_name}'可以访问'{end_name}'的内部实现。"
-        elif dependency_type == "PublicIncludePathModuleNames":
-            return f"在虚幻引擎中，'{start_name}' 公开包含路径依赖 '{end_name}'，这意味着'{start_name}'可以包含'{end_name}'的公共头文件。"
-        elif dependency_type == "PrivateIncludePathModuleNames":
-            return f"在虚幻引擎中，'{start_name}' 私有包含路径依赖 '{end_name}'，这意味着'{start_name}'可以包含'{end_name}'的内部头文件。"
-        else:
-            return f"在虚幻引擎中，'{start_name}' {rel_type} '{end_name}'。"
-    
-    return None
+    # 层次结构文档：模块列表以枢纽模块开头
+    hierarchy_docs = generate_hierarchy_and_type_documents(all_nodes, all_relationships)
+    module_docs = [doc for doc in hierarchy_docs if doc.startswith("虚幻引擎包含以下功能模块")]
+    assert len(module_docs) == 1, f"应生成一篇功能模块文档，实际 {len(module_docs)} 篇"
+    assert "Core, CoreUObject, Engine" in module_docs[0], f"功能模块文档应列出枢纽模块: {module_docs[0][:80]}"
 
-def generate_hierarchy_and_type_documents(all_nodes, all_relationships):
-    """生成层次结构和类型关系的额外文档"""
-    documents = []
-    
-    # 按标签分组节点
-    nodes_by_label = {}
-    for node in all_nodes:
-        labels = node.get("labels", [])
-        for label in labels:
-            if label not in nodes_by_label:
-                nodes_by_label[label] = []
-            nodes_by_label[label].append(node)
-    
-    # 生成层次结构文档
-    if "System" in nodes_by_label:
-        system_nodes = nodes_by_label["System"]
-        if len(system_nodes) > 0:
-            system_names = [node.get("properties", {}).get("name", "未知") for node in system_nodes if node.get("properties", {}).get("name")]
-            if system_names:
-                hierarchy_text = f"虚幻引擎包含以下系统级组件: {', '.join(system_names)}。这些系统是引擎的核心架构组件，负责管理不同的功能领域。"
-                documents.append(hierarchy_text)
-    
-    if "Subsystem" in nodes_by_label:
-        subsystem_nodes = nodes_by_label["Subsystem"]
-        if len(subsystem_nodes) > 0:
-            subsystem_names = [node.get("properties", {}).get("name", "未知") for node in subsystem_nodes if node.get("properties", {}).get("name")]
-            if subsystem_names:
-                hierarchy_text = f"虚幻引擎包含以下子系统组件: {', '.join(subsystem_names)}。这些子系统是系统级组件的子组件，提供更细粒度的功能。"
-                documents.append(hierarchy_text)
-    
-    if "Module" in nodes_by_label:
-        module_nodes = nodes_by_label["Module"]
-        if len(module_nodes) > 0:
-            module_names = [node.get("properties", {}).get("name", "未知") for node in module_nodes if node.get("properties", {}).get("name")]
-            if module_names:
-                hierarchy_text = f"虚幻引擎包含以下功能模块: {', '.join(module_names[:20])}{'...' if len(module_names) > 20 else ''}。这些模块是引擎的功能单元，每个模块负责特定的功能领域。"
-                documents.append(hierarchy_text)
-    
-    # 生成类型关系文档
-    if "Class" in nodes_by_label:
-        class_nodes = nodes_by_label["Class"]
-        if len(class_nodes) > 0:
-            class_names = [node.get("properties", {}).get("name", "未知") for node in class_nodes if node.get("properties", {}).get("name")]
-            if class_names:
-                type_text = f"虚幻引擎包含以下类定义: {', '.join(class_names[:20])}{'...' if len(class_names) > 20 else ''}。这些类提供了引擎的面向对象编程接口。"
-                documents.append(type_text)
-    
-    if "Interface" in nodes_by_label:
-        interface_nodes = nodes_by_label["Interface"]
-        if len(interface_nodes) > 0:
-            interface_names = [node.get("properties", {}).get("name", "未知") for node in interface_nodes if node.get("properties", {}).get("name")]
-            if interface_names:
-                type_text = f"虚幻引擎包含以下接口定义: {', '.join(interface_names)}。这些接口定义了类之间的契约和抽象。"
-                documents.append(type_text)
-    
-    return documents
+    # 进度文件：保存后原样读回；文件不存在时返回给定的默认值
+    progress_file = str(tmp_path / "progress.json")
+    documents = [{"content": core_text, "metadata": {"source": "node", "id": core.get("id")}}]
+    progress = {"processed_nodes": [core.get("id")], "processed_relationships": [], "documents": documents,
+                "current_phase": "relationships"}
+    save_progress(progress_file, progress)
+    assert load_progress(progress_file) == progress, "读回的进度与保存的不一致"
+    assert load_progress(str(tmp_path / "missing.json"), {"current_phase": "start"}) == {"current_phase": "start"}
+
+    # 插入进度：只有文档列表不变（摘要相同）时才沿用已提交的批次
+    digest = documents_digest(documents)
+    assert digest == documents_digest([dict(doc) for doc in documents]), "同样的文档应得到同样的摘要"
+    insert_file = str(tmp_path / "insert_progress.json")
+    save_insert_progress(insert_file, {"digest": digest, "committed": 20, "committed_batches": 1, "batch_size": 20})
+    assert load_insert_progress(insert_file, digest)["committed"] == 20, "摘要一致时应沿用已提交的批次"
+    changed = documents_digest([{"content": core_text + "！"}])
+    assert changed != digest, "文档内容变化后摘要应随之变化"
+    assert load_insert_progress(insert_file, changed)["committed"] == 0, "文档列表变化后应从头插入"
 
-def test_migration_logic(json_file_path):
+def analyze_migration_logic(json_file_path):
     print(f"开始测试迁移逻辑: {json_file_path}")
     
-    # 存储所有数据
-    all_nodes = []
-    all_relationships = []
-    
-    # 第一步：读取所有数据
+    # 第一步：读取所有数据（与迁移脚本相同的解码方式）
     print("正在读取节点和关系数据...")
-    with open(json_file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                item = json.loads(line)
-                if item.get("type") == "node":
-                    all_nodes.append(item)
-                elif item.get("type") == "relationship":
-                    all_relationships.append(item)
-            except json.JSONDecodeError:
-                continue
+    all_nodes, all_relationships = read_export(json_file_path)
     
     print(f"读取到 {len(all_nodes)} 个节点和 {len(all_relationships)} 个关系")
     
@@ -304,12 +145,12 @@ def test_migration_logic(json_file_path):
         print(f"  {doc}")
         print()
 
-# 执行测试
+# 对真实的导出文件打印统计和示例文本
 if __name__ == '__main__':
     script_dir = os.path.dirname(os.path.abspath(__file__))
     json_path = os.path.join(script_dir, "unreal_engine_graph.json")
     
     if os.path.exists(json_path):
-        test_migration_logic(json_path)
+        analyze_migration_logic(json_path)
     else:
         print(f"错误：在指定路径找不到文件 '{json_path}'。") 
\ No newline at end of file
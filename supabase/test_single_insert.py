@@ -1,93 +1,69 @@
-import json
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
-from supabase import create_client, Client
+import pytest
 
-# 加载环境变量
-load_dotenv('.env.local')
+# supabase_client / openai_client 见 conftest.py：缺少凭据或服务连不上时跳过测试
+def test_single_insert(supabase_client, openai_client):
+    print("=== 单条记录插入测试（使用 OpenAI）===")
 
-SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY_FOR_EMBEDDING")  # 使用 OpenAI 密钥
+    # 初始化客户端
+    print("1. 初始化客户端...")
+    supabase = supabase_client
+    print("✅ 客户端初始化成功！")
 
-print("=== 单条记录插入测试（使用 OpenAI）===")
-
-# 初始化客户端
-print("1. 初始化客户端...")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-openai_client = OpenAI(
-    api_key=OPENAI_API_KEY,
-    base_url="https://api.openai.com/v1",
-)
-print("✅ 客户端初始化成功！")
-
-# 模拟一个节点数据
-print("\n2. 模拟节点数据处理...")
-mock_node = {
-    "type": "node",
-    "id": "test_001",
-    "labels": ["Feature"],
-    "properties": {
-        "name": "Lumen",
-        "description": "动态全局光照系统，提供实时间接光照计算"
+    # 模拟一个节点数据
+    print("\n2. 模拟节点数据处理...")
+    mock_node = {
+        "type": "node",
+        "id": "test_001",
+        "labels": ["Feature"],
+        "properties": {
+            "name": "Lumen",
+            "description": "动态全局光照系统，提供实时间接光照计算"
+        }
     }
-}
 
-# 生成文本块
-name = mock_node["properties"]["name"]
-description = mock_node["properties"]["description"]
-label = mock_node["labels"][0]
+    # 生成文本块
+    name = mock_node["properties"]["name"]
+    description = mock_node["properties"]["description"]
+    label = mock_node["labels"][0]
 
-text_chunk = f"关于虚幻引擎的'{name}' ({label}): {description}"
-print(f"生成的文本块: {text_chunk}")
+    text_chunk = f"关于虚幻引擎的'{name}' ({label}): {description}"
+    print(f"生成的文本块: {text_chunk}")
 
-# 生成向量
-print("\n3. 调用 OpenAI API 生成向量...")
-try:
+    # 生成向量；失败时异常直接抛出，测试失败
+    print("\n3. 调用 OpenAI API 生成向量...")
     response = openai_client.embeddings.create(
         input=text_chunk,
         model="text-embedding-3-small"
     )
     embedding = response.data[0].embedding
+    assert len(embedding) == 1536, f"text-embedding-3-small 的向量应为 1536 维，实际 {len(embedding)} 维"
     print(f"✅ 向量生成成功！向量维度: {len(embedding)}")
     print(f"向量前5个值: {embedding[:5]}")
-except Exception as e:
-    print(f"❌ 向量生成失败: {e}")
-    exit(1)
 
-# 准备插入数据
-record_to_insert = {
-    'content': text_chunk,
-    'embedding': embedding
-}
+    # 准备插入数据
+    record_to_insert = {
+        'content': text_chunk,
+        'embedding': embedding
+    }
 
-# 插入数据库
-print("\n4. 插入数据库...")
-try:
+    # 插入数据库
+    print("\n4. 插入数据库...")
     response = supabase.table('ue_documents').insert(record_to_insert).execute()
-    
-    if response.data:
-        inserted_record = response.data[0]
-        print(f"✅ 插入成功！")
-        print(f"   记录ID: {inserted_record.get('id')}")
-        print(f"   内容: {inserted_record.get('content')[:50]}...")
-        print(f"   向量维度: {len(inserted_record.get('embedding', []))}")
-        
-        # 验证插入的数据
-        print("\n5. 验证插入的数据...")
-        verify_response = supabase.table('ue_documents').select('*').eq('id', inserted_record['id']).execute()
-        if verify_response.data:
-            print("✅ 数据验证成功！记录已正确存储在数据库中")
-        else:
-            print("⚠️ 数据验证失败，无法找到刚插入的记录")
-            
-    else:
-        print("⚠️ 插入操作完成，但未返回数据")
-        if hasattr(response, 'error') and response.error:
-            print(f"错误信息: {response.error}")
-            
-except Exception as e:
-    print(f"❌ 插入数据库失败: {e}")
+    assert response.data, "插入操作完成，但未返回数据"
+
+    inserted_record = response.data[0]
+    print(f"✅ 插入成功！")
+    print(f"   记录ID: {inserted_record.get('id')}")
+    print(f"   内容: {inserted_record.get('content')[:50]}...")
+
+    # 验证插入的数据
+    print("\n5. 验证插入的数据...")
+    verify_response = supabase.table('ue_documents').select('*').eq('id', inserted_record['id']).execute()
+    assert verify_response.data, f"无法找到刚插入的记录 {inserted_record['id']}"
+    assert verify_response.data[0]['content'] == text_chunk, "读回的记录内容与插入的不一致"
+    print("✅ 数据验证成功！记录已正确存储在数据库中")
+
+    print("\n=== 测试完成 ===")
 
-print("\n=== 测试完成 ===")
\ No newline at end of file
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, "-s"]))
@@ -0,0 +1,10 @@
+# 迁移流水线（Neo4j 导出 -> 文档文本 -> 向量 -> ue_documents）的可导入部分，供各迁移脚本和测试共用：
+#
+#   text        文本生成，纯函数，只依赖标准库
+#   checkpoint  进度文件的读写
+#   embedding   带重试的向量化
+#   loading     写入数据库和图谱的离线阶段（指标、布局、聚合、版本发布）
+#   clients     Supabase / 向量化端点池客户端，第一次使用时才创建
+#   config      .env.local 中的配置，第一次读取时才加载
+#
+# 这里不导入任何子模块：`import ue_pipeline.text` 不会加载 supabase / openai，也不需要任何凭据。
@@ -0,0 +1,60 @@
+import os
+import json
+import hashlib
+
+# 进度文件：迁移中断后从这里继续。文档文本生成的进度（已处理的节点 / 关系和已生成的文档）
+# 和插入进度（已提交的批次）分开保存。
+
+def empty_progress():
+    return {"processed_nodes": [], "processed_relationships": [], "documents": [], "current_phase": "nodes"}
+
+def save_progress(progress_file, data):
+    """保存进度"""
+    try:
+        with open(progress_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"💾 进度已保存到 {progress_file}")
+    except Exception as e:
+        print(f"⚠️ 保存进度时发生错误: {e}")
+
+def load_progress(progress_file, default=None):
+    """加载进度；文件不存在或无法读取时返回 default（默认为迁移脚本的空进度）"""
+    if os.path.exists(progress_file):
+        try:
+            with open(progress_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            print(f"📂 从 {progress_file} 加载了之前的进度")
+            return data
+        except Exception as e:
+            print(f"⚠️ 加载进度时发生错误: {e}，将重新开始")
+    return default if default is not None else empty_progress()
+
+def documents_digest(documents):
+    """文档内容的摘要，用于确认插入进度对应的是同一份文档列表"""
+    digest = hashlib.md5()
+    for doc in documents:
+        digest.update(doc['content'].encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def load_insert_progress(progress_file, digest):
+    """读取已提交的批次；文档列表变了时从头开始（content_hash 唯一键保证重复插入不会产生重复行）"""
+    if not progress_file or not os.path.exists(progress_file):
+        return {"committed": 0, "committed_batches": 0, "batch_size": 20}
+    try:
+        with open(progress_file, 'r', encoding='utf-8') as f:
+            progress = json.load(f)
+    except Exception as e:
+        print(f"⚠️ 读取插入进度时发生错误: {e}，将从头插入")
+        return {"committed": 0, "committed_batches": 0, "batch_size": 20}
+    if progress.get("digest") != digest:
+        print("⚠️ 插入进度与当前文档列表不一致，将从头插入")
+        return {"committed": 0, "committed_batches": 0, "batch_size": 20}
+    return progress
+
+def save_insert_progress(progress_file, progress):
+    # 每批都会写一次，先写临时文件再替换，中断时不会留下半个文件
+    tmp_file = progress_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(progress, f)
+    os.replace(tmp_file, progress_file)
@@ -0,0 +1,55 @@
+from . import config
+
+# 网络客户端在第一次使用时创建并缓存；缺少凭据时到那时才报错，
+# 只生成文本、读写进度的代码不需要任何凭据。
+
+MISSING_CREDENTIALS = "请确保 .env.local 文件中已设置所有必需的环境变量。"
+
+_supabase = None
+_embedding_pool = None
+_openai_client = None
+
+def get_supabase():
+    global _supabase
+    if _supabase is None:
+        url, key = config.supabase_url(), config.supabase_key()
+        if not (url and key):
+            raise ValueError(MISSING_CREDENTIALS)
+        from supabase import create_client
+        print("正在初始化 Supabase 客户端...")
+        _supabase = create_client(url, key)
+    return _supabase
+
+def get_embedding_pool():
+    global _embedding_pool
+    if _embedding_pool is None:
+        api_key = config.openai_api_key()
+        # 配置了 EMBEDDING_ENDPOINTS 时可以不设置 OPENAI_API_KEY
+        if not (api_key or config.embedding_endpoints()):
+            raise ValueError(MISSING_CREDENTIALS)
+        from embedding_pool import create_embedding_pool
+        _embedding_pool = create_embedding_pool(api_key)
+    return _embedding_pool
+
+def get_openai_client():
+    """单个 OpenAI 客户端，供不经过端点池的简单脚本使用"""
+    global _openai_client
+    if _openai_client is None:
+        api_key = config.openai_api_key()
+        if not api_key:
+            raise ValueError(MISSING_CREDENTIALS)
+        from openai import OpenAI
+        print("正在初始化 OpenAI 客户端...")
+        _openai_client = OpenAI(api_key=api_key, base_url="https://api.openai.com/v1")
+    return _openai_client
+
+def embedding_pool_stats(take=False):
+    """端点池的统计，take 时同时清零计数（见 EmbeddingPool.take_stats）；还没有创建端点池时返回空列表"""
+    if _embedding_pool is None:
+        return []
+    return _embedding_pool.take_stats() if take else _embedding_pool.stats()
+
+def reset_clients():
+    """丢弃已创建的客户端，下次使用时重新创建；fork 出的子进程不能复用父进程的 HTTP 连接"""
+    global _supabase, _embedding_pool, _openai_client
+    _supabase = _embedding_pool = _openai_client = None
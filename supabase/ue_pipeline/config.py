@@ -0,0 +1,32 @@
+import os
+
+# 环境变量在第一次读取配置时才从 .env.local 加载，导入本模块不会读文件
+
+ENV_FILE = '.env.local'
+
+_env_loaded = False
+
+def load_env():
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE)
+    _env_loaded = True
+
+def supabase_url():
+    load_env()
+    return os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
+
+def supabase_key():
+    load_env()
+    return os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+def openai_api_key():
+    load_env()
+    return os.getenv("OPENAI_API_KEY_FOR_EMBEDDING") or os.getenv("OPENAI_API_KEY")
+
+def embedding_endpoints():
+    """EMBEDDING_ENDPOINTS（多个向量化端点，见 embedding_pool.py）"""
+    load_env()
+    return os.getenv("EMBEDDING_ENDPOINTS")
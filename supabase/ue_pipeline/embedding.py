@@ -0,0 +1,44 @@
+import time
+import random
+
+import run_metrics
+from embedding_pool import is_client_error
+from .clients import get_embedding_pool
+from .text import truncate_text_for_embedding
+
+# throttle() 的延迟乘以这个系数；对着本地替身服务器压测时设为 0（见 load_harness.py）
+THROTTLE_SCALE = 1.0
+
+def create_embedding_with_retry(text, max_retries=3, base_delay=2):
+    """带重试机制的向量生成"""
+    # 确保文本长度在合理范围内
+    text = truncate_text_for_embedding(text)
+
+    for attempt in range(max_retries):
+        try:
+            # 端点池内部已经在端点之间切换；这里的重试只在所有端点都失败时生效
+            embedding = get_embedding_pool().embed([text])[0]
+            run_metrics.metrics.increment("documents_embedded")
+            return embedding
+        except Exception as e:
+            # 请求本身有问题（例如超过上下文长度）时重试也不会成功
+            if attempt < max_retries - 1 and not is_client_error(e):
+                delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+                print(f"    -> 重试 {attempt + 1}/{max_retries}，等待 {delay:.1f} 秒...")
+                run_metrics.metrics.increment("embedding_retries")
+                run_metrics.metrics.increment("backoff_seconds", delay)
+                time.sleep(delay)
+            else:
+                raise e
+
+def embed_batch(texts):
+    """一次请求向量化一整批文本（队列模式），不在这里重试，失败的任务由队列重新分配"""
+    return get_embedding_pool().embed([truncate_text_for_embedding(text) for text in texts])
+
+def throttle(low, high):
+    """随机延迟，避免API限制；累计的等待时间计入运行报告"""
+    delay = random.uniform(low, high) * THROTTLE_SCALE
+    if not delay:
+        return
+    run_metrics.metrics.increment("throttle_seconds", delay)
+    time.sleep(delay)
@@ -0,0 +1,142 @@
+import os
+import time
+
+import run_metrics
+from .clients import get_supabase
+from .checkpoint import documents_digest, load_insert_progress, save_insert_progress
+
+# 写入阶段：文档分批插入 ue_documents，以及迁移前后的图谱离线阶段。
+# 离线阶段需要 numpy / scipy，缺少时跳过该阶段，不影响文档迁移。
+
+# 插入批次大小按 AIMD 自适应：批次耗时低于目标时每批加 INSERT_BATCH_STEP 条，
+# 超过目标时减半，超时或出错时减半后重试同一批
+INSERT_BATCH_MIN = 5
+INSERT_BATCH_MAX = 200
+INSERT_BATCH_STEP = 5
+INSERT_TARGET_SECONDS = 2.0
+# 同一批连续失败这么多次后放弃，由调用方保存进度
+INSERT_MAX_FAILURES = 5
+INSERT_PROGRESS_FILE = "migration_insert_progress.json"
+
+def prepare_graph_snapshot(json_file_path, all_nodes, all_relationships):
+    """用已经读入的节点和关系构建图快照，图谱阶段（指标、布局、聚合）不必再解析一遍导出文件"""
+    try:
+        from graph_snapshot import ensure_snapshot
+        ensure_snapshot(json_file_path, all_nodes, all_relationships)
+    except ImportError as e:
+        print(f"⚠️ 跳过图快照构建（缺少依赖: {e}）")
+    except Exception as e:
+        # 各阶段的 open_graph 会自己从导出文件构建快照
+        print(f"⚠️ 构建图快照时发生错误: {e}")
+
+def compute_graph_analytics(json_file_path, dry_run=False):
+    """计算依赖图的节点指标（度数、PageRank、介数、传递扇入/扇出）并写入 graph_node_metrics
+
+    返回 {node_id: 指标}，缺少 numpy / scipy 或计算失败时返回空字典，节点文本中不附带指标。
+    dry_run 时只计算不写入，也不需要 Supabase 凭据。
+    """
+    try:
+        from compute_graph_analytics import update_graph_analytics
+        return update_graph_analytics(None if dry_run else get_supabase(), json_file_path, dry_run=dry_run)
+    except ImportError as e:
+        print(f"⚠️ 跳过图谱指标计算（缺少依赖: {e}）")
+    except Exception as e:
+        print(f"⚠️ 计算图谱指标时发生错误: {e}")
+    return {}
+
+def update_graph_layout(json_file_path):
+    """离线计算节点布局坐标并写入 graph_layout，前端据此直接渲染，只做短暂微调"""
+    try:
+        # numpy 只有布局阶段需要，缺少时跳过这一步，不影响文档迁移
+        from compute_graph_layout import update_graph_layout as compute_and_store_layout
+        compute_and_store_layout(get_supabase(), json_file_path)
+    except ImportError as e:
+        print(f"⚠️ 跳过布局计算（缺少依赖: {e}），前端将在浏览器中从头运行力导向模拟")
+    except Exception as e:
+        print(f"⚠️ 计算图谱布局时发生错误: {e}")
+
+def update_graph_clusters(json_file_path):
+    """离线计算图谱的多层聚合（标签 / 社区），供 get-graph-clusters 接口返回有上限的概览"""
+    try:
+        from compute_graph_clusters import update_graph_clusters as compute_and_store_clusters
+        compute_and_store_clusters(get_supabase(), json_file_path)
+    except ImportError as e:
+        print(f"⚠️ 跳过聚合计算（缺少依赖: {e}），「Group by Label」将没有可用的聚合层级")
+    except Exception as e:
+        print(f"⚠️ 计算图谱聚合时发生错误: {e}")
+
+def publish_graph_version(json_file_path, node_count, relationship_count):
+    """发布新的图谱版本号，图谱接口（get-graph-data / trace-graph）的响应缓存随之全部失效"""
+    try:
+        response = get_supabase().rpc('publish_graph_version', {
+            'source': os.path.basename(json_file_path),
+            'node_count': node_count,
+            'relationship_count': relationship_count,
+        }).execute()
+        print(f"🏷️ 已发布图谱版本 {response.data}，图谱接口缓存已失效")
+    except Exception as e:
+        print(f"⚠️ 发布图谱版本时发生错误: {e}")
+
+def insert_documents(documents_to_insert, progress_file=INSERT_PROGRESS_FILE):
+    """把文档分批 upsert 到 ue_documents，返回新插入的条数；出错时抛出异常，由调用方保存进度
+
+    每提交一批就把已提交的文档数写入 progress_file，重新运行时从第一个未提交的批次继续。
+    已提交但没收到响应的批次会被再次发送，content_hash 唯一键让它们被跳过而不是重复插入。
+    """
+    supabase = get_supabase()
+    digest = documents_digest(documents_to_insert)
+    progress = load_insert_progress(progress_file, digest)
+    position = progress["committed"]
+    batch_size = min(max(progress["batch_size"], INSERT_BATCH_MIN), INSERT_BATCH_MAX)
+    if position:
+        print(f"📂 已提交 {progress['committed_batches']} 批 / {position} 条文档，从第 {position + 1} 条继续")
+
+    total_inserted = 0
+    failures = 0
+    while position < len(documents_to_insert):
+        batch = documents_to_insert[position:position + batch_size]
+        print(f"正在插入第 {position + 1}-{position + len(batch)}/{len(documents_to_insert)} 条（批次大小 {batch_size}）...")
+
+        start_time = time.time()
+        try:
+            # 不回传插入的行（其中包含向量），只要求返回新插入的行数
+            response = supabase.table('ue_documents').upsert(
+                batch, on_conflict='content_hash', ignore_duplicates=True, returning='minimal', count='exact',
+            ).execute()
+        except Exception as e:
+            failures += 1
+            run_metrics.metrics.increment("insert_retries")
+            batch_size = max(batch_size // 2, INSERT_BATCH_MIN)
+            print(f"⚠️ 插入失败（第 {failures} 次），批次大小减为 {batch_size}: {e}")
+            if failures >= INSERT_MAX_FAILURES:
+                raise
+            time.sleep(min(2 ** failures, 30))
+            continue
+        elapsed = time.time() - start_time
+        run_metrics.metrics.observe("insert_batch_seconds", elapsed)
+
+        failures = 0
+        inserted = response.count or 0
+        run_metrics.metrics.increment("insert_batches")
+        run_metrics.metrics.increment("documents_inserted", inserted)
+        total_inserted += inserted
+        position += len(batch)
+        if elapsed > INSERT_TARGET_SECONDS:
+            next_batch_size = max(batch_size // 2, INSERT_BATCH_MIN)
+        else:
+            next_batch_size = min(batch_size + INSERT_BATCH_STEP, INSERT_BATCH_MAX)
+        progress.update({
+            "digest": digest,
+            "committed": position,
+            "committed_batches": progress.get("committed_batches", 0) + 1,
+            "batch_size": next_batch_size,
+        })
+        if progress_file:
+            save_insert_progress(progress_file, progress)
+        skipped = f"，{len(batch) - inserted} 条已存在" if inserted < len(batch) else ""
+        print(f"✅ 已提交，耗时 {elapsed:.1f} 秒，新插入 {inserted} 条{skipped}，已累计插入 {total_inserted} 条记录")
+        batch_size = next_batch_size
+
+    if progress_file and os.path.exists(progress_file):
+        os.remove(progress_file)
+    return total_inserted